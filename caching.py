@@ -0,0 +1,128 @@
+"""
+プロセス内キャッシュのモジュール。
+計算結果やファイルの内容をプロセス内のすべてのセッションで共有し、
+データやファイルが変わらない限り再計算・再読み込みしないようにします。
+データストアからも利用できるよう、config など他のアプリモジュールには依存しません。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import metrics
+
+
+class VersionedCache:
+    """
+    データのバージョンをキーとして、計算結果をプロセス内のすべてのセッションで共有するキャッシュ。
+    バージョンが変わらない限り、同じ計算を繰り返さない。
+    ヒット率は metrics モジュールに name で記録される。
+    """
+
+    def __init__(self, name: str, max_entries: int = 4):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """key（バージョンを含む）に対応する値を返す。なければ compute() で計算して保持する。"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                metrics.record_cache(self.name, hit=True)
+                return self._entries[key]
+        metrics.record_cache(self.name, hit=False)
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+# ファイルの更新有無（mtime）を確認する最小間隔（秒）
+FILE_CHECK_INTERVAL_SECONDS = 2.0
+
+
+class FileCache:
+    """
+    ファイルを読み込んだ結果を、パスと更新時刻（mtime）をキーとして
+    プロセス内のすべてのセッションで共有するキャッシュ。
+    ファイルの更新有無の確認（stat）は FILE_CHECK_INTERVAL_SECONDS に一度だけ行うため、
+    ファイルが変わらない限りディスクへのアクセスは発生しない。
+    ヒット率は metrics モジュールに name で記録される。
+    """
+
+    def __init__(
+        self, name: str, check_interval_seconds: float = FILE_CHECK_INTERVAL_SECONDS
+    ):
+        self.name = name
+        self.check_interval_seconds = check_interval_seconds
+        # (path, loader) -> (mtime_ns, size, 確認時刻, 値)
+        self._entries: Dict[Tuple[str, Callable], Tuple[int, int, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, loader: Callable[[str], Any]) -> Optional[Any]:
+        """
+        loader(path) の結果を返す。ファイルが更新されていれば読み込み直す。
+        ファイルが存在しない場合は None を返す。
+        """
+        key = (path, loader)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and now - entry[2] < self.check_interval_seconds:
+            metrics.record_cache(self.name, hit=True)
+            return entry[3]
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._entries[key] = (-1, -1, now, None)
+            return None
+
+        if entry is not None and (entry[0], entry[1]) == (stat.st_mtime_ns, stat.st_size):
+            metrics.record_cache(self.name, hit=True)
+            value = entry[3]
+        else:
+            metrics.record_cache(self.name, hit=False)
+            value = loader(path)
+        with self._lock:
+            self._entries[key] = (stat.st_mtime_ns, stat.st_size, now, value)
+        return value
+
+    def invalidate(self, path: str) -> None:
+        """path のキャッシュを破棄し、次回の読み込み時にファイルを確認し直すようにする。"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# コンペの説明Markdownやロゴなど、静的なコンテンツのキャッシュ
+content_cache = FileCache("content")
+
+
+def read_text_file(path: str) -> Optional[str]:
+    """テキストファイル（UTF-8）の内容をキャッシュ経由で返す。存在しない場合は None。"""
+    return content_cache.get(path, _read_text)
+
+
+def read_binary_file(path: str) -> Optional[bytes]:
+    """ファイルの内容（バイト列）をキャッシュ経由で返す。存在しない場合は None。"""
+    return content_cache.get(path, _read_bytes)
@@ -0,0 +1,174 @@
+"""
+コンペティションの定義モジュール。
+1つのアプリ（1つのプロセス）で複数のコンペティションを開催できるよう、
+config.py の設定と COMPETITIONS から各コンペティションの設定
+（テーブル名、評価関数、配布データなど）を組み立て、
+各セッションが選択しているコンペティションを返します。
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+DEFAULT_COMPETITION_ID = "default"
+
+# コンペティションを選択する st.session_state のキーと URL のクエリパラメータ名
+COMPETITION_STATE_KEY = "competition_id"
+COMPETITION_QUERY_PARAM = "competition"
+
+
+@dataclass(frozen=True, eq=False)
+class Competition:
+    """1つのコンペティションの設定"""
+
+    id: str
+    title: str
+    is_running: bool
+    leaderboard_table_name: str
+    ground_truth_table_name: str
+    leaderboard_worksheet_name: str
+    ground_truth_worksheet_name: str
+    submission_journal_path: str
+    data_dir: str
+    # data_dir のファイルを配信するURL（None の場合はアプリ経由でダウンロードさせる）
+    data_download_base_url: Optional[str]
+    problem_file: str
+    sample_submission_file: str
+    home_content_file: str
+    leaderboard_sort_ascending: bool
+    leaderboard_show_latest_only: bool
+    final_submission_limit: int
+    ground_truth_header: List[str]
+    score_submission: Callable[[pd.DataFrame, pd.DataFrame], Tuple[float, float]]
+    # 行ごとの損失（ブートストラップ信頼区間の計算に使用。None の場合は信頼区間を計算しない）
+    score_rows: Optional[Callable[[pd.DataFrame, pd.DataFrame], pd.DataFrame]]
+
+
+_competitions: Optional[Dict[str, Competition]] = None
+
+
+def _suffixed(name: str, competition_id: str) -> str:
+    """ファイル名やテーブル名に、コンペティションのIDを付ける"""
+    if not name:
+        return name
+    root, ext = os.path.splitext(name)
+    return f"{root}_{competition_id}{ext}"
+
+
+def _build_competition(spec: Dict[str, Any], multiple: bool) -> Competition:
+    import config
+
+    competition_id = spec["id"]
+    # 複数のコンペティションを開催する場合、保存先の既定値にはIDを付けて重複しないようにする
+    storage_suffix = competition_id if multiple else ""
+
+    def storage_default(name: str) -> str:
+        return _suffixed(name, storage_suffix) if storage_suffix else name
+
+    return Competition(
+        id=competition_id,
+        title=spec.get("title", config.PAGE_TITLE),
+        is_running=spec.get("is_competition_running", config.IS_COMPETITION_RUNNING),
+        leaderboard_table_name=spec.get(
+            "leaderboard_table_name", storage_default(config.LEADERBOARD_TABLE_NAME)
+        ),
+        ground_truth_table_name=spec.get(
+            "ground_truth_table_name", storage_default(config.GROUND_TRUTH_TABLE_NAME)
+        ),
+        leaderboard_worksheet_name=spec.get(
+            "leaderboard_worksheet_name",
+            storage_default(config.LEADERBOARD_WORKSHEET_NAME),
+        ),
+        ground_truth_worksheet_name=spec.get(
+            "ground_truth_worksheet_name",
+            storage_default(config.GROUND_TRUTH_WORKSHEET_NAME),
+        ),
+        submission_journal_path=spec.get(
+            "submission_journal_path", storage_default(config.SUBMISSION_JOURNAL_PATH)
+        ),
+        data_dir=spec.get("data_dir", config.DATA_DIR),
+        data_download_base_url=spec.get(
+            "data_download_base_url", config.DATA_DOWNLOAD_BASE_URL
+        ),
+        problem_file=spec.get("problem_file", config.PROBLEM_FILE),
+        sample_submission_file=spec.get(
+            "sample_submission_file", config.SAMPLE_SUBMISSION_FILE
+        ),
+        home_content_file=spec.get("home_content_file", config.HOME_CONTENT_FILE),
+        leaderboard_sort_ascending=spec.get(
+            "leaderboard_sort_ascending", config.LEADERBOARD_SORT_ASCENDING
+        ),
+        leaderboard_show_latest_only=spec.get(
+            "leaderboard_show_latest_only", config.LEADERBOARD_SHOW_LATEST_ONLY
+        ),
+        final_submission_limit=spec.get(
+            "final_submission_limit", config.FINAL_SUBMISSION_LIMIT
+        ),
+        ground_truth_header=spec.get(
+            "ground_truth_header", config.GROUND_TRUTH_HEADER
+        ),
+        score_submission=spec.get("score_submission", config.score_submission),
+        # 評価関数を上書きした場合、既定の行ごとの損失は評価関数と一致しないため使用しない
+        score_rows=spec.get(
+            "score_rows", None if "score_submission" in spec else config.score_rows
+        ),
+    )
+
+
+def get_competitions() -> Dict[str, Competition]:
+    """開催中のすべてのコンペティションを、IDをキーとする辞書（定義順）で返す。"""
+    global _competitions
+    if _competitions is None:
+        import config
+
+        specs = config.COMPETITIONS or [{"id": DEFAULT_COMPETITION_ID}]
+        ids = [spec["id"] for spec in specs]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"COMPETITIONS の id が重複しています: {ids}")
+        multiple = len(specs) > 1
+        _competitions = {
+            spec["id"]: _build_competition(spec, multiple) for spec in specs
+        }
+    return _competitions
+
+
+def get_current_competition() -> Competition:
+    """
+    現在のセッションが選択しているコンペティションを返す。
+    未選択の場合は URL のクエリパラメータ、それもなければ最初のコンペティションを返す。
+    """
+    competitions = get_competitions()
+    if len(competitions) == 1:
+        return next(iter(competitions.values()))
+
+    competition_id = st.session_state.get(COMPETITION_STATE_KEY)
+    if competition_id is None:
+        competition_id = st.query_params.get(COMPETITION_QUERY_PARAM)
+    return competitions.get(competition_id) or next(iter(competitions.values()))
+
+
+def _sync_query_param() -> None:
+    st.query_params[COMPETITION_QUERY_PARAM] = st.session_state[COMPETITION_STATE_KEY]
+
+
+def select_competition() -> Competition:
+    """
+    複数のコンペティションを開催している場合、サイドバーにコンペティションの選択欄を表示する。
+    選択したコンペティションは URL のクエリパラメータにも反映されるため、URLで共有できる。
+    選択中のコンペティションを返す。
+    """
+    competitions = get_competitions()
+    if len(competitions) > 1:
+        if COMPETITION_STATE_KEY not in st.session_state:
+            st.session_state[COMPETITION_STATE_KEY] = get_current_competition().id
+        st.sidebar.selectbox(
+            "コンペティション",
+            list(competitions),
+            format_func=lambda competition_id: competitions[competition_id].title,
+            key=COMPETITION_STATE_KEY,
+            on_change=_sync_query_param,
+        )
+    return get_current_competition()
@@ -1,10 +1,31 @@
 import streamlit as st
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 import os
+import threading
+import time
 
+from competitions import Competition, get_competitions, get_current_competition
 from data_store import get_data_store
+from leaderboard_snapshot import (
+    LeaderboardSnapshot,
+    SnapshotPublisher,
+    load_snapshot,
+    publish_snapshot,
+    set_snapshot_frozen,
+)
+from leaderboard_stats import PROGRESSION_MAX_USERS, downsample_progression
+from ranked_leaderboard import RankedLeaderboard, parse_submission_time
+from rescoring import compare_scores, rescore_submissions
+from score_index import SCORE_COLUMNS, ScoreIndex
+from submission_archive import SUBMISSION_KEY_COLUMNS, SubmissionArchive, normalize_keys
+from shared_ground_truth import (
+    attach_ground_truth,
+    content_version,
+    publish_ground_truth,
+    published_version,
+)
 
 
 # --- App Navigation ---
@@ -15,6 +36,11 @@ def _get_NAVIGATION_PAGES():
             "contents/problem.py", title="概要・データ", icon=":material/menu_book:"
         ),
         st.Page("contents/submit.py", title="予測結果の投稿", icon=":material/send:"),
+        st.Page(
+            "contents/final_submissions.py",
+            title="最終投稿の選択",
+            icon=":material/flag:",
+        ),
         st.Page(
             "contents/leaderboard.py",
             title="リーダーボード",
@@ -63,56 +89,94 @@ IS_COMPETITION_RUNNING = (
 )
 
 # --- Data Store Settings ---
-# データストアの種類を選択: "google_sheet", "sqlite", "mysql", "postgresql"
+# データストアの種類を選択: "google_sheet", "sqlite", "duckdb", "mysql", "postgresql"
 DATA_STORE_TYPE = "google_sheet"
 
 # Google Sheets specific settings
 SPREADSHEET_NAME = "sample_spreadsheets"  # ここにスプレッドシート名を入力してください
 LEADERBOARD_WORKSHEET_NAME = "leaderboard"  # リーダーボード用のワークシート名
 GROUND_TRUTH_WORKSHEET_NAME = "ground_truth"  # 正解データ用のワークシート名
+# Google Sheets API のクォータ（1分あたりのリクエスト数）。超えないようにリクエストを調整します。
+SHEETS_READ_REQUESTS_PER_MINUTE = 60
+SHEETS_WRITE_REQUESTS_PER_MINUTE = 60
+# 投稿をいったん書き込むローカルのジャーナル（SQLiteファイル）のパス。
+# 投稿はバックグラウンドでまとめてワークシートに反映されます。空文字列の場合はワークシートに直接書き込みます。
+SUBMISSION_JOURNAL_PATH = "db/submission_journal.db"
+JOURNAL_FLUSH_INTERVAL_SECONDS = 5.0  # ジャーナルをワークシートに反映する間隔（秒）
 
 # Database specific settings
 DB_PATH = "db/competition.db"  # For SQLite
+DUCKDB_PATH = "db/competition.duckdb"  # For DuckDB
+
 
-# DB_URL is constructed from st.secrets for security
-DB_URL = ""
-if DATA_STORE_TYPE in ["postgresql", "mysql"]:
+def get_db_url() -> str:
+    """
+    st.secrets の接続情報からデータベースのURLを組み立てる (`mysql`, `postgresql`選択時)。
+    secrets の読み込みは、データストアの作成時まで行わない。
+    """
     try:
         # st.secretsからデータベース接続情報を取得
         conn_info = st.secrets["connections"][DATA_STORE_TYPE]
 
         # 完全なURLが設定されていればそれを使用
         if "url" in conn_info and conn_info["url"]:
-            DB_URL = conn_info["url"]
+            return conn_info["url"]
+
         # そうでなければ、各パーツからURLを組み立てる
+        dialect = conn_info["dialect"]
+        driver = conn_info.get("driver")
+        username = conn_info["username"]
+        password = conn_info["password"]
+        host = conn_info["host"]
+        port = conn_info["port"]
+        database = conn_info["database"]
+
+        if driver:
+            dialect_driver = f"{dialect}+{driver}"
         else:
-            dialect = conn_info["dialect"]
-            driver = conn_info.get("driver")
-            username = conn_info["username"]
-            password = conn_info["password"]
-            host = conn_info["host"]
-            port = conn_info["port"]
-            database = conn_info["database"]
-
-            if driver:
-                dialect_driver = f"{dialect}+{driver}"
-            else:
-                dialect_driver = dialect
-
-            DB_URL = (
-                f"{dialect_driver}://{username}:{password}@{host}:{port}/{database}"
-            )
+            dialect_driver = dialect
+
+        return f"{dialect_driver}://{username}:{password}@{host}:{port}/{database}"
 
     except (FileNotFoundError, KeyError):
         # Streamlit Community Cloud 環境以外でsecrets.tomlがない場合や、
-        # 必要なキーが設定されていない場合は、DB_URLは空文字列のままとなる
+        # 必要なキーが設定されていない場合は、空文字列を返す
         # scripts/register_ground_truth.py などは別途 secrets.toml を直接読み込む
-        pass
+        return ""
+
+
+def get_db_read_replica_url() -> str:
+    """
+    st.secrets の接続情報からリードレプリカのURLを取得する (`mysql`, `postgresql`選択時)。
+    `read_replica_url` が設定されていない場合は空文字列を返し、読み込みもプライマリで行う。
+    """
+    try:
+        return st.secrets["connections"][DATA_STORE_TYPE].get("read_replica_url", "")
+    except (FileNotFoundError, KeyError):
+        return ""
+
+
+# リードレプリカを使用する場合に、投稿などの書き込みを行ったセッションが
+# プライマリから読み込む（自分の書き込みがレプリカに反映されるのを待たない）秒数
+DB_READ_YOUR_WRITES_SECONDS = 30.0
 
 # Database Table Names
 LEADERBOARD_TABLE_NAME = "leaderboard"
 GROUND_TRUTH_TABLE_NAME = "ground_truth"
 
+# 型変換した正解データを共有メモリに置き、同じマシン上のプロセス間で1つのコピーを共有するか
+# （True: 共有メモリから参照, False: プロセスごとにデータストアから読み込む）
+SHARED_GROUND_TRUTH_ENABLED: bool = True
+SHARED_GROUND_TRUTH_DIR = "db/shared_memory"  # 公開中の共有メモリの名前を記録するファイルのディレクトリ
+
+# 投稿された予測値を保存するか（保存した予測値は、正解データや評価関数を修正した場合の再採点に使用します）
+SUBMISSION_ARCHIVE_ENABLED: bool = True
+SUBMISSION_ARCHIVE_DIR = "db/submissions"  # 予測値の保存先ディレクトリ（コンペティションごとのサブディレクトリに保存）
+RESCORE_MAX_WORKERS: Optional[int] = None  # 再採点に使用するプロセス数（None: CPUのコア数）
+
+# --- Metrics Settings ---
+METRICS_DIR = "db/metrics"  # 運用メトリクス（管理者用ダッシュボードで表示）の書き出し先ディレクトリ
+
 
 # --- Competition Specific Customization ---
 
@@ -125,12 +189,37 @@ SAMPLE_SUBMISSION_FILE = os.path.join(
     DATA_DIR, "sample_submission.csv"
 )  # サンプル提出ファイルのパス
 HOME_CONTENT_FILE = "competition_files/contents/home.md"  # Homeページのカスタマイズ用コンテンツファイルのパス
+DATA_BUNDLE_DIR = "db/downloads"  # 全データファイルをまとめたzipの作成先ディレクトリ
+DATA_BUNDLE_FILE_NAME = "competition_data.zip"  # 全データファイルをまとめたzipのダウンロード時のファイル名
+# st.download_button はファイル全体をサーバーのメモリに読み込んでから送信するため、
+# 大きなファイルは Web サーバー（nginx などのリバースプロキシ、オブジェクトストレージ）から直接配信します。
+DATA_DOWNLOAD_BASE_URL: Optional[str] = None  # DATA_DIR のファイルを配信するURL（設定するとアプリを経由せずにダウンロードさせる）
+DATA_BUNDLE_BASE_URL: Optional[str] = None  # DATA_BUNDLE_DIR のファイルを配信するURL（設定するとzipをアプリを経由せずにダウンロードさせる）
+DATA_DOWNLOAD_MAX_INLINE_SIZE = 200 * 1024 * 1024  # 配信用のURLがない場合に、アプリ経由でダウンロードさせるファイルの最大サイズ（バイト）
 
 # Leaderboard Settings
 LEADERBOARD_SHOW_LATEST_ONLY: bool = False  # リーダーボードに各ユーザーの最新の投稿のみを表示するか (True: 最新のみ, False: 全ての投稿)
 LEADERBOARD_SORT_ASCENDING: bool = (
     True  # リーダーボードのスコアソート順（True:昇順, False:降順）
 )
+# 各ユーザーが最終投稿として選択できる投稿数。Privateリーダーボードは、ユーザーごとに最終投稿の中で
+# Privateスコアが最良の投稿（選択していないユーザーは、Publicスコアが最良の投稿）で順位付けします。
+# 0 の場合は最終投稿を選択せず、Privateリーダーボードには全ての投稿を表示します。
+FINAL_SUBMISSION_LIMIT: int = 2
+LEADERBOARD_PAGE_SIZE_OPTIONS: List[int] = [25, 50, 100, 200]  # リーダーボードの1ページあたりの表示件数の選択肢（先頭が初期値）
+# リーダーボードのスナップショット（順位付け済みのリーダーボードを書き出したファイル）から閲覧するか
+# （True: スナップショットから閲覧, False: データストアから直接閲覧）
+# 固定（コンペ終了時の最終リーダーボードなど）されたスナップショットは、この設定にかかわらず表示されます。
+LEADERBOARD_SNAPSHOT_ENABLED: bool = False
+LEADERBOARD_SNAPSHOT_DIR = "db/snapshots"  # スナップショットの書き出し先ディレクトリ
+LEADERBOARD_SNAPSHOT_INTERVAL_SECONDS = 60.0  # スナップショットを定期的に書き出す間隔（秒）
+LEADERBOARD_SNAPSHOT_DEBOUNCE_SECONDS = 5.0  # 投稿後、この秒数だけ続けて投稿がなければスナップショットを書き出す
+# リーダーボードの表を自動更新する間隔（秒）。None の場合は自動更新しない
+# 間隔ごとにリーダーボードのバージョン（小さなクエリ1回）のみを確認し、更新があった場合だけ表を読み込み直します。
+LEADERBOARD_REFRESH_SECONDS: Optional[float] = 30.0
+# 投稿時の順位計算に使用するスコアの索引を、データストアから作成し直す間隔（秒）
+# 索引は投稿のたびにプロセス内で更新し、他のプロセスからの投稿はこの間隔で作成し直すまで順位に反映されません。
+SCORE_INDEX_REFRESH_SECONDS = 60.0
 
 # --- Submission and Header Definitions ---
 # Submission additional info definition
@@ -152,7 +241,10 @@ LEADERBOARD_HEADER: List[str] = [
     "private_score",
     "submission_time",
     "is_competition_running",
-] + _additional_columns
+] + _additional_columns + [
+    # 投稿ごとの一意なID（同じユーザーの同じ時刻の投稿を区別するため）
+    "submission_id",
+]
 GROUND_TRUTH_HEADER: List[str] = ["id", "target", "Usage"]
 
 
@@ -178,13 +270,45 @@ def score_submission(pred_df: pd.DataFrame, gt_df: pd.DataFrame) -> Tuple[float,
     return float(public_score), float(private_score)
 
 
+def score_rows(pred_df: pd.DataFrame, gt_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    正解データの行ごとの損失（Usage と loss の列、正解データと同じ並び）を返す (例:絶対誤差)。
+    平均が score_submission のスコアと一致するように定義し、ブートストラップ信頼区間の計算に使用します。
+    """
+    merged = gt_df.merge(pred_df, on="id", how="left", suffixes=("", "_pred"))
+    return pd.DataFrame(
+        {
+            "Usage": merged["Usage"],
+            "loss": np.abs(merged["target_pred"] - merged["target"]),
+        }
+    )
+
+
+# --- Multi-Competition Settings ---
+# 1つのアプリで複数のコンペティションを開催する場合に、コンペティションごとの設定を定義します。
+# 各要素には "id"（英数字とアンダースコア）と "title" を指定し、必要に応じて以下のキーで上記の設定を上書きします。
+#   "is_competition_running", "leaderboard_table_name", "ground_truth_table_name",
+#   "leaderboard_worksheet_name", "ground_truth_worksheet_name", "submission_journal_path",
+#   "data_dir", "data_download_base_url", "problem_file", "sample_submission_file", "home_content_file",
+#   "leaderboard_sort_ascending", "leaderboard_show_latest_only", "final_submission_limit", "ground_truth_header",
+#   "score_submission"（評価関数）, "score_rows"（行ごとの損失。評価関数を上書きした場合は、指定しないと信頼区間を計算しない）
+# テーブル名・ワークシート名・ジャーナルのパスを指定しない場合は、既定の名前に "_<id>" を付けたものを使用します。
+# 空のリストの場合は、上記の設定で1つのコンペティションを開催します。
+# 例:
+# COMPETITIONS = [
+#     {"id": "house_price", "title": "住宅価格予測", "data_dir": "competition_files/house_price/data"},
+#     {"id": "churn", "title": "解約予測", "score_submission": score_churn, "leaderboard_sort_ascending": False},
+# ]
+COMPETITIONS: List[Dict[str, Any]] = []
+
+
 # --- Data Reading/Writing Functions ---
 
 
-def read_ground_truth() -> pd.DataFrame:
-    """正解データの読み込み"""
-    data_store = get_data_store()
-    df = data_store.read_ground_truth(GROUND_TRUTH_HEADER)
+def _load_ground_truth(competition: Competition) -> pd.DataFrame:
+    """データストアから正解データを読み込み、型変換する"""
+    data_store = get_data_store(competition)
+    df = data_store.read_ground_truth(competition.ground_truth_header)
     # データ型の変換
     if "id" in df.columns:
         df["id"] = pd.to_numeric(df["id"], errors="coerce")
@@ -193,6 +317,49 @@ def read_ground_truth() -> pd.DataFrame:
     return df
 
 
+def read_ground_truth() -> pd.DataFrame:
+    """
+    正解データの読み込み。
+    SHARED_GROUND_TRUTH_ENABLED が True の場合は、公開済みの共有メモリを読み取り専用で参照し、
+    まだ公開されていなければデータストアから読み込んで公開する。
+    """
+    competition = get_current_competition()
+    if SHARED_GROUND_TRUTH_ENABLED:
+        df = attach_ground_truth(SHARED_GROUND_TRUTH_DIR, competition.id)
+        if df is not None:
+            return df
+    df = _load_ground_truth(competition)
+    if SHARED_GROUND_TRUTH_ENABLED:
+        publish_ground_truth(df, SHARED_GROUND_TRUTH_DIR, competition.id)
+    return df
+
+
+def get_ground_truth_version() -> str:
+    """
+    正解データのバージョン（内容のハッシュ値）を返す。
+    正解データに依存する集計（スコアの信頼区間など）のキャッシュのキーに使用する。
+    """
+    competition = get_current_competition()
+    if SHARED_GROUND_TRUTH_ENABLED:
+        version = published_version(SHARED_GROUND_TRUTH_DIR, competition.id)
+        if version is not None:
+            return version
+    return content_version(read_ground_truth())
+
+
+def publish_shared_ground_truth(competition: Optional[Competition] = None) -> None:
+    """
+    データストアの正解データを読み込み直して共有メモリに公開する（正解データの登録後に呼び出す）。
+    SHARED_GROUND_TRUTH_ENABLED が False の場合は何もしない。
+    """
+    if not SHARED_GROUND_TRUTH_ENABLED:
+        return
+    competition = competition or get_current_competition()
+    publish_ground_truth(
+        _load_ground_truth(competition), SHARED_GROUND_TRUTH_DIR, competition.id
+    )
+
+
 def read_leaderboard() -> pd.DataFrame:
     """リーダーボードの読み込み"""
     data_store = get_data_store()
@@ -205,28 +372,453 @@ def read_leaderboard() -> pd.DataFrame:
     return df
 
 
-def write_submission(submission_data: Dict) -> None:
-    """リーダーボードに新しい投稿を書き込み"""
+def _owner_column() -> str:
+    """ユーザーを識別する列名"""
+    return "email_hash" if AUTH else "username"
+
+
+def _latest_only_column(competition: Optional[Competition] = None) -> Optional[str]:
+    """各ユーザーの最新の投稿のみを表示する場合に、ユーザーを識別する列名を返す"""
+    competition = competition or get_current_competition()
+    if not competition.leaderboard_show_latest_only:
+        return None
+    return _owner_column()
+
+
+def _final_only_column(competition: Optional[Competition] = None) -> Optional[str]:
+    """最終投稿を選択する場合に、ユーザーを識別する列名を返す"""
+    competition = competition or get_current_competition()
+    if competition.final_submission_limit <= 0:
+        return None
+    return _owner_column()
+
+
+# --- Leaderboard Snapshot Functions ---
+_snapshot_publisher: Optional[SnapshotPublisher] = None
+_snapshot_publisher_lock = threading.Lock()
+
+
+def publish_leaderboard_snapshot(
+    competition: Optional[Competition] = None, frozen: bool = False, force: bool = False
+) -> bool:
+    """リーダーボードのスナップショットの書き出し（更新がない場合や固定されている場合は何もしない）"""
+    competition = competition or get_current_competition()
+    return publish_snapshot(
+        get_data_store(competition),
+        competition.id,
+        LEADERBOARD_HEADER,
+        ascending=competition.leaderboard_sort_ascending,
+        latest_only_column=_latest_only_column(competition),
+        snapshot_dir=LEADERBOARD_SNAPSHOT_DIR,
+        frozen=frozen,
+        force=force,
+        final_only_column=_final_only_column(competition),
+    )
+
+
+def set_leaderboard_snapshot_frozen(
+    frozen: bool, competition: Optional[Competition] = None
+) -> bool:
+    """リーダーボードのスナップショットの固定・固定解除"""
+    competition = competition or get_current_competition()
+    return set_snapshot_frozen(LEADERBOARD_SNAPSHOT_DIR, competition.id, frozen)
+
+
+def _get_snapshot_publisher() -> SnapshotPublisher:
+    # 同時に開いたセッションから呼ばれても、書き出しのスレッドはプロセスごとに1つのみ開始する
+    global _snapshot_publisher
+    if _snapshot_publisher is None:
+        with _snapshot_publisher_lock:
+            if _snapshot_publisher is None:
+                competitions = get_competitions()
+                publisher = SnapshotPublisher(
+                    lambda competition_id: publish_leaderboard_snapshot(
+                        competitions[competition_id]
+                    ),
+                    list(competitions),
+                    interval_seconds=LEADERBOARD_SNAPSHOT_INTERVAL_SECONDS,
+                    debounce_seconds=LEADERBOARD_SNAPSHOT_DEBOUNCE_SECONDS,
+                )
+                publisher.start()
+                _snapshot_publisher = publisher
+    return _snapshot_publisher
+
+
+def request_leaderboard_snapshot() -> None:
+    """投稿後に、スナップショットの書き出しを要求する（続けて投稿があればまとめて書き出す）"""
+    if LEADERBOARD_SNAPSHOT_ENABLED:
+        _get_snapshot_publisher().request(get_current_competition().id)
+
+
+def get_leaderboard_snapshot() -> Optional[LeaderboardSnapshot]:
+    """
+    リーダーボードの閲覧に使用するスナップショットの取得。
+    スナップショットから閲覧しない設定で、固定されたスナップショットもない場合は None を返す。
+    """
+    snapshot = load_snapshot(LEADERBOARD_SNAPSHOT_DIR, get_current_competition().id)
+    if snapshot is not None and snapshot.frozen:
+        return snapshot
+    if not LEADERBOARD_SNAPSHOT_ENABLED:
+        return None
+    # このプロセスでまだ書き出しを開始していなければ開始する
+    _get_snapshot_publisher()
+    # まだ書き出されていない場合は、データストアから直接閲覧する
+    return snapshot
+
+
+def _get_ranked_snapshot(
+    final: bool,
+) -> Optional[Tuple[LeaderboardSnapshot, RankedLeaderboard]]:
+    """
+    閲覧に使用するスナップショットと、その順位付け済みのリーダーボードの取得。
+    final が True で最終投稿を選択する場合は、最終投稿のみで順位付けしたリーダーボードを返す
+    （それを含まない古いスナップショットの場合は None を返し、データストアから閲覧する）。
+    """
+    snapshot = get_leaderboard_snapshot()
+    if snapshot is None:
+        return None
+    if final and _final_only_column():
+        if snapshot.final_ranked is None:
+            return None
+        return snapshot, snapshot.final_ranked
+    return snapshot, snapshot.ranked
+
+
+def get_leaderboard_version(final: bool = False) -> int:
+    """
+    リーダーボードのバージョン（更新されるたびに増える値）の取得。
+    final が True で最終投稿を選択する場合は、最終投稿のみのリーダーボードのバージョンを返す。
+    """
+    ranked_snapshot = _get_ranked_snapshot(final)
+    if ranked_snapshot is not None:
+        snapshot, _ = ranked_snapshot
+        return snapshot.version
     data_store = get_data_store()
-    data_store.write_submission(
+    return data_store.leaderboard_version(LEADERBOARD_HEADER)
+
+
+def read_leaderboard_scores(final: bool = False) -> pd.DataFrame:
+    """
+    スコア分布のグラフと順位の変動の分析に必要な列（スコアと、保存した予測値を特定するキーの列）のみの読み込み。
+    final が True で最終投稿を選択する場合は、ユーザーごとに最終投稿の中で最良の投稿のみを読み込む。
+    """
+    columns = SUBMISSION_KEY_COLUMNS + ["public_score", "private_score"]
+    final_only_column = _final_only_column() if final else None
+    ranked_snapshot = _get_ranked_snapshot(final)
+    if ranked_snapshot is not None:
+        _, ranked = ranked_snapshot
+        df = ranked.df[columns].copy()
+    else:
+        data_store = get_data_store()
+        df = data_store.read_leaderboard_columns(
+            LEADERBOARD_HEADER,
+            columns,
+            latest_only_column=_latest_only_column(),
+            final_only_column=final_only_column,
+            ascending=get_current_competition().leaderboard_sort_ascending,
+        )
+    # データ型の変換
+    df["public_score"] = pd.to_numeric(df["public_score"], errors="coerce")
+    df["private_score"] = pd.to_numeric(df["private_score"], errors="coerce")
+    return df
+
+
+def read_leaderboard_page(
+    sort_column: str,
+    offset: int,
+    limit: int,
+    filters: Optional[Dict[str, str]] = None,
+    username_contains: Optional[str] = None,
+    final: bool = False,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    リーダーボードのうち1ページ分（順位付き）と、絞り込み後の総行数の読み込み。
+    final が True で最終投稿を選択する場合は、ユーザーごとに最終投稿の中で最良の投稿のみで順位付けする。
+    """
+    final_only_column = _final_only_column() if final else None
+    ranked_snapshot = _get_ranked_snapshot(final)
+    if ranked_snapshot is not None:
+        _, ranked = ranked_snapshot
+        df, total = ranked.page(
+            sort_column, offset, limit, filters, username_contains
+        )
+    else:
+        data_store = get_data_store()
+        df, total = data_store.read_leaderboard_page(
+            LEADERBOARD_HEADER,
+            sort_column=sort_column,
+            ascending=get_current_competition().leaderboard_sort_ascending,
+            offset=offset,
+            limit=limit,
+            filters=filters,
+            username_contains=username_contains,
+            latest_only_column=_latest_only_column(),
+            final_only_column=final_only_column,
+        )
+    # データ型の変換
+    if "public_score" in df.columns:
+        df["public_score"] = pd.to_numeric(df["public_score"], errors="coerce")
+    if "private_score" in df.columns:
+        df["private_score"] = pd.to_numeric(df["private_score"], errors="coerce")
+    return df, total
+
+
+_score_indexes: Dict[str, ScoreIndex] = {}
+_score_indexes_lock = threading.Lock()
+
+
+def _get_score_index(competition: Competition, submission_id: str) -> ScoreIndex:
+    """
+    コンペティションごとのスコアの索引の取得。
+    索引がない場合や SCORE_INDEX_REFRESH_SECONDS 以上前に作成した場合は、データストアから作成し直す
+    （投稿ごとにバージョンを確認して作成し直すと、複数のプロセスで運用する場合にほとんどの投稿で
+    リーダーボード全体を読み込むことになるため、他のプロセスからの投稿の反映は一定の間隔に留める）。
+    作成し直す時点で書き込み済みの投稿 submission_id は、呼び出し側で追加するため索引から除く。
+    他のプロセスからの投稿が反映されていない間の順位は、おおよその順位になる。
+    """
+    index = _score_indexes.get(competition.id)
+    if index is None or time.monotonic() - index.built_at >= SCORE_INDEX_REFRESH_SECONDS:
+        with _score_indexes_lock:
+            index = _score_indexes.get(competition.id)
+            if index is None or time.monotonic() - index.built_at >= SCORE_INDEX_REFRESH_SECONDS:
+                owner_column = _owner_column()
+                df = get_data_store(competition).read_leaderboard_columns(
+                    LEADERBOARD_HEADER,
+                    [owner_column, "submission_time", "submission_id"] + SCORE_COLUMNS,
+                )
+                if submission_id:
+                    df = df[df["submission_id"].fillna("").astype(str) != submission_id]
+                index = ScoreIndex(
+                    df,
+                    competition.leaderboard_sort_ascending,
+                    owner_column,
+                    latest_only=_latest_only_column(competition) is not None,
+                )
+                _score_indexes[competition.id] = index
+    return index
+
+
+def _invalidate_score_index(competition: Competition) -> None:
+    """再採点などでスコアが変わった場合に、次の投稿時に索引を作成し直すようにする。"""
+    with _score_indexes_lock:
+        _score_indexes.pop(competition.id, None)
+
+
+def read_score_progression(max_users: int = PROGRESSION_MAX_USERS) -> pd.DataFrame:
+    """
+    Public スコアの自己ベストの推移の読み込み（自己ベストの上位 max_users 人、ユーザーごとに間引き済み）。
+    username 列は各ユーザーの最新のユーザー名、submission_time 列は日本時間の datetime。
+    """
+    ascending = get_current_competition().leaderboard_sort_ascending
+    owner_column = _owner_column()
+    progression = get_data_store().read_score_progression(
+        LEADERBOARD_HEADER, owner_column, ascending
+    )
+    final_best = progression.groupby(owner_column, sort=False)["best_score"].last()
+    top = final_best.sort_values(ascending=ascending, kind="stable").head(max_users)
+    progression = progression[progression[owner_column].isin(top.index)]
+    progression = downsample_progression(progression, owner_column)
+    progression["username"] = progression.groupby(owner_column)["username"].transform("last")
+    progression["submission_time"] = parse_submission_time(progression["submission_time"])
+    return progression
+
+
+def write_submission(submission_data: Dict) -> Optional[Dict[str, Any]]:
+    """
+    リーダーボードに新しい投稿を書き込み、スコアの索引からその投稿の順位を返す。
+    戻り値は ScoreIndex.add を参照。順位の計算は書き込み後の補助的な処理のため、
+    索引の作成などに失敗した場合は投稿を失敗させず、None を返す。
+    """
+    competition = get_current_competition()
+    get_data_store().write_submission(
         submission_data,
         LEADERBOARD_HEADER,
     )
+    try:
+        index = _get_score_index(competition, str(submission_data.get("submission_id") or ""))
+        return index.add(str(submission_data.get(_owner_column()) or ""), submission_data)
+    except Exception as e:
+        print(f"An error occurred while computing the submission standing: {e}")
+        return None
+
+
+# --- Final Submission Selection Functions ---
+def read_own_submissions(owner: str) -> pd.DataFrame:
+    """ユーザー（_owner_column の値が owner）の全投稿を、Publicスコアの順位付きで読み込む"""
+    data_store = get_data_store()
+    ascending = get_current_competition().leaderboard_sort_ascending
+    filters = {_owner_column(): owner}
+    _, total = data_store.read_leaderboard_page(
+        LEADERBOARD_HEADER, "public_score", ascending, offset=0, limit=1, filters=filters
+    )
+    df, _ = data_store.read_leaderboard_page(
+        LEADERBOARD_HEADER,
+        "public_score",
+        ascending,
+        offset=0,
+        limit=max(total, 1),
+        filters=filters,
+    )
+    df["public_score"] = pd.to_numeric(df["public_score"], errors="coerce")
+    df["private_score"] = pd.to_numeric(df["private_score"], errors="coerce")
+    return df
+
+
+def read_final_selections(owner: str) -> pd.DataFrame:
+    """ユーザーが最終投稿として選択した投稿のキーの読み込み"""
+    selections = get_data_store().read_final_selections()
+    return selections[selections[_owner_column()] == owner].reset_index(drop=True)
+
+
+def write_final_selections(owner: str, selected: pd.DataFrame) -> None:
+    """
+    ユーザーの最終投稿の選択を、selected（キーの列を含むリーダーボードの行）で置き換える。
+    コンペティション終了後や、選択できる件数を超えた場合は ValueError を送出する。
+    """
+    competition = get_current_competition()
+    if competition.final_submission_limit <= 0:
+        raise ValueError("このコンペティションでは最終投稿を選択しません。")
+    if not competition.is_running:
+        raise ValueError("コンペティション終了後は最終投稿を変更できません。")
+    if len(selected) > competition.final_submission_limit:
+        raise ValueError(
+            f"最終投稿として選択できるのは {competition.final_submission_limit} 件までです。"
+        )
+    selections = normalize_keys(selected)
+    if (selections[_owner_column()] != owner).any():
+        raise ValueError("自分の投稿のみ選択できます。")
+    selections["selected_at"] = pd.Timestamp.now(tz="Asia/Tokyo").strftime(
+        "%Y-%m-%d %H:%M:%S%z"
+    )
+    get_data_store().write_final_selections(_owner_column(), owner, selections)
+
+
+# --- Submission Archive and Rescoring Functions ---
+_submission_archives: Dict[str, SubmissionArchive] = {}
+
+
+def get_submission_archive(competition: Optional[Competition] = None) -> SubmissionArchive:
+    """コンペティションごとの、投稿された予測値の保存先の取得"""
+    competition = competition or get_current_competition()
+    archive = _submission_archives.get(competition.id)
+    if archive is None:
+        archive = SubmissionArchive(os.path.join(SUBMISSION_ARCHIVE_DIR, competition.id))
+        _submission_archives[competition.id] = archive
+    return archive
+
+
+def archive_submission(submission_df: pd.DataFrame, submission_data: Dict) -> None:
+    """
+    投稿された予測値の保存（SUBMISSION_ARCHIVE_ENABLED が False の場合は何もしない）。
+    保存に失敗しても投稿は完了しているため、エラーは表示せずにログに出力する。
+    """
+    if not SUBMISSION_ARCHIVE_ENABLED:
+        return
+    try:
+        get_submission_archive().save(submission_data, submission_df)
+    except Exception as e:
+        print(f"An error occurred while archiving the submission: {e}")
+
+
+def read_submission_losses(rows: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    リーダーボードの行（キーの列を含む）ごとに、保存した予測値から正解データの行ごとの損失を計算する。
+    スコアの列名（public_score / private_score）-> 行数 x 正解データの行数 の配列を返す。
+    予測値が保存されていない行は NaN とする。行ごとの損失が定義されていない場合や、
+    予測値が1件も保存されていない場合は空の辞書を返す。
+    """
+    competition = get_current_competition()
+    if competition.score_rows is None:
+        return {}
+    archive = get_submission_archive(competition)
+    digests = archive.lookup(rows)
+    if digests.isna().all():
+        return {}
+    ground_truth = read_ground_truth()
+    usages = {"public_score": "Public", "private_score": "Private"}
+    # 同じ内容の投稿（ハッシュ値が同じ）は1回だけ計算する
+    per_digest: Dict[str, Dict[str, np.ndarray]] = {}
+    for digest in digests.dropna().unique():
+        try:
+            row_losses = competition.score_rows(archive.load(digest), ground_truth)
+        except Exception as e:
+            print(f"An error occurred while scoring archived predictions {digest}: {e}")
+            continue
+        per_digest[digest] = {
+            column: row_losses.loc[row_losses["Usage"] == usage, "loss"].to_numpy(float)
+            for column, usage in usages.items()
+        }
+    if not per_digest:
+        return {}
+    losses = {}
+    for column in usages:
+        n_rows = max(len(values[column]) for values in per_digest.values())
+        missing = np.full(n_rows, np.nan)
+        losses[column] = np.vstack(
+            [
+                per_digest[d][column]
+                if d in per_digest and len(per_digest[d][column]) == n_rows
+                else missing
+                for d in digests
+            ]
+        )
+    return losses
+
+
+def rescore_all_submissions(
+    competition: Optional[Competition] = None, progress=None
+) -> pd.DataFrame:
+    """
+    データストアの最新の正解データと評価関数で、保存済みの全投稿を再採点する。
+    リーダーボードの現在のスコアと突き合わせた DataFrame（compare_scores の戻り値）を返す。
+    """
+    competition = competition or get_current_competition()
+    ground_truth = _load_ground_truth(competition)
+    shared = None
+    if SHARED_GROUND_TRUTH_ENABLED:
+        # 各プロセスが共有メモリから正解データを参照できるよう、最新の正解データを公開しておく
+        publish_ground_truth(ground_truth, SHARED_GROUND_TRUTH_DIR, competition.id)
+        shared = (SHARED_GROUND_TRUTH_DIR, competition.id)
+    rescored = rescore_submissions(
+        get_submission_archive(competition),
+        competition.score_submission,
+        ground_truth,
+        shared_ground_truth=shared,
+        max_workers=RESCORE_MAX_WORKERS,
+        progress=progress,
+    )
+    leaderboard_df = get_data_store(competition).read_leaderboard(LEADERBOARD_HEADER)
+    return compare_scores(leaderboard_df, rescored)
+
+
+def write_rescored_scores(
+    rescored: pd.DataFrame, competition: Optional[Competition] = None
+) -> int:
+    """
+    再採点したスコアのうち、採点に成功してスコアが変わった行をデータストアにまとめて書き戻す。
+    書き戻した行数を返す。スナップショットから閲覧している場合は、スナップショットも書き出し直す。
+    """
+    competition = competition or get_current_competition()
+    updates = rescored[(rescored["error"] == "") & rescored["changed"]]
+    if updates.empty:
+        return 0
+    get_data_store(competition).update_scores(LEADERBOARD_HEADER, updates)
+    _invalidate_score_index(competition)
+    if LEADERBOARD_SNAPSHOT_ENABLED:
+        # update_scores でバージョンが進むため、定期的な書き出しを待たずにここで書き出す
+        # （固定されたスナップショットは publish_leaderboard_snapshot で更新しない）
+        publish_leaderboard_snapshot(competition)
+    return len(updates)
 
 
 # --- Leaderboard Filtering ---
 def filter_leaderboard(leaderboard_df: pd.DataFrame) -> pd.DataFrame:
     """リーダーボードを表示するときのフィルタ"""
-    df = leaderboard_df.copy()
+    df = leaderboard_df
 
     if "submission_time" in df.columns:
-        # submission_timeをdatetimeオブジェクトに変換
-        # タイムゾーン情報がない場合はUTCとして解釈
-        df["submission_time"] = pd.to_datetime(
-            df["submission_time"], errors="coerce", utc=True
-        )
-
-        # 日本時間 (Asia/Tokyo) に変換
-        df["submission_time"] = df["submission_time"].dt.tz_convert("Asia/Tokyo")
+        # submission_timeを日本時間 (Asia/Tokyo) のdatetimeに変換
+        # （順位付け済みのリーダーボードでは変換済みのため、変換は行われない）
+        df = df.assign(submission_time=parse_submission_time(df["submission_time"]))
 
     return df
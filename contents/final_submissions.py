@@ -0,0 +1,90 @@
+import streamlit as st
+
+from competitions import get_current_competition
+from config import (
+    AUTH,
+    filter_leaderboard,
+    read_final_selections,
+    read_own_submissions,
+    write_final_selections,
+)
+from submission_archive import SUBMISSION_KEY_COLUMNS, normalize_keys
+from utils import page_config, check_password, hash_email
+
+page_config()
+
+st.title(":material/flag: 最終投稿の選択")
+
+# 認証チェック
+check_password(always_protect=True)
+
+
+def show_final_selection() -> None:
+    competition = get_current_competition()
+    limit = competition.final_submission_limit
+    if limit <= 0:
+        st.info(
+            "このコンペティションでは最終投稿を選択しません。Privateリーダーボードには全ての投稿が表示されます。"
+        )
+        return
+
+    st.write(
+        f"Privateリーダーボードの順位に使用する投稿を、最大 {limit} 件選択してください。"
+        "選択した投稿の中で Private スコアが最も良い投稿が、最終的な順位になります。"
+        "選択しなかった場合は、Public スコアが最も良い投稿が使用されます。"
+    )
+
+    if AUTH:
+        owner = hash_email(st.user.email)
+    else:
+        owner = st.text_input("ユーザー名", icon=":material/person:")
+        if not owner:
+            st.info("ユーザー名を入力すると、そのユーザーの投稿が表示されます。")
+            return
+
+    submissions = read_own_submissions(owner)
+    if submissions.empty:
+        st.info("まだ投稿がありません。")
+        return
+
+    selected_keys = set(
+        read_final_selections(owner)[SUBMISSION_KEY_COLUMNS].itertuples(
+            index=False, name=None
+        )
+    )
+    keys = normalize_keys(submissions)[SUBMISSION_KEY_COLUMNS]
+    table = submissions.drop(columns=["email_hash", "submission_id"]).rename(columns={"rank": "暫定順位"})
+    if competition.is_running:
+        table = table.drop(columns=["private_score"])
+    table.insert(
+        0,
+        "final",
+        [key in selected_keys for key in keys.itertuples(index=False, name=None)],
+    )
+
+    edited = st.data_editor(
+        filter_leaderboard(table),
+        hide_index=True,
+        # コンペティション終了後は選択を変更できない
+        disabled=[c for c in table.columns if c != "final" or not competition.is_running],
+        column_config={"final": st.column_config.CheckboxColumn("最終投稿")},
+        key=f"{competition.id}_final_submissions",
+    )
+    if not competition.is_running:
+        st.info("コンペティションは終了しました。最終投稿は変更できません。")
+        return
+
+    n_selected = int(edited["final"].sum())
+    if n_selected > limit:
+        st.warning(f"最終投稿として選択できるのは {limit} 件までです（{n_selected} 件選択中）。")
+    if st.button(
+        "最終投稿を保存", icon=":material/save:", disabled=n_selected > limit
+    ):
+        try:
+            write_final_selections(owner, submissions[edited["final"].to_numpy()])
+            st.success(f"{n_selected} 件の投稿を最終投稿として保存しました。")
+        except Exception as e:
+            st.error(f"最終投稿の保存中にエラーが発生しました: {e}")
+
+
+show_final_selection()
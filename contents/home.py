@@ -1,6 +1,6 @@
 import streamlit as st
-import os
-from config import HOME_CONTENT_FILE
+from caching import read_text_file
+from competitions import get_current_competition
 from utils import page_config, check_password
 
 page_config()
@@ -13,15 +13,16 @@ check_password()
 
 def show_home_content():
     """ホーム画面のコンテンツを表示する"""
-    if os.path.exists(HOME_CONTENT_FILE):
-        with open(HOME_CONTENT_FILE, encoding="utf-8") as f:
-            content = f.read()
+    home_content_file = get_current_competition().home_content_file
+    # ファイルが更新されない限りキャッシュから読み込む
+    content = read_text_file(home_content_file)
+    if content is not None:
         st.markdown(content)
     else:
         st.title(":material/trophy: 内輪向け機械学習コンペアプリ")
         st.write("サイドバーから、各ページに移動できます。")
         st.error(
-            f"Home表示内容カスタマイズ用ファイル（{HOME_CONTENT_FILE}）が見つかりません)"
+            f"Home表示内容カスタマイズ用ファイル（{home_content_file}）が見つかりません)"
         )
 
 
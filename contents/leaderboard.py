@@ -1,19 +1,48 @@
+import datetime
+import math
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo
+
+import pandas as pd
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
 
 from config import (
     AUTH,
-    LEADERBOARD_SHOW_LATEST_ONLY,
-    LEADERBOARD_SORT_ASCENDING,
+    LEADERBOARD_PAGE_SIZE_OPTIONS,
+    LEADERBOARD_REFRESH_SECONDS,
     filter_leaderboard,
-    read_leaderboard,
+    get_ground_truth_version,
+    get_leaderboard_snapshot,
+    get_leaderboard_version,
+    read_leaderboard_page,
+    read_leaderboard_scores,
+    read_score_progression,
+    read_submission_losses,
 )
-from config import (
-    IS_COMPETITION_RUNNING,
-    DATA_STORE_TYPE,
+from config import DATA_STORE_TYPE
+from competitions import get_current_competition
+from utils import (
+    page_config,
+    check_password,
+    hash_email,
+    show_register_ground_truth_message,
 )
-from utils import page_config, check_password, show_register_ground_truth_message
 from data_store import get_data_store
+from leaderboard_analysis import (
+    BOOTSTRAP_MAX_SUBMISSIONS,
+    analysis_cache,
+    build_leaderboard_analysis,
+)
+from leaderboard_stats import (
+    PROGRESSION_MAX_USERS,
+    build_score_summary,
+    progression_cache,
+    score_summary_cache,
+)
+
+JST = ZoneInfo("Asia/Tokyo")
 
 page_config()
 
@@ -23,6 +52,361 @@ st.title(":material/leaderboard: リーダーボード")
 check_password(always_protect=True)
 
 
+def histogram_figure(histograms: Dict[str, Dict], title: str) -> go.Figure:
+    """事前に集計したビンごとの件数から、ヒストグラムを棒グラフとして描画する"""
+    fig = go.Figure()
+    for name, hist in histograms.items():
+        fig.add_trace(
+            go.Bar(
+                x=hist["centers"],
+                y=hist["counts"],
+                width=hist["widths"],
+                name=name,
+                opacity=0.75 if len(histograms) > 1 else 1.0,
+            )
+        )
+    fig.update_layout(
+        title=title,
+        barmode="overlay",
+        bargap=0,
+        xaxis_title="Score",
+        yaxis_title="人数",
+        showlegend=len(histograms) > 1,
+    )
+    return fig
+
+
+def _reset_page(key: str) -> None:
+    st.session_state[f"{key}_page"] = 1
+
+
+def _jump_to_my_rank(key: str, sort_column: str, final: bool) -> None:
+    """自分（またはユーザー名で指定したユーザー）の最高順位が含まれるページに移動する"""
+    if AUTH:
+        filters = {"email_hash": hash_email(st.user.email)}
+    else:
+        filters = {"username": st.session_state[f"{key}_search"]}
+    # 順位順に並んでいるため、先頭の1件がそのユーザーの最高順位
+    df, total = read_leaderboard_page(
+        sort_column, offset=0, limit=1, filters=filters, final=final
+    )
+    if total == 0:
+        st.session_state[f"{key}_jump_error"] = True
+        return
+
+    page_size = st.session_state[f"{key}_page_size"]
+    st.session_state[f"{key}_page"] = (int(df["rank"].iloc[0]) - 1) // page_size + 1
+    st.session_state[f"{key}_search"] = ""
+
+
+def _read_page(
+    key: str,
+    sort_column: str,
+    offset: int,
+    limit: int,
+    username_query: str,
+    final: bool,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    表示するページを読み込む。読み込んだページはセッションに保持し、
+    リーダーボードのバージョンと表示条件が変わっていなければ、データストアから読み込み直さない。
+    """
+    params = (
+        get_leaderboard_version(final),
+        sort_column,
+        offset,
+        limit,
+        username_query,
+        final,
+    )
+    page_data_key = f"{key}_page_data"
+    cached = st.session_state.get(page_data_key)
+    if cached is not None and cached[0] == params:
+        return cached[1], cached[2]
+    df, total = read_leaderboard_page(
+        sort_column,
+        offset=offset,
+        limit=limit,
+        username_contains=username_query or None,
+        final=final,
+    )
+    st.session_state[page_data_key] = (params, df, total)
+    return df, total
+
+
+@st.fragment(run_every=LEADERBOARD_REFRESH_SECONDS)
+def show_leaderboard_table(
+    sort_column: str,
+    rank_label: str,
+    hidden_columns: List[str],
+    key: str,
+    final: bool = False,
+) -> None:
+    """
+    順位付きのリーダーボードを、表示するページの分だけデータストアから取得して表示する。
+    final が True の場合は、ユーザーごとに最終投稿の中で最良の投稿のみで順位付けする。
+    LEADERBOARD_REFRESH_SECONDS ごとに自動で再実行されるが、
+    リーダーボードのバージョンが変わっていなければデータストアからは読み込み直さない。
+    """
+    page_key = f"{key}_page"
+    search_key = f"{key}_search"
+
+    col_size, col_search, col_jump = st.columns([1, 2, 1], vertical_alignment="bottom")
+    page_size = col_size.selectbox(
+        "表示件数",
+        LEADERBOARD_PAGE_SIZE_OPTIONS,
+        key=f"{key}_page_size",
+        on_change=_reset_page,
+        args=(key,),
+    )
+    username_query = col_search.text_input(
+        "ユーザー名で検索",
+        key=search_key,
+        icon=":material/search:",
+        on_change=_reset_page,
+        args=(key,),
+    )
+    col_jump.button(
+        "自分の順位へ移動",
+        icon=":material/my_location:",
+        key=f"{key}_jump",
+        on_click=_jump_to_my_rank,
+        args=(key, sort_column, final),
+        disabled=not AUTH and not username_query,
+        help=None if AUTH else "検索欄に入力したユーザー名の最高順位のページへ移動します。",
+    )
+    if st.session_state.pop(f"{key}_jump_error", False):
+        st.warning("該当するユーザーの投稿が見つかりませんでした。")
+
+    page = st.session_state.get(page_key, 1)
+    df, total = _read_page(
+        key, sort_column, (page - 1) * page_size, page_size, username_query, final
+    )
+    n_pages = max(1, math.ceil(total / page_size))
+    if page > n_pages:
+        # 投稿の絞り込みなどでページ数が減った場合は最終ページを表示する
+        page = n_pages
+        df, total = _read_page(
+            key, sort_column, (page - 1) * page_size, page_size, username_query, final
+        )
+    st.session_state[page_key] = page
+
+    df = df.drop(columns=hidden_columns, errors="ignore").rename(
+        columns={"rank": rank_label}
+    )
+    st.dataframe(filter_leaderboard(df), hide_index=True)
+
+    col_page, col_info = st.columns([1, 3], vertical_alignment="bottom")
+    col_page.number_input("ページ", min_value=1, max_value=n_pages, key=page_key)
+    if total > 0:
+        start = (page - 1) * page_size + 1
+        end = min(page * page_size, total)
+        col_info.caption(f"{total} 件中 {start}〜{end} 件目（{n_pages} ページ）")
+
+
+def show_public_leaderboard(summary: Dict) -> None:
+    st.header(":material/table: Public Leaderboard")
+    # Publicスコアでのリーダーボード（コンペ中・終了後にかかわらず表示）
+    show_leaderboard_table(
+        "public_score",
+        rank_label="暫定順位",
+        hidden_columns=["email_hash", "private_score", "submission_id"],
+        key=f"{get_current_competition().id}_public",
+    )
+
+    st.subheader(":material/bar_chart: スコア分布")
+    st.plotly_chart(
+        histogram_figure(
+            {"public_score": summary["public_histogram"]},
+            title="Public Score の分布",
+        ),
+        width="stretch",
+    )
+
+    show_score_progression()
+
+
+def show_score_progression() -> None:
+    """自己ベストの上位のユーザーについて、Public スコアの自己ベストの推移を表示する。"""
+    st.subheader(":material/show_chart: スコアの推移")
+    competition = get_current_competition()
+    # 推移（コンペティションとリーダーボードのバージョンごとにキャッシュ）
+    progression = progression_cache.get(
+        (competition.id, get_leaderboard_version()), read_score_progression
+    )
+    if progression.empty:
+        st.info("Publicスコアのある投稿がありません。")
+        return
+    fig = px.line(
+        progression,
+        x="submission_time",
+        y="best_score",
+        color="username",
+        line_shape="hv",
+        markers=True,
+        title="Public Score の自己ベストの推移",
+        labels={
+            "submission_time": "投稿時刻",
+            "best_score": "Public Score（自己ベスト）",
+            "username": "ユーザー名",
+        },
+    )
+    st.plotly_chart(fig, width="stretch")
+    st.caption(
+        f"自己ベストの上位{PROGRESSION_MAX_USERS}人について、自己ベストを更新した投稿を表示しています。"
+    )
+
+
+def show_private_leaderboard(summary: Dict) -> None:
+    if get_current_competition().is_running:
+        st.info("Privateリーダーボードは、コンペティション終了後に公開されます。")
+        return
+
+    st.header(":material/table: Private Leaderboard")
+    # Privateスコアでのリーダーボード（最終投稿を選択する場合は、ユーザーごとに最良の最終投稿のみ）
+    show_leaderboard_table(
+        "private_score",
+        rank_label="順位",
+        hidden_columns=["email_hash", "submission_id"],
+        key=f"{get_current_competition().id}_private",
+        final=True,
+    )
+    if get_current_competition().final_submission_limit > 0:
+        st.caption(
+            "各ユーザーが最終投稿として選択した投稿の中で、Private スコアが最も良い投稿で順位付けしています"
+            "（選択していないユーザーは、Public スコアが最も良い投稿）。"
+        )
+
+    st.subheader(":material/scatter_plot: Public vs Private スコア")
+    scatter_df = summary["scatter"]
+    fig_scatter = px.scatter(
+        scatter_df,
+        x="public_score",
+        y="private_score",
+        title="Public Score vs Private Score",
+        labels={
+            "public_score": "Public Score",
+            "private_score": "Private Score",
+        },
+        hover_data=["username"] if not AUTH else [],
+    )
+    st.plotly_chart(fig_scatter, width="stretch")
+    if len(scatter_df) < summary["n_submissions"]:
+        st.caption(
+            f"{summary['n_submissions']} 件の投稿のうち、分布を保つように間引いた "
+            f"{len(scatter_df)} 件を表示しています。"
+        )
+
+    st.subheader(":material/bar_chart: スコア分布")
+    st.plotly_chart(
+        histogram_figure(summary["overlay_histograms"], title="スコア分布"),
+        width="stretch",
+    )
+
+    show_shake_up()
+
+
+SHAKE_UP_TABLE_ROWS = 100  # 順位の変動の表に表示する上位の件数
+
+
+def show_shake_up() -> None:
+    """Public から Private への順位の変動（シェイクアップ）と、スコアの信頼区間を表示する。"""
+    competition = get_current_competition()
+    st.subheader(":material/swap_vert: 順位の変動（シェイクアップ）")
+    # 分析結果（コンペティション、リーダーボードと正解データのバージョンごとにキャッシュ）
+    analysis = analysis_cache.get(
+        (competition.id, get_leaderboard_version(final=True), get_ground_truth_version()),
+        lambda: build_leaderboard_analysis(
+            read_leaderboard_scores(final=True),
+            competition.leaderboard_sort_ascending,
+            load_losses=read_submission_losses,
+            label_column=None if AUTH else "username",
+        ),
+    )
+    if analysis["n_submissions"] == 0:
+        st.info("投稿がありません。")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("順位相関（スピアマン）", f"{analysis['spearman']:.3f}")
+    col2.metric("平均の順位変動", f"{analysis['mean_abs_shift']:.1f}")
+    col3.metric("最大の上昇 / 下降", f"+{analysis['max_rise']} / -{analysis['max_fall']}")
+    col4.metric(
+        f"上位{analysis['top_k']}件の一致率", f"{analysis['top_k_overlap']:.0%}"
+    )
+
+    st.dataframe(
+        analysis["table"].head(SHAKE_UP_TABLE_ROWS),
+        hide_index=True,
+        column_config={
+            "username": "ユーザー名",
+            "private_rank": "順位",
+            "public_rank": "暫定順位",
+            "rank_shift": st.column_config.NumberColumn("順位変動", format="%+d"),
+            "public_score": "Public Score",
+            "private_score": "Private Score",
+            "public_score_lower": "Public 下限",
+            "public_score_upper": "Public 上限",
+            "private_score_lower": "Private 下限",
+            "private_score_upper": "Private 上限",
+            "win_probability": st.column_config.ProgressColumn(
+                "次の順位に勝つ確率", format="percent", min_value=0.0, max_value=1.0
+            ),
+        },
+    )
+    if analysis["has_intervals"]:
+        st.caption(
+            "下限・上限は正解データの行を再標本化したブートストラップによる95%信頼区間、"
+            "「次の順位に勝つ確率」は1つ下の順位の投稿より良いスコアになった再標本化の割合です。"
+            f"信頼区間は上位{BOOTSTRAP_MAX_SUBMISSIONS}件の、予測値が保存されている投稿のみ計算しています。"
+        )
+
+
+PUBLIC_VIEW_STR = ":material/public: Public"
+PRIVATE_VIEW_STR = ":material/social_leaderboard: Private"
+
+
+@st.fragment
+def show_leaderboard_view() -> None:
+    """
+    選択されたリーダーボード（Public / Private）のみを計算・描画する。
+    表示の切り替えやページ送りでは、このフラグメントのみが再実行される。
+    """
+    competition = get_current_competition()
+    default_view = PUBLIC_VIEW_STR if competition.is_running else PRIVATE_VIEW_STR
+    view = st.segmented_control(
+        "表示するリーダーボード",
+        [PUBLIC_VIEW_STR, PRIVATE_VIEW_STR],
+        default=default_view,
+        key=f"{competition.id}_leaderboard_view",
+        label_visibility="collapsed",
+    )
+    # 選択が解除された場合は既定の表示にする
+    view = view or default_view
+
+    # スコア分布のグラフ用の集計（コンペティションとリーダーボードのバージョンごとにキャッシュ）
+    version = get_leaderboard_version()
+    summary = score_summary_cache.get(
+        (competition.id, version),
+        lambda: build_score_summary(
+            read_leaderboard_scores(), label_column=None if AUTH else "username"
+        ),
+    )
+
+    snapshot = get_leaderboard_snapshot()
+    if snapshot is not None:
+        published_at = datetime.datetime.fromtimestamp(snapshot.published_at, JST)
+        st.caption(
+            f"{published_at:%Y-%m-%d %H:%M:%S} 時点のリーダーボードです。"
+            + ("（最終結果として固定されています）" if snapshot.frozen else "")
+        )
+
+    if view == PRIVATE_VIEW_STR:
+        show_private_leaderboard(summary)
+    else:
+        show_public_leaderboard(summary)
+
+
 def show_leaderboard() -> None:
     # データストアのタイプがDBベースの場合、ground_truthの存在チェック
     if DATA_STORE_TYPE != "google_sheet":
@@ -32,105 +416,12 @@ def show_leaderboard() -> None:
             st.stop()
 
     with st.spinner("読み込み中..."):
-        leaderboard = read_leaderboard()
-        if leaderboard.empty:
-            st.info("まだ投稿がありません。")
-            return
-
-        # 同一ユーザーの最新投稿のみ表示する場合
-        if LEADERBOARD_SHOW_LATEST_ONLY:
-            user_col = "email_hash" if AUTH else "username"
-            if (
-                user_col in leaderboard.columns
-                and "submission_time" in leaderboard.columns
-            ):
-                # submission_timeが新しい順にソートし、ユーザーごとに最初の行（最新の投稿）を残す
-                leaderboard = leaderboard.sort_values(
-                    "submission_time", ascending=False
-                ).drop_duplicates(subset=[user_col], keep="first")
-
-        PUBLIC_TAB_STR = ":material/public: Public"
-        PRIVATE_TAB_STR = ":material/social_leaderboard: Private"
-
-        default_tab = PUBLIC_TAB_STR if IS_COMPETITION_RUNNING else PRIVATE_TAB_STR
-        public_tab, private_tab = st.tabs(
-            [PUBLIC_TAB_STR, PRIVATE_TAB_STR], default=default_tab
-        )
+        _, total = read_leaderboard_page("public_score", offset=0, limit=1)
+    if total == 0:
+        st.info("まだ投稿がありません。")
+        return
 
-        with public_tab:
-            st.header(":material/table: Public Leaderboard")
-            # Publicスコアでのリーダーボード（コンペ中・終了後にかかわらず表示）
-            df_public = leaderboard.drop("email_hash", axis=1, errors="ignore")
-            if "private_score" in df_public.columns:
-                df_public = df_public.drop("private_score", axis=1)
-
-            df_public = df_public.sort_values(
-                by=["public_score", "submission_time"],
-                ascending=[LEADERBOARD_SORT_ASCENDING, True],
-            )
-            df_public = df_public.reset_index(drop=True)
-            df_public.index += 1
-            df_public.insert(0, "暫定順位", df_public.index)
-
-            st.dataframe(filter_leaderboard(df_public), hide_index=True)
-
-            st.subheader(":material/bar_chart: スコア分布")
-            fig_public = px.histogram(
-                df_public,
-                x="public_score",
-                nbins=20,
-                title="Public Score の分布",
-                labels={"public_score": "Public Score", "count": "人数"},
-            )
-            st.plotly_chart(fig_public, width="stretch")
-
-        with private_tab:
-            if IS_COMPETITION_RUNNING:
-                st.info(
-                    "Privateリーダーボードは、コンペティション終了後に公開されます。"
-                )
-            else:
-                st.header(":material/table: Private Leaderboard")
-                # Privateスコアでのリーダーボード
-                df_private = leaderboard.drop("email_hash", axis=1, errors="ignore")
-                df_private = df_private.sort_values(
-                    by=["private_score", "submission_time"],
-                    ascending=[LEADERBOARD_SORT_ASCENDING, True],
-                )
-                df_private = df_private.reset_index(drop=True)
-                df_private.index += 1
-                df_private.insert(0, "順位", df_private.index)
-
-                st.dataframe(filter_leaderboard(df_private), hide_index=True)
-
-                st.subheader(":material/scatter_plot: Public vs Private スコア")
-                fig_scatter = px.scatter(
-                    df_private,
-                    x="public_score",
-                    y="private_score",
-                    title="Public Score vs Private Score",
-                    labels={
-                        "public_score": "Public Score",
-                        "private_score": "Private Score",
-                    },
-                    hover_data=["username"] if not AUTH else [],
-                )
-                st.plotly_chart(fig_scatter, width="stretch")
-
-                st.subheader(":material/bar_chart: スコア分布")
-                score_df = df_private[["public_score", "private_score"]].melt(
-                    var_name="score_type", value_name="score"
-                )
-                fig_private = px.histogram(
-                    score_df,
-                    x="score",
-                    color="score_type",
-                    nbins=20,
-                    barmode="overlay",
-                    title="スコア分布",
-                    labels={"score": "Score", "count": "人数"},
-                )
-                st.plotly_chart(fig_private, width="stretch")
+    show_leaderboard_view()
 
 
 show_leaderboard()
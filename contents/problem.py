@@ -1,7 +1,21 @@
 import streamlit as st
 import os
 
-from config import DATA_DIR, PROBLEM_FILE
+from caching import read_text_file
+from competitions import Competition, get_current_competition
+from config import (
+    DATA_BUNDLE_BASE_URL,
+    DATA_BUNDLE_DIR,
+    DATA_BUNDLE_FILE_NAME,
+    DATA_DOWNLOAD_MAX_INLINE_SIZE,
+)
+from downloads import (
+    download_url,
+    ensure_bundle,
+    file_reader,
+    format_size,
+    list_data_files,
+)
 from utils import page_config, check_password
 
 page_config()
@@ -12,29 +26,89 @@ st.title(":material/menu_book: 概要・データ")
 check_password()
 
 
+def show_data_downloads(competition: Competition) -> None:
+    data_files = list_data_files(competition.data_dir)
+    if not data_files:
+        st.info("配布データはありません。")
+        return
+
+    for data_file in data_files:
+        label = f"{data_file.name} をダウンロード（{format_size(data_file.size)}）"
+        if competition.data_download_base_url:
+            # 配信用のURLから直接ダウンロードさせ、ファイルの中身はアプリで読み込まない
+            st.link_button(
+                label,
+                download_url(competition.data_download_base_url, data_file.name),
+                icon=":material/download:",
+            )
+        elif data_file.size <= DATA_DOWNLOAD_MAX_INLINE_SIZE:
+            # ファイルの中身はボタンが押されたときにだけ読み込む
+            st.download_button(
+                label,
+                file_reader(data_file),
+                file_name=data_file.name,
+                mime=data_file.mime,
+                icon=":material/download:",
+                on_click="ignore",
+            )
+        else:
+            st.warning(
+                f"{data_file.name}（{format_size(data_file.size)}）はサイズが大きいため、"
+                "このページからはダウンロードできません。運営者にお問い合わせください。"
+            )
+
+    # すべてのデータファイルをまとめたzip
+    bundle_path = ensure_bundle(
+        data_files,
+        os.path.join(DATA_BUNDLE_DIR, competition.id),
+        DATA_BUNDLE_FILE_NAME,
+    )
+    if bundle_path is None:
+        st.caption(
+            "すべてのデータをまとめたzipファイルを準備中です。"
+            "しばらくしてからページを再読み込みしてください。"
+        )
+    else:
+        bundle_size = os.path.getsize(bundle_path)
+        label = f"すべてのデータをまとめてダウンロード（zip, {format_size(bundle_size)}）"
+        if DATA_BUNDLE_BASE_URL:
+            st.link_button(
+                label,
+                download_url(DATA_BUNDLE_BASE_URL, competition.id, bundle_path.name),
+                icon=":material/folder_zip:",
+            )
+        elif bundle_size <= DATA_DOWNLOAD_MAX_INLINE_SIZE:
+            st.download_button(
+                label,
+                lambda: bundle_path.read_bytes(),
+                file_name=DATA_BUNDLE_FILE_NAME,
+                mime="application/zip",
+                icon=":material/folder_zip:",
+                on_click="ignore",
+            )
+        else:
+            st.caption(
+                f"すべてのデータをまとめたzipファイル（{format_size(bundle_size)}）は"
+                "サイズが大きいため、このページからはダウンロードできません。"
+            )
+
+
 def show_overview_and_data() -> None:
+    competition = get_current_competition()
+
     # 問題説明
     st.header(":material/description: 問題説明")
-    if os.path.exists(PROBLEM_FILE):
-        with open(PROBLEM_FILE, "r", encoding="utf-8") as f:
-            problem_md = f.read()
+    # ファイルが更新されない限りキャッシュから読み込む
+    problem_md = read_text_file(competition.problem_file)
+    if problem_md is not None:
         st.markdown(problem_md)
     else:
-        st.error(f"問題説明ファイル（{PROBLEM_FILE}）が見つかりません。")
+        st.error(f"問題説明ファイル（{competition.problem_file}）が見つかりません。")
 
     # データダウンロード
     st.header(":material/data_table: データダウンロード")
-    if os.path.exists(DATA_DIR):
-        for filename in os.listdir(DATA_DIR):
-            filepath = os.path.join(DATA_DIR, filename)
-            if os.path.isfile(filepath):
-                with open(filepath, "rb") as f:
-                    st.download_button(
-                        f"{filename} をダウンロード",
-                        f,
-                        file_name=filename,
-                        icon=":material/download:",
-                    )
+    if os.path.exists(competition.data_dir):
+        show_data_downloads(competition)
     else:
         st.error("データフォルダが見つかりません。")
 
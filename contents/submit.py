@@ -1,25 +1,23 @@
 import streamlit as st
 import pandas as pd
 import datetime
-import hashlib
-from typing import Dict
+import uuid
+from typing import Any, Dict
 from zoneinfo import ZoneInfo
 
+from competitions import get_current_competition
 from config import (
-    EMAIL_HASH_SALT,
-    SAMPLE_SUBMISSION_FILE,
     SUBMISSION_ADDITIONAL_INFO,
+    archive_submission,
     read_ground_truth,
-    score_submission,
+    request_leaderboard_snapshot,
     write_submission,
 )
-from config import (
-    IS_COMPETITION_RUNNING,
-    AUTH,
-    EMAIL_HASH_SALT,
-)
-from utils import page_config, check_password
+from config import AUTH
+from utils import page_config, check_password, hash_email
 from data_store import get_data_store
+from submission_validation import load_submission_spec, validate_submission
+import metrics
 
 JST = ZoneInfo("Asia/Tokyo")
 
@@ -51,7 +49,17 @@ def render_additional_inputs() -> Dict:
     return additional_data
 
 
+def format_rank(standing: Dict[str, Any]) -> str:
+    """順位と上位何%かを表示用の文字列にする（スコアの欠損は空文字列）"""
+    if standing["rank"] is None:
+        return ""
+    return (
+        f"（{standing['total']} 件中 {standing['rank']} 位、上位 {standing['percentile']:.1f}%）"
+    )
+
+
 def show_submission() -> None:
+    competition = get_current_competition()
     username = st.text_input("ユーザー名", icon=":material/person:")
 
     # 追加の入力欄を動的に生成
@@ -80,23 +88,31 @@ def show_submission() -> None:
             with st.spinner("投稿を処理中..."):
                 try:
                     submission_df = pd.read_csv(uploaded_file)
-                    sample_df = pd.read_csv(SAMPLE_SUBMISSION_FILE)
-                    ground_truth_df = read_ground_truth()
-
-                    if list(submission_df.columns) != list(sample_df.columns):
-                        st.error("カラムが期待する形と一致していません。")
-                    elif len(submission_df) != len(sample_df):
-                        st.error("行数が期待する形と一致していません。")
+                    spec = load_submission_spec(competition.sample_submission_file)
+                    if spec is None:
+                        raise FileNotFoundError(competition.sample_submission_file)
+
+                    # スコア計算の前に投稿ファイルを検証し、問題があれば差し戻す
+                    with metrics.timed("validate_submission"):
+                        error = validate_submission(submission_df, spec)
+                    if error is not None:
+                        st.error(error.message)
+                        if error.rows is not None:
+                            st.dataframe(error.rows, hide_index=True)
                     else:
-                        public_score, private_score = score_submission(
-                            submission_df, ground_truth_df
-                        )
+                        ground_truth_df = read_ground_truth()
+                        metrics.add_gauge("scoring_in_flight", 1)
+                        try:
+                            with metrics.timed("score_submission"):
+                                public_score, private_score = competition.score_submission(
+                                    submission_df, ground_truth_df
+                                )
+                        finally:
+                            metrics.add_gauge("scoring_in_flight", -1)
 
                         # emailをハッシュ化 (saltを使用)
                         if AUTH:
-                            email_hash = hashlib.sha256(
-                                (email + EMAIL_HASH_SALT).encode()
-                            ).hexdigest()
+                            email_hash = hash_email(email)
                         else:
                             email_hash = ""
 
@@ -108,21 +124,32 @@ def show_submission() -> None:
                             "submission_time": datetime.datetime.now(JST).strftime(
                                 "%Y-%m-%d %H:%M:%S%z"
                             ),
-                            "is_competition_running": IS_COMPETITION_RUNNING,
+                            "is_competition_running": competition.is_running,
+                            # 同じ秒に投稿された場合（ボタンの連打など）も区別できるようにする
+                            "submission_id": uuid.uuid4().hex,
                         }
                         submission_data.update(additional_inputs)
                         if AUTH:
                             submission_data.update({"email_hash": email_hash})
 
-                        # データを書き込み
-                        write_submission(submission_data)
-
-                        if IS_COMPETITION_RUNNING:
-                            st.success(f"投稿完了！Publicスコア: {public_score:.4f}")
-                        else:
-                            st.success(
-                                f"投稿完了！Publicスコア: {public_score:.4f} / Privateスコア: {private_score:.4f}"
-                            )
+                        # データを書き込み、投稿時点の順位を取得（順位を計算できなかった場合は None）
+                        standing = write_submission(submission_data)
+                        # 再採点できるよう、予測値を保存しておく
+                        archive_submission(submission_df, submission_data)
+                        metrics.record_event("submission")
+                        request_leaderboard_snapshot()
+
+                        message = f"投稿完了！Publicスコア: {public_score:.4f}"
+                        if standing is not None:
+                            message += format_rank(standing["public_score"])
+                        if not competition.is_running:
+                            message += f" / Privateスコア: {private_score:.4f}"
+                            # 最終投稿を選択する場合、Privateリーダーボードの順位は投稿時点では決まらない
+                            if standing is not None and competition.final_submission_limit <= 0:
+                                message += format_rank(standing["private_score"])
+                        st.success(message)
+                        if standing is not None and standing["personal_best"]:
+                            st.info("自己ベストを更新しました！", icon=":material/trending_up:")
                 except Exception as e:
                     st.error(f"スコア計算または投稿処理中にエラーが発生しました: {e}")
 
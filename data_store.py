@@ -1,21 +1,73 @@
 """
 データ永続化層の抽象化モジュール。
-設定に応じて、Googleスプレッドシート、SQLite、MySQL、PostgreSQLなどの
+設定に応じて、Googleスプレッドシート、SQLite、DuckDB、MySQL、PostgreSQLなどの
 異なるデータソースへのアクセスを切り替えます。
+各バックエンドのライブラリ（gspread、SQLAlchemy、DuckDBなど）は、
+実際に使用されるまで読み込まれません。
 """
 
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Any, Optional, Tuple
+from concurrent.futures import Future
+from contextlib import closing
+import importlib.util
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import types
 import pandas as pd
-import gspread
-from gspread_dataframe import get_as_dataframe, set_with_dataframe
-from google.oauth2.service_account import Credentials
+import numpy as np
 import streamlit as st
-from gspread.worksheet import Worksheet
-import sqlalchemy
-from sqlalchemy.exc import SQLAlchemyError
 from pathlib import Path
 
+import metrics
+from caching import VersionedCache
+from leaderboard_stats import score_progression
+from competitions import Competition, get_current_competition
+from ranked_leaderboard import RankedLeaderboard
+from submission_archive import SUBMISSION_KEY_COLUMNS
+
+if TYPE_CHECKING:
+    from gspread.spreadsheet import Spreadsheet
+    from gspread.worksheet import Worksheet
+
+
+def _lazy_import(name: str) -> types.ModuleType:
+    """
+    モジュールを遅延読み込みする。
+    属性に初めてアクセスしたときに、実際のモジュールの読み込みが行われる。
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# バックエンドのライブラリは、選択されたデータストアで使用されるまで読み込まない
+gspread = _lazy_import("gspread")
+sqlalchemy = _lazy_import("sqlalchemy")
+duckdb = _lazy_import("duckdb")
+
+
+# DuckDBで型付きの列として保持する列（ここにない列はVARCHARとして保持する）
+DUCKDB_COLUMN_TYPES: Dict[str, str] = {
+    "public_score": "DOUBLE",
+    "private_score": "DOUBLE",
+    "is_competition_running": "BOOLEAN",
+    "target": "DOUBLE",
+}
 
 # スコープ（権限）の設定
 SCOPES: List[str] = [
@@ -27,6 +79,10 @@ SCOPES: List[str] = [
 class DataStore(ABC):
     """データストアの抽象基底クラス。"""
 
+    def __init__(self):
+        # 既定の read_leaderboard_page で使用する、順位付けしたリーダーボードのキャッシュ
+        self._ranked_cache = VersionedCache("ranked_leaderboard", max_entries=2)
+
     @abstractmethod
     def read_ground_truth(self, header: List[str]) -> pd.DataFrame:
         """正解データを読み込む。"""
@@ -48,138 +104,1138 @@ class DataStore(ABC):
 
     @abstractmethod
     def write_ground_truth(self, df: pd.DataFrame, header: List[str]):
-        """正解データを書き込む。"""
+        """
+        正解データを書き込み、既存の正解データを置き換える。
+        置き換えの途中でも採点が止まらないよう、読み込み側からは置き換えの前後のどちらかの正解データのみが見えるようにする。
+        """
         pass
 
+    def write_ground_truth_chunks(
+        self, chunks: Iterable[pd.DataFrame], header: List[str]
+    ) -> int:
+        """
+        チャンクに分けて読み込んだ正解データを順に書き込み、既存の正解データを置き換える。
+        書き込んだ行数を返す。
+        既定ではすべてのチャンクを結合してから write_ground_truth で書き込む
+        （行ごとに書き込めるデータストアでは、チャンクごとに書き込んでメモリ使用量を抑える）。
+        """
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=header)
+        self.write_ground_truth(df, header)
+        return len(df)
+
     @abstractmethod
     def has_ground_truth(self) -> bool:
         """正解データが登録されているかを確認する。"""
         pass
 
+    def table_sizes(
+        self, leaderboard_header: List[str], ground_truth_header: List[str]
+    ) -> Dict[str, int]:
+        """リーダーボードと正解データの行数を返す。"""
+        return {
+            "leaderboard": len(self.read_leaderboard(leaderboard_header)),
+            "ground_truth": len(self.read_ground_truth(ground_truth_header)),
+        }
+
+    def read_leaderboard_page(
+        self,
+        header: List[str],
+        sort_column: str,
+        ascending: bool,
+        offset: int,
+        limit: int,
+        filters: Optional[Dict[str, str]] = None,
+        username_contains: Optional[str] = None,
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        順位付けしたリーダーボードのうち、offset から limit 件を返す。
+        sort_column（同点の場合は submission_time の昇順）で順位を付け、"rank" 列として付与する。
+        filters（列名 -> 値の完全一致）や username_contains（ユーザー名の部分一致）で絞り込んでも
+        順位は全体での順位のまま返す。latest_only_column を指定した場合、
+        その列の値ごとに最新の投稿のみを対象とする。final_only_column を指定した場合は
+        latest_only_column の代わりに、その列の値ごとに最終投稿の中で最良の1件のみを対象とする
+        （_final_submissions を参照）。
+        戻り値は (該当ページのDataFrame, 絞り込み後の総行数)。
+        """
+        if final_only_column:
+            latest_only_column = None
+
+        def rank() -> RankedLeaderboard:
+            df = self.read_leaderboard(header)
+            if final_only_column:
+                df = _final_submissions(
+                    df, self.read_final_selections(), final_only_column, ascending
+                )
+            return RankedLeaderboard(df, ascending, latest_only_column)
+
+        # バージョンは読み込みの前に取得し、読み込んだ内容より古いバージョンでキャッシュする
+        # （読み込み中に更新された場合は、次の読み込みで順位付けし直される）
+        version = self.leaderboard_version(header)
+        # 読み込みと順位付けはリーダーボードの内容が変わったときだけ行い、ページごとには切り出すのみとする
+        ranked = self._ranked_cache.get(
+            (version, ascending, latest_only_column, final_only_column), rank
+        )
+        return ranked.page(sort_column, offset, limit, filters, username_contains)
+
+    def read_leaderboard_columns(
+        self,
+        header: List[str],
+        columns: List[str],
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+        ascending: bool = True,
+    ) -> pd.DataFrame:
+        """
+        リーダーボードのうち、指定した列のみを読み込む。
+        latest_only_column を指定した場合、その列の値ごとに最新の投稿のみを返す。
+        final_only_column を指定した場合は、その列の値ごとに最終投稿の中で最良の1件のみを返す。
+        """
+        df = self.read_leaderboard(header)
+        if final_only_column:
+            df = _final_submissions(
+                df, self.read_final_selections(), final_only_column, ascending
+            )
+        else:
+            df = _latest_submissions(df, latest_only_column)
+        return df.reindex(columns=columns).reset_index(drop=True)
+
+    def read_score_progression(
+        self, header: List[str], owner_column: str, ascending: bool
+    ) -> pd.DataFrame:
+        """
+        ユーザー（owner_column の値）ごとに、投稿時刻順の Public スコアの自己ベストの推移を読み込む。
+        自己ベストが更新された投稿のみを、owner_column, username, submission_time, best_score の列で
+        ユーザー・投稿時刻の順に返す。
+        既定ではリーダーボード全体を読み込んで累積の最小値・最大値を計算する。
+        """
+        return score_progression(self.read_leaderboard(header), owner_column, ascending)
+
+    def leaderboard_version(self, header: List[str]) -> int:
+        """
+        リーダーボード（投稿の追加、スコアの書き戻し、最終投稿の選択）が更新されるたびに増える値を返す。
+        閲覧中の画面の自動更新で定期的に呼ばれるため、各データストアでは小さなクエリ1回で取得できるようにする。
+        既定では行数を使用する（投稿の追加のみを検出できる）。
+        """
+        return len(self.read_leaderboard(header))
+
+    @abstractmethod
+    def update_scores(self, header: List[str], scores: pd.DataFrame) -> None:
+        """
+        再採点したスコアをまとめて書き戻す。
+        scores はキーの列（SUBMISSION_KEY_COLUMNS、欠損は空文字列）と public_score / private_score 列を持ち、
+        キーが一致するリーダーボードの行のスコアを置き換える。
+        """
+        pass
+
+    @abstractmethod
+    def read_final_selections(self) -> pd.DataFrame:
+        """
+        最終投稿として選択された投稿のキー（SUBMISSION_KEY_COLUMNS、欠損は空文字列）と
+        selected_at 列（選択した時刻）を返す。
+        """
+        pass
+
+    @abstractmethod
+    def write_final_selections(
+        self, owner_column: str, owner: str, selections: pd.DataFrame
+    ) -> None:
+        """
+        owner_column の値が owner のユーザーの最終投稿の選択を、selections（キーの列）で置き換える。
+        選択できる件数の確認は呼び出し側で行う。
+        """
+        pass
+
+
+FINAL_SELECTION_COLUMNS: List[str] = SUBMISSION_KEY_COLUMNS + ["selected_at"]
+# 索引を作成するキーの列の長さ。MySQL（utf8mb4 は1文字4バイト）の InnoDB の索引の上限（3072バイト）に
+# 収まるよう、ハッシュ値（SHA-256 の16進数）・投稿時刻・投稿ID（UUID の16進数）は実際の長さに合わせる
+SUBMISSION_KEY_LENGTHS: Dict[str, int] = {
+    "username": 255,
+    "email_hash": 64,
+    "submission_time": 32,
+    "submission_id": 32,
+}
+
+
+def _final_submissions(
+    df: pd.DataFrame,
+    selections: pd.DataFrame,
+    final_only_column: str,
+    ascending: bool,
+) -> pd.DataFrame:
+    """
+    final_only_column の値（ユーザー）ごとに、最終投稿として選択した投稿のうち private_score が最良の1件を残す。
+    最終投稿を選択していないユーザーは、public_score が最良の1件を残す（同点は submission_time が早い投稿）。
+    """
+    if df.empty or final_only_column not in df.columns:
+        return df
+    key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in df.columns]
+    keys = df[key_columns].astype(object).where(df[key_columns].notna(), "").astype(str)
+    selected_keys = set(
+        selections[key_columns].astype(str).itertuples(index=False, name=None)
+    )
+    is_selected = pd.Series(
+        [key in selected_keys for key in keys.itertuples(index=False, name=None)],
+        index=df.index,
+    )
+    owners = df[final_only_column]
+    has_selection = is_selected.groupby(owners, dropna=False).transform("any")
+    candidates = df[is_selected | ~has_selection]
+    score = pd.to_numeric(
+        candidates["private_score"].where(
+            has_selection[candidates.index], candidates["public_score"]
+        ),
+        errors="coerce",
+    )
+    ordered = candidates.assign(_score=score).sort_values(
+        ["_score", "submission_time"],
+        ascending=[ascending, True],
+        na_position="last",
+        kind="stable",
+    )
+    best = ordered.drop_duplicates(subset=[final_only_column], keep="first")
+    return best.drop(columns="_score").sort_index()
+
+
+def _latest_submissions(
+    df: pd.DataFrame, latest_only_column: Optional[str]
+) -> pd.DataFrame:
+    """latest_only_column の値ごとに、submission_time が最新の投稿のみを残す。"""
+    if not latest_only_column or latest_only_column not in df.columns:
+        return df
+    # submission_timeが新しい順にソートし、ユーザーごとに最初の行（最新の投稿）を残す
+    return df.sort_values("submission_time", ascending=False).drop_duplicates(
+        subset=[latest_only_column], keep="first"
+    )
+
+
+class SubmissionJournal:
+    """
+    投稿データを一時的に保持するローカルのジャーナル（SQLiteファイル）。
+    Googleスプレッドシートへの書き込みを非同期化するために使用する。
+    同一ノード上の複数プロセスから共有できるよう、行の取得（claim）はトランザクション内で行う。
+    """
+
+    # claim したまま反映されなかった行を、他のプロセスが再取得できるようになるまでの秒数
+    CLAIM_TIMEOUT_SECONDS = 120.0
+    # 反映済みの行を保持しておく秒数
+    RETENTION_SECONDS = 24 * 60 * 60
+
+    def __init__(self, journal_path: str):
+        _prepare_db_file(journal_path)
+        self.journal_path = journal_path
+        with closing(self._connect()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS submission_journal ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "header TEXT NOT NULL, "
+                "row TEXT NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "claimed_at REAL, "
+                "flushed_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.journal_path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA synchronous=FULL")
+        return con
+
+    def append(self, submission_data: Dict[str, Any], header: List[str]) -> int:
+        """投稿データをジャーナルに追記し、その連番を返す。"""
+        row = [submission_data.get(h) for h in header]
+        with closing(self._connect()) as con:
+            cur = con.execute(
+                "INSERT INTO submission_journal (header, row, created_at) VALUES (?, ?, ?)",
+                (json.dumps(header), json.dumps(row), time.time()),
+            )
+            return cur.lastrowid
+
+    def last_seq(self) -> int:
+        """これまでに追記した行の最大の連番（反映済みの行を削除しても減らない）を返す。"""
+        with closing(self._connect()) as con:
+            row = con.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'submission_journal'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def read_unflushed(self, header: List[str], flushed_since: float) -> pd.DataFrame:
+        """
+        未反映の行と、flushed_since 以降に反映された行を DataFrame として返す。
+        """
+        with closing(self._connect()) as con:
+            records = con.execute(
+                "SELECT header, row FROM submission_journal "
+                "WHERE flushed_at IS NULL OR flushed_at >= ? ORDER BY seq",
+                (flushed_since,),
+            ).fetchall()
+        rows = [dict(zip(json.loads(h), json.loads(r))) for h, r in records]
+        return pd.DataFrame(rows, columns=header)
+
+    def claim(self, limit: int) -> List[Tuple[int, List[str], List[Any]]]:
+        """未反映の行を最大 limit 件取得し、他のプロセスが取得しないよう印を付ける。"""
+        now = time.time()
+        with closing(self._connect()) as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                records = con.execute(
+                    "SELECT seq, header, row FROM submission_journal "
+                    "WHERE flushed_at IS NULL AND (claimed_at IS NULL OR claimed_at < ?) "
+                    "ORDER BY seq LIMIT ?",
+                    (now - self.CLAIM_TIMEOUT_SECONDS, limit),
+                ).fetchall()
+                con.executemany(
+                    "UPDATE submission_journal SET claimed_at = ? WHERE seq = ?",
+                    [(now, seq) for seq, _, _ in records],
+                )
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+        return [(seq, json.loads(h), json.loads(r)) for seq, h, r in records]
+
+    def mark_flushed(self, seqs: List[int]):
+        """行を反映済みにし、保持期間を過ぎた反映済みの行を削除する。"""
+        now = time.time()
+        with closing(self._connect()) as con:
+            con.executemany(
+                "UPDATE submission_journal SET flushed_at = ? WHERE seq = ?",
+                [(now, seq) for seq in seqs],
+            )
+            con.execute(
+                "DELETE FROM submission_journal WHERE flushed_at < ?",
+                (now - self.RETENTION_SECONDS,),
+            )
+
+    def release(self, seqs: List[int]):
+        """反映に失敗した行の印を外し、再度取得できるようにする。"""
+        with closing(self._connect()) as con:
+            con.executemany(
+                "UPDATE submission_journal SET claimed_at = NULL WHERE seq = ?",
+                [(seq,) for seq in seqs],
+            )
+
+
+class JournalFlusher(threading.Thread):
+    """ジャーナルの未反映の行を、一定間隔でまとめてデータストアへ反映するバックグラウンドスレッド。"""
+
+    def __init__(
+        self,
+        journal: SubmissionJournal,
+        flush_rows: Callable[[List[str], List[List[Any]]], None],
+        interval_seconds: float,
+        batch_size: int = 500,
+    ):
+        super().__init__(name="submission-journal-flusher", daemon=True)
+        self.journal = journal
+        self.flush_rows = flush_rows
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+
+    def run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                while self.flush_once() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"An error occurred while flushing the submission journal: {e}")
+
+    def stop(self):
+        """スレッドを停止する。"""
+        self._stop.set()
+
+    def flush_once(self) -> int:
+        """未反映の行を1バッチ分反映し、反映した行数を返す。"""
+        records = self.journal.claim(self.batch_size)
+        if not records:
+            return 0
+        seqs = [seq for seq, _, _ in records]
+        try:
+            # ヘッダーが同じ連続した行ごとにまとめて反映する
+            batch_header, batch_rows = records[0][1], []
+            for _, header, row in records:
+                if header != batch_header:
+                    self.flush_rows(batch_header, batch_rows)
+                    batch_header, batch_rows = header, []
+                batch_rows.append(row)
+            self.flush_rows(batch_header, batch_rows)
+        except Exception:
+            self.journal.release(seqs)
+            raise
+        self.journal.mark_flushed(seqs)
+        return len(records)
+
+
+class TokenBucket:
+    """1分あたりのリクエスト数を制限するトークンバケット。"""
+
+    def __init__(self, requests_per_minute: float):
+        self.capacity = float(requests_per_minute)
+        self.rate_per_second = requests_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得する。トークンがない場合は補充されるまで待機する。"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.rate_per_second,
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate_per_second
+            time.sleep(wait_seconds)
+
+
+class SheetsRequestScheduler:
+    """
+    Google Sheets API の呼び出しを、プロセス内のすべてのセッションで共有して制御するスケジューラ。
+    - 読み込み・書き込みそれぞれのクォータ（1分あたりのリクエスト数）をトークンバケットで守る
+    - 429（クォータ超過）のエラーと、読み込みの5xxのエラーは、ジッター付きの指数バックオフで再試行する
+    - 同じ範囲の読み込みは1回のAPI呼び出しにまとめ、短時間キャッシュする
+    - 同時に要求された異なる範囲の読み込みは batch_get にまとめる
+    """
+
+    # 書き込みの5xxはサーバー側で反映済みの場合があり、再試行すると行の追記などが重複するため、
+    # 処理されずに拒否されたことが確実な429のみ再試行する
+    RETRYABLE_STATUS_CODES = {
+        "read": {429, 500, 502, 503, 504},
+        "write": {429},
+    }
+
+    def __init__(
+        self,
+        reads_per_minute: float,
+        writes_per_minute: float,
+        max_retries: int = 6,
+        base_delay_seconds: float = 1.0,
+        max_delay_seconds: float = 64.0,
+        read_cache_seconds: float = 2.0,
+        batch_window_seconds: float = 0.05,
+    ):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute),
+            "write": TokenBucket(writes_per_minute),
+        }
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.read_cache_seconds = read_cache_seconds
+        self.batch_window_seconds = batch_window_seconds
+
+        self._lock = threading.Lock()
+        # キー -> (取得時刻, 値)
+        self._cache: Dict[Any, Tuple[float, Any]] = {}
+        # キー -> 最後に取得に成功した値（API呼び出しが失敗した場合に使用）
+        self._last_good: Dict[Any, Any] = {}
+        # キー -> 実行中の読み込みの Future
+        self._inflight: Dict[Any, Future] = {}
+        # スプレッドシートID -> batch_get 待ちの範囲のリストと、その結果の Future
+        self._pending_ranges: Dict[str, List[str]] = {}
+        self._pending_batches: Dict[str, Future] = {}
+
+    @staticmethod
+    def _status_code(e: Exception) -> Optional[int]:
+        response = getattr(e, "response", None)
+        return getattr(response, "status_code", None)
+
+    def call(self, kind: str, func: Callable, *args, **kwargs) -> Any:
+        """クォータを守りつつ func を呼び出し、再試行可能なエラーの場合はバックオフして再試行する。"""
+        for attempt in range(self.max_retries + 1):
+            self.buckets[kind].acquire()
+            try:
+                return func(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status_code = self._status_code(e)
+                if (
+                    status_code not in self.RETRYABLE_STATUS_CODES[kind]
+                    or attempt == self.max_retries
+                ):
+                    raise
+                # Full Jitter: 0 〜 min(上限, 基準 * 2^試行回数) の一様乱数だけ待機する
+                delay = random.uniform(
+                    0, min(self.max_delay_seconds, self.base_delay_seconds * 2**attempt)
+                )
+                metrics.record_event(f"sheets_retry_{status_code}")
+                time.sleep(delay)
+
+    def _coalesce(self, key: Any, fetch: Callable[[], Any]) -> Any:
+        """
+        同じキーの読み込みを1回にまとめる。実行中の読み込みがあればその結果を待ち、
+        read_cache_seconds 以内に取得した結果があればそれを返す。
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.read_cache_seconds:
+                metrics.record_cache("sheets_read", hit=True)
+                return cached[1]
+            future = self._inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[key] = future
+        metrics.record_cache("sheets_read", hit=not is_owner)
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+                last_good = self._last_good.get(key)
+            if last_good is None:
+                future.set_exception(e)
+                raise
+            # 取得に失敗した場合は、直近に取得できた値を返す
+            print(f"Sheets API request failed, serving the last fetched value: {e}")
+            future.set_result(last_good)
+            return last_good
+
+        with self._lock:
+            self._cache[key] = (time.monotonic(), value)
+            self._last_good[key] = value
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def read(self, key: Any, func: Callable, *args, **kwargs) -> Any:
+        """読み込み系のAPI呼び出しを、同じキーの呼び出しとまとめて実行する。"""
+        return self._coalesce(key, lambda: self.call("read", func, *args, **kwargs))
+
+    def get_values(self, spreadsheet: Spreadsheet, range_name: str) -> List[List[Any]]:
+        """
+        範囲の値を読み込む。batch_window_seconds の間に要求された同じスプレッドシートの
+        範囲はまとめて1回の batch_get で取得する。
+        """
+        return self._coalesce(
+            ("values", spreadsheet.id, range_name),
+            lambda: self._batched_get(spreadsheet, range_name),
+        )
+
+    def _batched_get(self, spreadsheet: Spreadsheet, range_name: str) -> List[List[Any]]:
+        with self._lock:
+            pending = self._pending_ranges.get(spreadsheet.id)
+            is_leader = pending is None
+            if is_leader:
+                pending = self._pending_ranges[spreadsheet.id] = []
+                batch_future: Future = Future()
+                self._pending_batches[spreadsheet.id] = batch_future
+            else:
+                batch_future = self._pending_batches[spreadsheet.id]
+            pending.append(range_name)
+
+        if is_leader:
+            # 他のセッションからの読み込み要求が集まるのを少しだけ待つ
+            time.sleep(self.batch_window_seconds)
+            with self._lock:
+                ranges = self._pending_ranges.pop(spreadsheet.id)
+                del self._pending_batches[spreadsheet.id]
+            try:
+                response = self.call(
+                    "read",
+                    spreadsheet.values_batch_get,
+                    ranges,
+                    params={"valueRenderOption": "UNFORMATTED_VALUE"},
+                )
+                values_by_range = {
+                    r: value_range.get("values", [])
+                    for r, value_range in zip(ranges, response.get("valueRanges", []))
+                }
+                batch_future.set_result(values_by_range)
+            except Exception as e:
+                batch_future.set_exception(e)
+                raise
+
+        return batch_future.result()[range_name]
+
+    def invalidate(self, spreadsheet: Spreadsheet):
+        """書き込み後に、そのスプレッドシートに関するキャッシュを破棄する。"""
+        with self._lock:
+            for key in list(self._cache):
+                if spreadsheet.id in key:
+                    del self._cache[key]
+
 
 class GoogleSheetDataStore(DataStore):
-    """Googleスプレッドシートをデータストアとして使用するクラス。"""
+    """
+    Googleスプレッドシートをデータストアとして使用するクラス。
+    journal_path が指定された場合、投稿はまずローカルのジャーナルに書き込まれ、
+    バックグラウンドでまとめてワークシートに反映される（write-behind）。
+    API呼び出しはすべて SheetsRequestScheduler を経由し、クォータ内に収まるよう制御される。
+    """
 
     def __init__(
         self,
         spreadsheet_name: str,
         leaderboard_worksheet_name: str,
         ground_truth_worksheet_name: str,
+        scheduler: SheetsRequestScheduler,
+        journal_path: Optional[str] = None,
+        journal_flush_interval_seconds: float = 5.0,
     ):
+        super().__init__()
         self.spreadsheet_name = spreadsheet_name
         self.leaderboard_worksheet_name = leaderboard_worksheet_name
         self.ground_truth_worksheet_name = ground_truth_worksheet_name
-        self.gc = self._get_gspread_client()
+        self.scheduler = scheduler
+        self.gc = _get_gspread_client()
+        self._spreadsheet: Optional[Spreadsheet] = None
+        self._worksheets: Dict[str, Worksheet] = {}
+        # _handle_lock は取得済みのハンドルの参照のみに使用し、API呼び出しの間は保持しない
+        self._handle_lock = threading.Lock()
+        # 同じスプレッドシート・ワークシートを重複して開く（作成する）ことがないよう、
+        # 開く処理は対象ごとのロックで直列化する
+        self._spreadsheet_lock = threading.Lock()
+        self._worksheet_locks: Dict[str, threading.Lock] = {}
 
-    def _get_gspread_client(self) -> gspread.Client:
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"], scopes=SCOPES
-        )
-        return gspread.authorize(creds)
+        self.journal: Optional[SubmissionJournal] = None
+        self._flusher: Optional[JournalFlusher] = None
+        if journal_path:
+            self.journal = SubmissionJournal(journal_path)
+            self._flusher = JournalFlusher(
+                self.journal,
+                self._append_leaderboard_rows,
+                interval_seconds=journal_flush_interval_seconds,
+            )
+            self._flusher.start()
+
+    def _get_spreadsheet(self) -> Spreadsheet:
+        # スプレッドシートを開く操作もAPIを消費するため、一度開いたものを使い回す
+        with self._handle_lock:
+            if self._spreadsheet is not None:
+                return self._spreadsheet
+        with self._spreadsheet_lock:
+            with self._handle_lock:
+                if self._spreadsheet is not None:
+                    return self._spreadsheet
+            try:
+                spreadsheet = self.scheduler.call(
+                    "read", self.gc.open, self.spreadsheet_name
+                )
+            except gspread.SpreadsheetNotFound:
+                spreadsheet = self.scheduler.call(
+                    "write", self.gc.create, self.spreadsheet_name
+                )
+                self.scheduler.call(
+                    "write",
+                    spreadsheet.share,
+                    self.gc.auth.service_account_email,
+                    perm_type="user",
+                    role="writer",
+                )
+            with self._handle_lock:
+                self._spreadsheet = spreadsheet
+            return spreadsheet
 
     def _get_worksheet(
         self, worksheet_name: str, header: Optional[List[str]] = None
     ) -> Worksheet:
-        try:
-            spreadsheet = self.gc.open(self.spreadsheet_name)
-        except gspread.SpreadsheetNotFound:
-            spreadsheet = self.gc.create(self.spreadsheet_name)
-            spreadsheet.share(
-                self.gc.auth.service_account_email, perm_type="user", role="writer"
+        with self._handle_lock:
+            worksheet = self._worksheets.get(worksheet_name)
+            if worksheet is not None:
+                return worksheet
+            open_lock = self._worksheet_locks.setdefault(worksheet_name, threading.Lock())
+
+        spreadsheet = self._get_spreadsheet()
+        # バックオフで待機する間も、他のワークシートや取得済みのワークシートの参照は待たせない
+        with open_lock:
+            with self._handle_lock:
+                worksheet = self._worksheets.get(worksheet_name)
+            if worksheet is not None:
+                return worksheet
+
+            try:
+                worksheet = self.scheduler.call(
+                    "read", spreadsheet.worksheet, worksheet_name
+                )
+                if header is not None:
+                    self._extend_header(worksheet, header)
+            except gspread.WorksheetNotFound:
+                if header is None:
+                    raise ValueError(
+                        "Worksheet does not exist and no header is provided."
+                    )
+                worksheet = self.scheduler.call(
+                    "write",
+                    spreadsheet.add_worksheet,
+                    title=worksheet_name,
+                    rows="1",
+                    cols=str(len(header)),
+                )
+                self.scheduler.call("write", worksheet.update, "A1", [header])
+            with self._handle_lock:
+                self._worksheets[worksheet_name] = worksheet
+            return worksheet
+
+    def _extend_header(self, worksheet: Worksheet, header: List[str]) -> None:
+        """
+        ヘッダーの末尾に列が追加された場合（submission_id など）、ワークシートのヘッダー行にも追加する。
+        行はヘッダーの順に追記するため、既存のヘッダー行がヘッダーの先頭と一致する場合のみ追加する。
+        """
+        existing = self.scheduler.call("read", worksheet.row_values, 1)
+        if not existing or len(existing) >= len(header) or header[: len(existing)] != existing:
+            return
+        if worksheet.col_count < len(header):
+            self.scheduler.call(
+                "write", worksheet.add_cols, len(header) - worksheet.col_count
             )
+        self.scheduler.call("write", worksheet.update, "A1", [header])
 
-        try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-        except gspread.WorksheetNotFound:
-            if header is None:
-                raise ValueError("Worksheet does not exist and no header is provided.")
-            worksheet = spreadsheet.add_worksheet(
-                title=worksheet_name, rows="1", cols=str(len(header))
+    def _read_row_counts(self) -> Dict[str, int]:
+        """スプレッドシートのメタデータから、ワークシートごとの行数を取得する。"""
+        spreadsheet = self._get_spreadsheet()
+        metadata = self.scheduler.read(
+            ("metadata", spreadsheet.id), spreadsheet.fetch_sheet_metadata
+        )
+        return {
+            sheet["properties"]["title"]: sheet["properties"]["gridProperties"][
+                "rowCount"
+            ]
+            for sheet in metadata.get("sheets", [])
+        }
+
+    def _read_worksheet_as_dataframe(
+        self, worksheet_name: str, header: List[str]
+    ) -> pd.DataFrame:
+        # ワークシートがなければヘッダーのみで作成する
+        self._get_worksheet(worksheet_name, header=header)
+        values = self.scheduler.get_values(
+            self._get_spreadsheet(), f"'{worksheet_name}'"
+        )
+        if not values:
+            return pd.DataFrame(columns=header)
+        columns = [str(c) for c in values[0][: len(header)]]
+        rows = [
+            (list(row[: len(columns)]) + [None] * len(columns))[: len(columns)]
+            for row in values[1:]
+        ]
+        df = pd.DataFrame(rows, columns=columns).replace("", np.nan)
+        return df.dropna(how="all")
+
+    @property
+    def changes_worksheet_name(self) -> str:
+        return f"{self.leaderboard_worksheet_name}_changes"
+
+    def _record_change(self, kind: str) -> None:
+        """
+        スコアの書き戻しなど、行の追加以外の更新を変更履歴のワークシートに1行追記する。
+        変更履歴の行数はバージョンに含まれるため、追記により閲覧中の画面が更新を検出できる。
+        """
+        worksheet = self._get_worksheet(
+            self.changes_worksheet_name, header=["changed_at", "kind"]
+        )
+        self.scheduler.call(
+            "write",
+            worksheet.append_rows,
+            [[time.time(), kind]],
+            value_input_option="RAW",
+        )
+        self.scheduler.invalidate(self._get_spreadsheet())
+
+    def _filled_row_counts(self, ranges: List[str]) -> List[int]:
+        """
+        1列の範囲ごとに、値のある最後の行の行番号を1回の batch_get で取得する。
+        手動で作成したワークシートの空の行（既定で1000行）は、メタデータの行数には含まれるが、
+        append_rows はその空の行に書き込むため、行の追加を検出するには値のある行を数える必要がある。
+        """
+        spreadsheet = self._get_spreadsheet()
+        response = self.scheduler.read(
+            ("filled_rows", spreadsheet.id, tuple(ranges)),
+            spreadsheet.values_batch_get,
+            ranges,
+            params={"majorDimension": "COLUMNS"},
+        )
+        return [
+            len((value_range.get("values") or [[]])[0])
+            for value_range in response.get("valueRanges", [])
+        ]
+
+    def leaderboard_version(self, header: List[str]) -> int:
+        """
+        ワークシートの値のある行数（値の取得1回）から、バージョンを計算する。
+        リーダーボードと変更履歴のワークシートは追記のみのため、行数の和は更新のたびに増える。
+        リーダーボードは常に値のある submission_time 列、変更履歴は changed_at 列（A列）で数える。
+        ジャーナルを使用する場合は、ワークシートへの反映前の投稿も検出できるよう、ジャーナルの連番も加える。
+        """
+        self._get_worksheet(self.leaderboard_worksheet_name, header=header)
+        self._get_worksheet(self.changes_worksheet_name, header=["changed_at", "kind"])
+        position = header.index("submission_time") + 1 if "submission_time" in header else 1
+        column = gspread.utils.rowcol_to_a1(1, position).rstrip("0123456789")
+        version = sum(
+            self._filled_row_counts(
+                [
+                    f"'{self.leaderboard_worksheet_name}'!{column}:{column}",
+                    f"'{self.changes_worksheet_name}'!A:A",
+                ]
             )
-            worksheet.update("A1", [header])
-        return worksheet
+        )
+        if self.journal is not None:
+            version += self.journal.last_seq()
+        return version
 
     def has_ground_truth(self) -> bool:
         """正解データがスプレッドシートに1行以上存在するか確認する。"""
         try:
-            spreadsheet = self.gc.open(self.spreadsheet_name)
-            worksheet = spreadsheet.worksheet(self.ground_truth_worksheet_name)
+            row_counts = self._read_row_counts()
             # ヘッダー行を除いて1行以上あればTrue
-            return worksheet.row_count > 1
-        except (gspread.SpreadsheetNotFound, gspread.WorksheetNotFound):
-            return False
+            return row_counts.get(self.ground_truth_worksheet_name, 0) > 1
         except Exception:
             return False
 
+    def table_sizes(
+        self, leaderboard_header: List[str], ground_truth_header: List[str]
+    ) -> Dict[str, int]:
+        """ワークシートのメタデータから行数（ヘッダー行を除く）を返す。"""
+        row_counts = self._read_row_counts()
+        return {
+            "leaderboard": max(
+                row_counts.get(self.leaderboard_worksheet_name, 0) - 1, 0
+            ),
+            "ground_truth": max(
+                row_counts.get(self.ground_truth_worksheet_name, 0) - 1, 0
+            ),
+        }
+
     def read_ground_truth(self, header: List[str]) -> pd.DataFrame:
         try:
-            worksheet = self._get_worksheet(
-                self.ground_truth_worksheet_name, header=header
+            return self._read_worksheet_as_dataframe(
+                self.ground_truth_worksheet_name, header
             )
-            df = get_as_dataframe(worksheet, usecols=list(range(len(header))), header=0)
-            return df.dropna(how="all")
         except Exception as e:
             print(f"An error occurred while reading the ground truth: {e}")
             return pd.DataFrame(columns=header)
 
     def read_leaderboard(self, header: List[str]) -> pd.DataFrame:
+        read_started_at = time.time()
         try:
-            worksheet = self._get_worksheet(
-                self.leaderboard_worksheet_name, header=header
+            df = self._read_worksheet_as_dataframe(
+                self.leaderboard_worksheet_name, header
             )
-            df = get_as_dataframe(worksheet, usecols=list(range(len(header))), header=0)
-            return df.dropna(how="all")
         except Exception as e:
             print(f"An error occurred while reading the leaderboard: {e}")
-            return pd.DataFrame(columns=header)
+            df = pd.DataFrame(columns=header)
+
+        if self.journal is None:
+            return df
+        return self._merge_journal_rows(df, header, read_started_at)
+
+    def _merge_journal_rows(
+        self, df: pd.DataFrame, header: List[str], read_started_at: float
+    ) -> pd.DataFrame:
+        """
+        ワークシートに未反映の投稿をジャーナルから補い、投稿直後から結果が見えるようにする。
+        読み込み中に反映された行も取りこぼさないよう、読み込み開始以降に反映された行も取得し、
+        ワークシート側にすでに存在するものは除く。
+        """
+        journal_df = self.journal.read_unflushed(header, flushed_since=read_started_at)
+        if journal_df.empty:
+            return df
+
+        # 同じ時刻の投稿も区別できるよう、submission_id を含むキーで突き合わせる
+        key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in header]
+        if key_columns and not df.empty:
+            sheet_keys = set(
+                df[key_columns].fillna("").astype(str).itertuples(index=False, name=None)
+            )
+            journal_keys = (
+                journal_df[key_columns]
+                .fillna("")
+                .astype(str)
+                .itertuples(index=False, name=None)
+            )
+            journal_df = journal_df[[key not in sheet_keys for key in journal_keys]]
+
+        if df.empty:
+            return journal_df.reset_index(drop=True)
+        return pd.concat([df, journal_df], ignore_index=True)
+
+    def _append_leaderboard_rows(self, header: List[str], rows: List[List[Any]]):
+        """複数の投稿を1回のAPI呼び出しでワークシートの末尾に追加する。"""
+        worksheet = self._get_worksheet(self.leaderboard_worksheet_name, header=header)
+        values = [
+            ["" if v is None or (isinstance(v, float) and v != v) else v for v in row]
+            for row in rows
+        ]
+        with metrics.timed("GoogleSheetDataStore.flush_journal"):
+            self.scheduler.call(
+                "write", worksheet.append_rows, values, value_input_option="RAW"
+            )
+        self.scheduler.invalidate(self._get_spreadsheet())
 
     def write_submission(
         self,
         submission_data: Dict[str, Any],
         header: List[str],
     ):
-        worksheet = self._get_worksheet(self.leaderboard_worksheet_name, header=header)
+        if self.journal is not None:
+            # ジャーナルに書き込んだ時点で投稿は確定し、ワークシートへの反映は非同期に行う
+            self.journal.append(submission_data, header)
+            return
 
         # 常に新しい行として追加する
-        current_df = self.read_leaderboard(header)
-        new_row_df = pd.DataFrame([submission_data], columns=header)
-        updated_df = pd.concat([current_df, new_row_df], ignore_index=True)
+        self._append_leaderboard_rows(
+            header, [[submission_data.get(h) for h in header]]
+        )
 
-        set_with_dataframe(worksheet, updated_df.reindex(columns=header), resize=True)
+    @property
+    def ground_truth_staging_worksheet_name(self) -> str:
+        return f"{self.ground_truth_worksheet_name}_staging"
+
+    def _find_worksheet(self, worksheet_name: str) -> Optional[Worksheet]:
+        """ワークシートを開く（キャッシュは使用しない）。存在しない場合は None を返す。"""
+        try:
+            return self.scheduler.call(
+                "read", self._get_spreadsheet().worksheet, worksheet_name
+            )
+        except gspread.WorksheetNotFound:
+            return None
 
     def write_ground_truth(self, df: pd.DataFrame, header: List[str]):
-        worksheet = self._get_worksheet(self.ground_truth_worksheet_name, header=header)
-        # 既存データを上書きする
-        set_with_dataframe(
-            worksheet,
-            df.reindex(columns=header),
-            row=1,
-            col=1,
-            include_column_header=True,
-            resize=True,
+        self.write_ground_truth_chunks([df], header)
+
+    def write_ground_truth_chunks(
+        self, chunks: Iterable[pd.DataFrame], header: List[str]
+    ) -> int:
+        """
+        作業用のワークシートにチャンクごとに書き込み、最後に1回の batch_update で
+        既存のワークシートの削除と作業用のワークシートの名前の変更を行う。
+        batch_update のリクエストはすべて適用されるか、まったく適用されないかのどちらかのため、
+        書き込み中も既存の正解データをそのまま読み込め、途中で失敗しても既存の正解データは変わらない。
+        """
+        spreadsheet = self._get_spreadsheet()
+        staging_name = self.ground_truth_staging_worksheet_name
+        # 前回の登録で残った作業用のワークシートは削除する
+        leftover = self._find_worksheet(staging_name)
+        if leftover is not None:
+            self.scheduler.call("write", spreadsheet.del_worksheet, leftover)
+        staging = self.scheduler.call(
+            "write",
+            spreadsheet.add_worksheet,
+            title=staging_name,
+            rows="1",
+            cols=str(len(header)),
         )
 
+        n_rows = 0
+        data = [{"range": f"'{staging_name}'!A1", "values": [header]}]
+        for chunk in chunks:
+            gt_df = chunk.reindex(columns=header).astype(object)
+            gt_df = gt_df.where(gt_df.notna(), "")
+            self.scheduler.call("write", staging.resize, rows=n_rows + len(gt_df) + 1)
+            data.append(
+                {"range": f"'{staging_name}'!A{n_rows + 2}", "values": gt_df.values.tolist()}
+            )
+            self.scheduler.call(
+                "write",
+                spreadsheet.values_batch_update,
+                {"valueInputOption": "RAW", "data": data},
+            )
+            data = []
+            n_rows += len(gt_df)
+        if data:
+            self.scheduler.call(
+                "write",
+                spreadsheet.values_batch_update,
+                {"valueInputOption": "RAW", "data": data},
+            )
+
+        # 既存のワークシートの削除と名前の変更を、1回の batch_update でまとめて行う
+        requests = []
+        current = self._find_worksheet(self.ground_truth_worksheet_name)
+        if current is not None:
+            requests.append({"deleteSheet": {"sheetId": current.id}})
+        requests.append(
+            {
+                "updateSheetProperties": {
+                    "properties": {
+                        "sheetId": staging.id,
+                        "title": self.ground_truth_worksheet_name,
+                    },
+                    "fields": "title",
+                }
+            }
+        )
+        self.scheduler.call("write", spreadsheet.batch_update, {"requests": requests})
+        with self._handle_lock:
+            self._worksheets.pop(self.ground_truth_worksheet_name, None)
+            self._worksheets.pop(staging_name, None)
+        self.scheduler.invalidate(spreadsheet)
+        return n_rows
+
+    def update_scores(self, header: List[str], scores: pd.DataFrame) -> None:
+        """スコアの列のみを、1回の batch_update でまとめて書き戻す。"""
+        if self._flusher is not None:
+            # ジャーナルに残っている投稿もワークシートに反映してから書き戻す
+            while self._flusher.flush_once() > 0:
+                pass
+        spreadsheet = self._get_spreadsheet()
+        sheet_df = self._read_worksheet_as_dataframe(
+            self.leaderboard_worksheet_name, header
+        )
+        if sheet_df.empty:
+            return
+
+        key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in header]
+        keys = sheet_df[key_columns].fillna("").astype(str)
+        # 空行を除いた後も、index はヘッダーの次の行からの行番号（0始まり）のまま
+        keys["_row"] = sheet_df.index
+        updates = keys.merge(
+            scores[key_columns + ["public_score", "private_score"]], on=key_columns
+        )
+        if updates.empty:
+            return
+
+        data = []
+        for column in ["public_score", "private_score"]:
+            values = pd.Series("", index=range(int(sheet_df.index.max()) + 1), dtype=object)
+            values[sheet_df.index] = sheet_df[column].astype(object)
+            values[updates["_row"].to_numpy()] = updates[column].astype(object).to_numpy()
+            start_cell = gspread.utils.rowcol_to_a1(2, header.index(column) + 1)
+            data.append(
+                {
+                    "range": f"'{self.leaderboard_worksheet_name}'!{start_cell}",
+                    # ヘッダーの次の行から連続した範囲として、1列分をまとめて書き込む
+                    "values": [["" if pd.isna(v) else v] for v in values],
+                }
+            )
+        self.scheduler.call(
+            "write",
+            spreadsheet.values_batch_update,
+            {"valueInputOption": "RAW", "data": data},
+        )
+        self.scheduler.invalidate(spreadsheet)
+        self._record_change("update_scores")
+
+    @property
+    def final_selections_worksheet_name(self) -> str:
+        return f"{self.leaderboard_worksheet_name}_final"
+
+    # 最終投稿の選択のワークシートの列（選択したユーザーと、保存した時刻を加える）
+    FINAL_SELECTION_WORKSHEET_COLUMNS: List[str] = FINAL_SELECTION_COLUMNS + [
+        "owner",
+        "saved_at",
+    ]
+
+    def read_final_selections(self) -> pd.DataFrame:
+        """ユーザーごとに、最後に保存した選択の行のみを返す。"""
+        df = self._read_worksheet_as_dataframe(
+            self.final_selections_worksheet_name, self.FINAL_SELECTION_WORKSHEET_COLUMNS
+        )
+        df = df.reindex(columns=self.FINAL_SELECTION_WORKSHEET_COLUMNS)
+        saved_at = pd.to_numeric(df["saved_at"], errors="coerce").fillna(0)
+        owners = df["owner"].fillna("").astype(str)
+        latest = saved_at == saved_at.groupby(owners).transform("max")
+        # 選択をすべて解除した保存は、キーが空の行のみで記録される
+        selected = df["submission_time"].fillna("").astype(str) != ""
+        return (
+            df.loc[latest & selected, FINAL_SELECTION_COLUMNS]
+            .fillna("")
+            .astype(str)
+            .reset_index(drop=True)
+        )
+
+    def write_final_selections(
+        self, owner_column: str, owner: str, selections: pd.DataFrame
+    ) -> None:
+        """
+        ユーザーの選択を、保存した時刻とともにワークシートの末尾に1回の append_rows で追記する。
+        読み込み時にユーザーごとに最後に保存した行のみを使用するため、他のユーザーの選択を読み込んで
+        書き戻すことがなく、締め切り間際に複数のユーザーが同時に保存しても互いの選択を上書きしない。
+        """
+        worksheet = self._get_worksheet(
+            self.final_selections_worksheet_name,
+            header=self.FINAL_SELECTION_WORKSHEET_COLUMNS,
+        )
+        rows = selections.reindex(columns=FINAL_SELECTION_COLUMNS).fillna("").astype(str)
+        if rows.empty:
+            # 選択をすべて解除した場合も保存したことがわかるよう、キーが空の行を追記する
+            rows = pd.DataFrame(
+                [[""] * len(FINAL_SELECTION_COLUMNS)], columns=FINAL_SELECTION_COLUMNS
+            )
+        rows = rows.assign(owner=owner, saved_at=time.time())
+        self.scheduler.call(
+            "write",
+            worksheet.append_rows,
+            rows[self.FINAL_SELECTION_WORKSHEET_COLUMNS].values.tolist(),
+            value_input_option="RAW",
+        )
+        self.scheduler.invalidate(self._get_spreadsheet())
+        self._record_change("final_selections")
+
 
 class BaseDBDataStore(DataStore):
-    """SQLiteやRDBなど、SQLAlchemyを使用するデータベースの共通基底クラス。"""
+    """
+    SQLiteやRDBなど、SQLAlchemyを使用するデータベースの共通基底クラス。
+    read_engine（リードレプリカ）が指定された場合、読み込みはリードレプリカ、書き込みは engine（プライマリ）で行う。
+    ただし、書き込みを行ったセッションは、自分の書き込みが読めるよう
+    read_your_writes_seconds の間はプライマリから読み込む。
+    """
 
     def __init__(
         self,
         engine: sqlalchemy.engine.Engine,
         leaderboard_table_name: str,
         ground_truth_table_name: str,
+        read_engine: Optional[sqlalchemy.engine.Engine] = None,
+        read_your_writes_seconds: float = 30.0,
     ):
+        super().__init__()
         self.engine = engine
+        self.read_engine = read_engine or engine
+        # 読み込みのエンジンが別のデータベース（リードレプリカ）か
+        self._has_read_replica = self.read_engine.url != self.engine.url
         self.leaderboard_table_name = leaderboard_table_name
         self.ground_truth_table_name = ground_truth_table_name
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._recent_writes: Dict[str, float] = {}  # セッションID -> 最後に書き込んだ時刻
+        self._recent_writes_lock = threading.Lock()
+        self._ensured_tables: set = set()
+
+    def _record_write(self) -> None:
+        """現在のセッションが書き込んだことを記録する。"""
+        if not self._has_read_replica:
+            return
+        session_id = _current_session_id()
+        if session_id is None:
+            return
+        now = time.monotonic()
+        with self._recent_writes_lock:
+            self._recent_writes[session_id] = now
+            for key, wrote_at in list(self._recent_writes.items()):
+                if now - wrote_at >= self.read_your_writes_seconds:
+                    del self._recent_writes[key]
+
+    def _engine_for_read(self) -> sqlalchemy.engine.Engine:
+        """読み込みに使うエンジン。直近に書き込んだセッションはプライマリから読み込む。"""
+        if not self._has_read_replica:
+            return self.read_engine
+        session_id = _current_session_id()
+        with self._recent_writes_lock:
+            wrote_at = self._recent_writes.get(session_id)
+        if wrote_at is not None and time.monotonic() - wrote_at < self.read_your_writes_seconds:
+            return self.engine
+        return self.read_engine
 
     def has_ground_truth(self) -> bool:
         """正解データがテーブルに1件以上存在するかを確認する。"""
-        inspector = sqlalchemy.inspect(self.engine)
+        engine = self._engine_for_read()
+        inspector = sqlalchemy.inspect(engine)
         if not inspector.has_table(self.ground_truth_table_name):
             return False
         try:
-            with self.engine.connect() as con:
+            with engine.connect() as con:
                 # テーブルが存在する場合、行数を数える
                 count = con.execute(
                     sqlalchemy.text(
@@ -187,10 +1243,375 @@ class BaseDBDataStore(DataStore):
                     )
                 ).scalar_one_or_none()
                 return (count or 0) > 0
-        except SQLAlchemyError:
+        except sqlalchemy.exc.SQLAlchemyError:
             # クエリ実行時エラー
             return False
 
+    def table_sizes(
+        self, leaderboard_header: List[str], ground_truth_header: List[str]
+    ) -> Dict[str, int]:
+        """COUNTクエリで各テーブルの行数を返す。"""
+        engine = self._engine_for_read()
+        inspector = sqlalchemy.inspect(engine)
+        sizes = {}
+        with engine.connect() as con:
+            for key, table_name in [
+                ("leaderboard", self.leaderboard_table_name),
+                ("ground_truth", self.ground_truth_table_name),
+            ]:
+                if not inspector.has_table(table_name):
+                    sizes[key] = 0
+                    continue
+                count = con.execute(
+                    sqlalchemy.text(f"SELECT COUNT(1) FROM {table_name}")
+                ).scalar_one_or_none()
+                sizes[key] = count or 0
+        return sizes
+
+    def read_leaderboard_page(
+        self,
+        header: List[str],
+        sort_column: str,
+        ascending: bool,
+        offset: int,
+        limit: int,
+        filters: Optional[Dict[str, str]] = None,
+        username_contains: Optional[str] = None,
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        """順位付けと絞り込み、ページ分割をウィンドウ関数を使ったSQLで行う。"""
+        engine = self._engine_for_read()
+        source = self._leaderboard_source(
+            header, latest_only_column, final_only_column, ascending
+        )
+
+        # スコアはText型で保存されているため、数値に変換してから並べる（欠損値は最後）
+        score = sqlalchemy.cast(source.c[sort_column], sqlalchemy.Float)
+        order_by = [
+            sqlalchemy.case((score.is_(None), 1), else_=0),
+            score.asc() if ascending else score.desc(),
+            source.c.submission_time.asc(),
+        ]
+        rank = sqlalchemy.func.row_number().over(order_by=order_by).label("rank")
+        ranked = sqlalchemy.select(rank, *[source.c[h] for h in header]).subquery()
+
+        conditions = [
+            ranked.c[column] == str(value) for column, value in (filters or {}).items()
+        ]
+        if username_contains:
+            conditions.append(
+                sqlalchemy.func.lower(ranked.c.username).contains(
+                    username_contains.lower(), autoescape=True
+                )
+            )
+
+        page_query = (
+            sqlalchemy.select(ranked)
+            .where(*conditions)
+            .order_by(ranked.c.rank)
+            .offset(offset)
+            .limit(limit)
+        )
+        count_query = (
+            sqlalchemy.select(sqlalchemy.func.count())
+            .select_from(ranked)
+            .where(*conditions)
+        )
+        with engine.connect() as con:
+            total = con.execute(count_query).scalar_one()
+            page_df = pd.read_sql(page_query, con)
+        return page_df, total
+
+    def _leaderboard_source(
+        self,
+        header: List[str],
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+        ascending: bool = True,
+    ):
+        """
+        リーダーボードのテーブル（latest_only_column 指定時は、その列の値ごとに
+        最新の投稿のみに絞り込んだサブクエリ）を返す。
+        final_only_column 指定時は、その列の値ごとに最終投稿の中で最良の1件のみに絞り込んだサブクエリを返す。
+        """
+        self._create_table_if_not_exists(self.leaderboard_table_name, header)
+        table = sqlalchemy.table(
+            self.leaderboard_table_name, *[sqlalchemy.column(h) for h in header]
+        )
+        if final_only_column:
+            return self._final_source(table, header, final_only_column, ascending)
+        if not latest_only_column:
+            return table
+
+        latest_rank = (
+            sqlalchemy.func.row_number()
+            .over(
+                partition_by=table.c[latest_only_column],
+                order_by=table.c.submission_time.desc(),
+            )
+            .label("latest_rank")
+        )
+        latest = sqlalchemy.select(*table.c, latest_rank).subquery()
+        return (
+            sqlalchemy.select(*[latest.c[h] for h in header])
+            .where(latest.c.latest_rank == 1)
+            .subquery()
+        )
+
+    def _final_source(
+        self, table, header: List[str], final_only_column: str, ascending: bool
+    ):
+        """
+        最終投稿の選択のテーブルを結合し、ユーザーごとに最良の1件に絞り込むサブクエリを返す。
+        最終投稿を選択したユーザーは選択した投稿の中で private_score が最良の1件、
+        選択していないユーザーは public_score が最良の1件とする。
+        順位付けと合わせて1回のSQLで実行できるよう、ウィンドウ関数のみで絞り込む。
+        """
+        selections = self._final_selections_table()
+        key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in header]
+        joined = table.outerjoin(
+            selections,
+            sqlalchemy.and_(
+                *[
+                    sqlalchemy.func.coalesce(table.c[c], "") == selections.c[c]
+                    for c in key_columns
+                ]
+            ),
+        )
+        is_selected = sqlalchemy.case(
+            (selections.c.selected_at.is_not(None), 1), else_=0
+        )
+        # ユーザーが1件以上選択しているか（選択のテーブルの索引で調べ、並べ替えを増やさない）
+        owners = selections.alias("owner_selections")
+        owner_selections = sqlalchemy.select(sqlalchemy.literal(1)).where(
+            owners.c[final_only_column]
+            == sqlalchemy.func.coalesce(table.c[final_only_column], "")
+        )
+        has_selection = sqlalchemy.case((owner_selections.exists(), 1), else_=0)
+        flagged = (
+            sqlalchemy.select(
+                *[table.c[h] for h in header],
+                is_selected.label("is_selected"),
+                has_selection.label("has_selection"),
+            )
+            .select_from(joined)
+            .subquery()
+        )
+        score = sqlalchemy.case(
+            (
+                flagged.c.has_selection == 1,
+                sqlalchemy.cast(flagged.c.private_score, sqlalchemy.Float),
+            ),
+            else_=sqlalchemy.cast(flagged.c.public_score, sqlalchemy.Float),
+        )
+        final_rank = (
+            sqlalchemy.func.row_number()
+            .over(
+                partition_by=flagged.c[final_only_column],
+                order_by=[
+                    flagged.c.is_selected.desc(),
+                    sqlalchemy.case((score.is_(None), 1), else_=0),
+                    score.asc() if ascending else score.desc(),
+                    flagged.c.submission_time.asc(),
+                ],
+            )
+            .label("final_rank")
+        )
+        ranked = sqlalchemy.select(*[flagged.c[h] for h in header], final_rank).subquery()
+        return (
+            sqlalchemy.select(*[ranked.c[h] for h in header])
+            .where(ranked.c.final_rank == 1)
+            .subquery()
+        )
+
+    @property
+    def final_selections_table_name(self) -> str:
+        return f"{self.leaderboard_table_name}_final"
+
+    def _final_selections_table(self) -> sqlalchemy.Table:
+        """最終投稿の選択のテーブル（キーの列を主キーとする）を、存在しなければ作成して返す。"""
+        meta = sqlalchemy.MetaData()
+        table = sqlalchemy.Table(
+            self.final_selections_table_name,
+            meta,
+            *[
+                sqlalchemy.Column(c, sqlalchemy.String(SUBMISSION_KEY_LENGTHS[c]), primary_key=True)
+                for c in SUBMISSION_KEY_COLUMNS
+            ],
+            sqlalchemy.Column("selected_at", sqlalchemy.Text),
+            # 主キーの先頭でないユーザーの列でも、ユーザーごとの選択を索引で引けるようにする
+            sqlalchemy.Index(
+                f"ix_{self.final_selections_table_name}_email_hash", "email_hash"
+            ),
+        )
+        if self.final_selections_table_name not in self._ensured_tables:
+            meta.create_all(self.engine, checkfirst=True)
+            self._ensured_tables.add(self.final_selections_table_name)
+        return table
+
+    def read_final_selections(self) -> pd.DataFrame:
+        table = self._final_selections_table()
+        with self._engine_for_read().connect() as con:
+            return pd.read_sql(sqlalchemy.select(*table.c), con)
+
+    def write_final_selections(
+        self, owner_column: str, owner: str, selections: pd.DataFrame
+    ) -> None:
+        """ユーザーの選択の削除と追加を、1つのトランザクションで行う。"""
+        table = self._final_selections_table()
+        rows = (
+            selections.reindex(columns=FINAL_SELECTION_COLUMNS)
+            .fillna("")
+            .astype(str)
+            .to_dict("records")
+        )
+        version_table = self._version_table()
+        with self.engine.begin() as con:
+            con.execute(table.delete().where(table.c[owner_column] == owner))
+            if rows:
+                con.execute(table.insert(), rows)
+            self._bump_version(con, version_table)
+        self._record_write()
+
+    def read_leaderboard_columns(
+        self,
+        header: List[str],
+        columns: List[str],
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+        ascending: bool = True,
+    ) -> pd.DataFrame:
+        """指定した列のみをSELECTして読み込む。"""
+        engine = self._engine_for_read()
+        source = self._leaderboard_source(
+            header, latest_only_column, final_only_column, ascending
+        )
+        query = sqlalchemy.select(*[source.c[c] for c in columns])
+        with engine.connect() as con:
+            return pd.read_sql(query, con)
+
+    def read_score_progression(
+        self, header: List[str], owner_column: str, ascending: bool
+    ) -> pd.DataFrame:
+        """
+        ユーザーごとの自己ベスト（投稿時刻順の累積の MIN / MAX）をウィンドウ関数で計算し、
+        自己ベストが更新された投稿のみを読み込む。
+        owner_column が username の場合は、同じ列を重複して選択しない。
+        """
+        engine = self._engine_for_read()
+        table = self._leaderboard_source(header)
+        owner = sqlalchemy.func.coalesce(table.c[owner_column], "").label(owner_column)
+        score = sqlalchemy.cast(table.c.public_score, sqlalchemy.Float)
+        username = ["username"] if owner_column != "username" else []
+        scored = (
+            sqlalchemy.select(
+                owner,
+                *(table.c[c] for c in username),
+                table.c.submission_time,
+                score.label("score"),
+            )
+            .where(score.is_not(None))
+            .subquery()
+        )
+        running = sqlalchemy.func.min if ascending else sqlalchemy.func.max
+        window = {
+            "partition_by": scored.c[owner_column],
+            "order_by": scored.c.submission_time,
+        }
+        best = (
+            sqlalchemy.select(
+                scored.c[owner_column],
+                *(scored.c[c] for c in username),
+                scored.c.submission_time,
+                running(scored.c.score)
+                .over(**window, rows=(None, 0))
+                .label("best_score"),
+            )
+            .subquery()
+        )
+        previous = sqlalchemy.func.lag(best.c.best_score).over(
+            partition_by=best.c[owner_column], order_by=best.c.submission_time
+        )
+        flagged = sqlalchemy.select(
+            *best.c, previous.label("previous_best")
+        ).subquery()
+        query = (
+            sqlalchemy.select(
+                flagged.c[owner_column],
+                *(flagged.c[c] for c in username),
+                flagged.c.submission_time,
+                flagged.c.best_score,
+            )
+            .where(
+                sqlalchemy.or_(
+                    flagged.c.previous_best.is_(None),
+                    flagged.c.best_score != flagged.c.previous_best,
+                )
+            )
+            .order_by(flagged.c[owner_column], flagged.c.submission_time)
+        )
+        with engine.connect() as con:
+            return pd.read_sql(query, con)
+
+    @property
+    def version_table_name(self) -> str:
+        return f"{self.leaderboard_table_name}_version"
+
+    def _version_table(self) -> sqlalchemy.Table:
+        """
+        リーダーボードのバージョンを保持する1行のテーブルを、存在しなければ作成して返す。
+        初期値は既存のリーダーボードの行数とし、以前のバージョン（行数）から減らないようにする。
+        """
+        meta = sqlalchemy.MetaData()
+        table = sqlalchemy.Table(
+            self.version_table_name,
+            meta,
+            sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True, autoincrement=False),
+            sqlalchemy.Column("version", sqlalchemy.BigInteger, nullable=False),
+        )
+        if self.version_table_name in self._ensured_tables:
+            return table
+        meta.create_all(self.engine, checkfirst=True)
+        with self.engine.begin() as con:
+            exists = con.execute(
+                sqlalchemy.select(table.c.id).where(table.c.id == 1)
+            ).first()
+            if exists is None:
+                count = 0
+                if sqlalchemy.inspect(con).has_table(self.leaderboard_table_name):
+                    count = con.execute(
+                        sqlalchemy.text(f"SELECT COUNT(1) FROM {self.leaderboard_table_name}")
+                    ).scalar_one()
+                try:
+                    with con.begin_nested():
+                        con.execute(table.insert().values(id=1, version=count))
+                except sqlalchemy.exc.IntegrityError:
+                    # 他のプロセスが先に作成した
+                    pass
+        self._ensured_tables.add(self.version_table_name)
+        return table
+
+    def _bump_version(
+        self, con: sqlalchemy.engine.Connection, table: sqlalchemy.Table
+    ) -> None:
+        """
+        書き込みと同じトランザクションで、リーダーボードのバージョンを1増やす。
+        バージョンのテーブルは、トランザクションを開始する前に _version_table で作成しておく。
+        """
+        con.execute(
+            table.update().where(table.c.id == 1).values(version=table.c.version + 1)
+        )
+
+    def leaderboard_version(self, header: List[str]) -> int:
+        """バージョンのテーブルの1行を読み込む（行数を数えないため、リーダーボードの大きさによらない）。"""
+        table = self._version_table()
+        with self._engine_for_read().connect() as con:
+            version = con.execute(
+                sqlalchemy.select(table.c.version).where(table.c.id == 1)
+            ).scalar_one_or_none()
+        return version or 0
+
     def _create_table_if_not_exists(
         self,
         table_name: str,
@@ -205,6 +1626,10 @@ class BaseDBDataStore(DataStore):
                 "この名前はデータベースの自動採番主キーとして予約されているため使用できません。列名を変更してください。"
             )
 
+        # 確認済みのテーブルは、読み込みのたびにプライマリへ問い合わせない
+        if table_name in self._ensured_tables:
+            return
+
         inspector = sqlalchemy.inspect(self.engine)
         if not inspector.has_table(table_name):
             meta = sqlalchemy.MetaData()
@@ -239,21 +1664,34 @@ class BaseDBDataStore(DataStore):
 
             # テーブル作成
             meta.create_all(self.engine)
+        elif not is_ground_truth_table:
+            # ヘッダーに列が追加された場合に備え、不足している列を追加する
+            existing = {c["name"] for c in inspector.get_columns(table_name)}
+            missing = [h for h in header if h not in existing]
+            if missing:
+                with self.engine.begin() as con:
+                    for h in missing:
+                        con.execute(
+                            sqlalchemy.text(f"ALTER TABLE {table_name} ADD COLUMN {h} TEXT")
+                        )
+        self._ensured_tables.add(table_name)
 
     def read_ground_truth(self, header: List[str]) -> pd.DataFrame:
+        engine = self._engine_for_read()
         self._create_table_if_not_exists(
             self.ground_truth_table_name, header, is_ground_truth_table=True
         )
         try:
-            return pd.read_sql(self.ground_truth_table_name, self.engine)
+            return pd.read_sql(self.ground_truth_table_name, engine)
         except Exception as e:
             print(f"An error occurred while reading the ground truth from DB: {e}")
             return pd.DataFrame(columns=header)
 
     def read_leaderboard(self, header: List[str]) -> pd.DataFrame:
+        engine = self._engine_for_read()
         self._create_table_if_not_exists(self.leaderboard_table_name, header)
         try:
-            df = pd.read_sql(self.leaderboard_table_name, self.engine)
+            df = pd.read_sql(self.leaderboard_table_name, engine)
             # 自動インクリメントのid列は表示しない
             if "id" in df.columns:
                 df = df.drop("id", axis=1)
@@ -271,22 +1709,207 @@ class BaseDBDataStore(DataStore):
 
         # 常に新しい行として追加（INSERT）する
         df = pd.DataFrame([submission_data], columns=header)
-        df.to_sql(
-            self.leaderboard_table_name,
-            self.engine,
-            if_exists="append",
-            index=False,
-        )
+        version_table = self._version_table()
+        with self.engine.begin() as con:
+            df.to_sql(
+                self.leaderboard_table_name,
+                con,
+                if_exists="append",
+                index=False,
+            )
+            self._bump_version(con, version_table)
+        self._record_write()
 
     def write_ground_truth(self, df: pd.DataFrame, header: List[str]):
+        self.write_ground_truth_chunks([df], header)
+
+    @property
+    def ground_truth_staging_table_name(self) -> str:
+        return f"{self.ground_truth_table_name}_staging"
+
+    def write_ground_truth_chunks(
+        self, chunks: Iterable[pd.DataFrame], header: List[str]
+    ) -> int:
+        """
+        作業用のテーブルにチャンクごとに書き込み、最後に短いトランザクションでテーブルを入れ替える。
+        書き込み中も既存の正解データをそのまま読み込め、途中のチャンクで失敗しても既存の正解データは変わらない。
+        """
         self._create_table_if_not_exists(
             self.ground_truth_table_name, header, is_ground_truth_table=True
         )
-        # 既存データを上書きする
-        df.to_sql(
-            self.ground_truth_table_name, self.engine, if_exists="replace", index=False
+        staging = self.ground_truth_staging_table_name
+        n_rows = 0
+        for chunk in chunks:
+            # チャンクごとにトランザクションを分け、投稿の書き込みを長く待たせない
+            # （最初のチャンクで前回の作業用のテーブルを作り直し、以降のチャンクは追記する）
+            with self.engine.begin() as con:
+                chunk.to_sql(
+                    staging, con, if_exists="append" if n_rows else "replace", index=False
+                )
+            n_rows += len(chunk)
+        if n_rows == 0:
+            with self.engine.begin() as con:
+                pd.DataFrame(columns=header).to_sql(
+                    staging, con, if_exists="replace", index=False
+                )
+        self._swap_table(staging, self.ground_truth_table_name)
+        self._record_write()
+        return n_rows
+
+    def _swap_table(self, staging: str, table: str) -> None:
+        """
+        作業用のテーブルで table を置き換える。
+        読み込み側からは、置き換えの前後のどちらかのテーブルのみが見える。
+        """
+        with self.engine.begin() as con:
+            if self.engine.dialect.name == "mysql":
+                # MySQL の DDL はそれぞれ暗黙にコミットされるため、1つの RENAME TABLE 文で入れ替える
+                old = f"{table}_old"
+                con.execute(sqlalchemy.text(f"DROP TABLE IF EXISTS {old}"))
+                con.execute(
+                    sqlalchemy.text(f"RENAME TABLE {table} TO {old}, {staging} TO {table}")
+                )
+                con.execute(sqlalchemy.text(f"DROP TABLE {old}"))
+            else:
+                # SQLite, PostgreSQL などでは、DDL もトランザクション内でまとめてコミットされる
+                con.execute(sqlalchemy.text(f"DROP TABLE {table}"))
+                con.execute(sqlalchemy.text(f"ALTER TABLE {staging} RENAME TO {table}"))
+
+    def update_scores(self, header: List[str], scores: pd.DataFrame) -> None:
+        """
+        スコアを一時テーブルに一括で書き込み、1回の UPDATE 文でリーダーボードに反映する。
+        一時テーブルにはキーの列の索引を作成し、行ごとの照合が全件走査にならないようにする。
+        """
+        self._create_table_if_not_exists(self.leaderboard_table_name, header)
+        key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in header]
+        table = self.leaderboard_table_name
+        stage = f"{table}_rescored"
+        match = " AND ".join(
+            f"COALESCE({table}.{c}, '') = {stage}.{c}" for c in key_columns
         )
 
+        def lookup(column: str) -> str:
+            return f"(SELECT {stage}.{column} FROM {stage} WHERE {match})"
+
+        version_table = self._version_table()
+        with self.engine.begin() as con:
+            scores[key_columns + ["public_score", "private_score"]].to_sql(
+                stage,
+                con,
+                if_exists="replace",
+                index=False,
+                # 索引を作成できるよう、キーの列は長さを指定した文字列型にする
+                dtype={c: sqlalchemy.String(SUBMISSION_KEY_LENGTHS[c]) for c in key_columns},
+            )
+            con.execute(
+                sqlalchemy.text(
+                    f"CREATE INDEX ix_{stage} ON {stage} ({', '.join(key_columns)})"
+                )
+            )
+            con.execute(
+                sqlalchemy.text(
+                    f"UPDATE {table} SET public_score = {lookup('public_score')}, "
+                    f"private_score = {lookup('private_score')} "
+                    f"WHERE EXISTS (SELECT 1 FROM {stage} WHERE {match})"
+                )
+            )
+            con.execute(sqlalchemy.text(f"DROP TABLE {stage}"))
+            self._bump_version(con, version_table)
+        self._record_write()
+
+
+# 複数のコンペティションのデータストアで共有する接続（エンジン）
+_shared_resources: Dict[Tuple[str, str], Any] = {}
+_shared_resources_lock = threading.Lock()
+
+
+def _get_shared_resource(kind: str, key: str, create: Callable[[], Any]) -> Any:
+    """kind と key ごとに一度だけ create() で作成した接続を返す"""
+    with _shared_resources_lock:
+        if (kind, key) not in _shared_resources:
+            _shared_resources[(kind, key)] = create()
+        return _shared_resources[(kind, key)]
+
+
+def _get_gspread_client() -> gspread.Client:
+    def create() -> gspread.Client:
+        from google.oauth2.service_account import Credentials
+
+        creds = Credentials.from_service_account_info(
+            st.secrets["gcp_service_account"], scopes=SCOPES
+        )
+        return gspread.authorize(creds)
+
+    return _get_shared_resource("gspread", "client", create)
+
+
+def _create_engine(db_url: str) -> sqlalchemy.engine.Engine:
+    engine = sqlalchemy.create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        # Python の sqlite3 は CREATE / DROP などの DDL をトランザクションの外で実行するため、
+        # BEGIN を明示的に発行し、DDL を含む書き込みもまとめてロールバックできるようにする
+        @sqlalchemy.event.listens_for(engine, "connect")
+        def _disable_implicit_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        # 書き込み用のエンジン（sqlite_begin_immediate）は、トランザクションの開始時に書き込みのロックを取る。
+        # BEGIN のみでは、読み込み（to_sql のテーブルの確認など）の後に書き込む時点でロックを取ろうとし、
+        # 同時に書き込む他の接続があると待たずに "database is locked" で失敗するため
+        @sqlalchemy.event.listens_for(engine, "begin")
+        def _begin(con):
+            if con.get_execution_options().get("sqlite_begin_immediate"):
+                con.exec_driver_sql("BEGIN IMMEDIATE")
+            else:
+                con.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def _get_engine(db_url: str) -> sqlalchemy.engine.Engine:
+    # 同じデータベースを使うデータストアは、コネクションプールを共有する
+    return _get_shared_resource("sqlalchemy", db_url, lambda: _create_engine(db_url))
+
+
+def _prepare_db_file(db_path: str) -> bool:
+    """
+    ローカルのデータベースファイルを置くディレクトリを作成し、.gitignore を整備する。
+    データベースファイルがすでに存在していたかどうかを返す。
+    """
+    db_path_obj = Path(db_path)
+    db_dir = db_path_obj.parent
+
+    dir_existed_before = db_dir.exists()
+    db_dir.mkdir(parents=True, exist_ok=True)
+
+    # .gitignore を処理
+    db_filename = db_path_obj.name
+    gitignore_path = db_dir / ".gitignore"
+
+    if not dir_existed_before:
+        # ディレクトリが新規作成された場合、'*'を書き込む
+        gitignore_path.write_text("*\n", encoding="utf-8")
+    else:
+        # ディレクトリが既存の場合、dbファイル名のみを追記
+        try:
+            content = gitignore_path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            content = ""
+
+        if db_filename not in content:
+            with gitignore_path.open("a", encoding="utf-8") as f:
+                f.write(f"\n{db_filename}\n")
+
+    # データベースファイルが実際に存在するかチェック
+    return db_path_obj.exists()
+
+
+def _current_session_id() -> Optional[str]:
+    """Streamlitのセッション（スクリプト実行中のスレッド）のIDを返す。セッション外では None。"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
 
 class SQLiteDataStore(BaseDBDataStore):
     """SQLiteをデータストアとして使用するクラス。"""
@@ -297,34 +1920,78 @@ class SQLiteDataStore(BaseDBDataStore):
         leaderboard_table_name: str,
         ground_truth_table_name: str,
     ):
-        db_path_obj = Path(db_path)
-        db_dir = db_path_obj.parent
+        db_file_exists = _prepare_db_file(db_path)
 
-        dir_existed_before = db_dir.exists()
-        db_dir.mkdir(parents=True, exist_ok=True)
+        engine = _get_engine(f"sqlite:///{db_path}")
 
-        # .gitignore を処理
-        db_filename = db_path_obj.name
-        gitignore_path = db_dir / ".gitignore"
+        # データベースファイルが存在しなかった場合、メッセージを表示
+        if not db_file_exists:
+            st.error(
+                f"データベースファイルが存在しなかったため、新しいファイルを作成しました: `{db_path}`"
+            )
 
-        if not dir_existed_before:
-            # ディレクトリが新規作成された場合、'*'を書き込む
-            gitignore_path.write_text("*\n", encoding="utf-8")
-        else:
-            # ディレクトリが既存の場合、dbファイル名のみを追記
-            try:
-                content = gitignore_path.read_text(encoding="utf-8")
-            except FileNotFoundError:
-                content = ""
+        super().__init__(
+            engine.execution_options(sqlite_begin_immediate=True),
+            leaderboard_table_name,
+            ground_truth_table_name,
+            read_engine=engine,
+        )
 
-            if db_filename not in content:
-                with gitignore_path.open("a", encoding="utf-8") as f:
-                    f.write(f"\n{db_filename}\n")
 
-        # データベースファイルが実際に存在するかチェック
-        db_file_exists = db_path_obj.exists()
+class RDBDataStore(BaseDBDataStore):
+    """
+    MySQL/PostgreSQLなどのリレーショナルデータベースをデータストアとして使用するクラス。
+    read_replica_url が指定された場合、読み込みはリードレプリカに振り分ける。
+    """
 
-        engine = sqlalchemy.create_engine(f"sqlite:///{db_path}")
+    def __init__(
+        self,
+        db_url: str,
+        leaderboard_table_name: str,
+        ground_truth_table_name: str,
+        read_replica_url: Optional[str] = None,
+        read_your_writes_seconds: float = 30.0,
+    ):
+        engine = _get_engine(db_url)
+        read_engine = _get_engine(read_replica_url) if read_replica_url else None
+        super().__init__(
+            engine,
+            leaderboard_table_name,
+            ground_truth_table_name,
+            read_engine=read_engine,
+            read_your_writes_seconds=read_your_writes_seconds,
+        )
+
+
+class DuckDBDataStore(DataStore):
+    """
+    DuckDB（組み込みの列指向分析エンジン）をデータストアとして使用するクラス。
+    スコアなどの列を型付きで保持し、読み込みは列単位でDataFrameに変換するため、
+    投稿数や正解データが大きくても高速に集計・読み込みできる。
+    データベースファイルは1プロセスからのみ書き込み可能なため、単一ノードでの運用を想定している。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        leaderboard_table_name: str,
+        ground_truth_table_name: str,
+    ):
+        super().__init__()
+        db_file_exists = _prepare_db_file(db_path)
+
+        # 同じデータベースファイルを使うデータストアは、接続を共有する
+        self.con = _get_shared_resource(
+            "duckdb", str(Path(db_path).resolve()), lambda: duckdb.connect(db_path)
+        )
+        # バージョンを更新するトランザクションは、同じ行の更新が衝突（Conflict on update）しないよう
+        # 同じデータベースファイルを使うデータストアの間で1つずつ実行する
+        self._version_lock = _get_shared_resource(
+            "duckdb_version_lock", str(Path(db_path).resolve()), threading.Lock
+        )
+        self.leaderboard_table_name = leaderboard_table_name
+        self.ground_truth_table_name = ground_truth_table_name
+        self._ensured_tables: set = set()
 
         # データベースファイルが存在しなかった場合、メッセージを表示
         if not db_file_exists:
@@ -332,57 +1999,520 @@ class SQLiteDataStore(BaseDBDataStore):
                 f"データベースファイルが存在しなかったため、新しいファイルを作成しました: `{db_path}`"
             )
 
-        super().__init__(engine, leaderboard_table_name, ground_truth_table_name)
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
 
+    def _table_exists(self, cur, table_name: str) -> bool:
+        count = cur.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+            [table_name],
+        ).fetchone()[0]
+        return count > 0
 
-class RDBDataStore(BaseDBDataStore):
-    """MySQL/PostgreSQLなどのリレーショナルデータベースをデータストアとして使用するクラス。"""
+    def _create_table_if_not_exists(self, table_name: str, header: List[str]):
+        if table_name in self._ensured_tables:
+            return
+        columns = ", ".join(
+            f"{self._quote(h)} {DUCKDB_COLUMN_TYPES.get(h, 'VARCHAR')}" for h in header
+        )
+        with self.con.cursor() as cur:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._quote(table_name)} ({columns})"
+            )
+            # ヘッダーに列が追加された場合に備え、不足している列を追加する
+            for h in header:
+                cur.execute(
+                    f"ALTER TABLE {self._quote(table_name)} ADD COLUMN IF NOT EXISTS "
+                    f"{self._quote(h)} {DUCKDB_COLUMN_TYPES.get(h, 'VARCHAR')}"
+                )
+        self._ensured_tables.add(table_name)
 
-    def __init__(
-        self, db_url: str, leaderboard_table_name: str, ground_truth_table_name: str
+    def _read_table(self, table_name: str, header: List[str]) -> pd.DataFrame:
+        columns = ", ".join(self._quote(h) for h in header)
+        with self.con.cursor() as cur:
+            return cur.execute(f"SELECT {columns} FROM {self._quote(table_name)}").df()
+
+    def has_ground_truth(self) -> bool:
+        """正解データがテーブルに1件以上存在するかを確認する。"""
+        try:
+            with self.con.cursor() as cur:
+                if not self._table_exists(cur, self.ground_truth_table_name):
+                    return False
+                count = cur.execute(
+                    f"SELECT COUNT(*) FROM {self._quote(self.ground_truth_table_name)}"
+                ).fetchone()[0]
+                return count > 0
+        except duckdb.Error:
+            return False
+
+    def table_sizes(
+        self, leaderboard_header: List[str], ground_truth_header: List[str]
+    ) -> Dict[str, int]:
+        """COUNTクエリで各テーブルの行数を返す。"""
+        sizes = {}
+        with self.con.cursor() as cur:
+            for key, table_name in [
+                ("leaderboard", self.leaderboard_table_name),
+                ("ground_truth", self.ground_truth_table_name),
+            ]:
+                if not self._table_exists(cur, table_name):
+                    sizes[key] = 0
+                    continue
+                sizes[key] = cur.execute(
+                    f"SELECT COUNT(*) FROM {self._quote(table_name)}"
+                ).fetchone()[0]
+        return sizes
+
+    def read_ground_truth(self, header: List[str]) -> pd.DataFrame:
+        self._create_table_if_not_exists(self.ground_truth_table_name, header)
+        try:
+            return self._read_table(self.ground_truth_table_name, header)
+        except Exception as e:
+            print(f"An error occurred while reading the ground truth from DuckDB: {e}")
+            return pd.DataFrame(columns=header)
+
+    def read_leaderboard(self, header: List[str]) -> pd.DataFrame:
+        self._create_table_if_not_exists(self.leaderboard_table_name, header)
+        try:
+            return self._read_table(self.leaderboard_table_name, header)
+        except Exception as e:
+            print(f"An error occurred while reading the leaderboard from DuckDB: {e}")
+            return pd.DataFrame(columns=header)
+
+    def write_submission(
+        self,
+        submission_data: Dict[str, Any],
+        header: List[str],
     ):
-        engine = sqlalchemy.create_engine(db_url)
-        super().__init__(engine, leaderboard_table_name, ground_truth_table_name)
+        self._create_table_if_not_exists(self.leaderboard_table_name, header)
+
+        # 常に新しい行として追加（INSERT）する
+        columns = ", ".join(self._quote(h) for h in header)
+        placeholders = ", ".join("?" for _ in header)
+        self._create_version_table()
+        with self._version_lock, self.con.cursor() as cur:
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                cur.execute(
+                    f"INSERT INTO {self._quote(self.leaderboard_table_name)} ({columns}) "
+                    f"VALUES ({placeholders})",
+                    [submission_data.get(h) for h in header],
+                )
+                self._bump_version(cur)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def read_leaderboard_page(
+        self,
+        header: List[str],
+        sort_column: str,
+        ascending: bool,
+        offset: int,
+        limit: int,
+        filters: Optional[Dict[str, str]] = None,
+        username_contains: Optional[str] = None,
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        """順位付けと絞り込み、ページ分割をウィンドウ関数を使ったSQLで行う。"""
+        columns = ", ".join(self._quote(h) for h in header)
+        source = self._leaderboard_source(
+            header, latest_only_column, final_only_column, ascending
+        )
+        direction = "ASC" if ascending else "DESC"
+        ranked = (
+            f"SELECT ROW_NUMBER() OVER (ORDER BY {self._quote(sort_column)} "
+            f"{direction} NULLS LAST, submission_time ASC) AS rank, {columns} "
+            f"FROM {source}"
+        )
+
+        conditions, params = [], []
+        for column, value in (filters or {}).items():
+            conditions.append(f"CAST({self._quote(column)} AS VARCHAR) = ?")
+            params.append(str(value))
+        if username_contains:
+            conditions.append("contains(lower(username), ?)")
+            params.append(username_contains.lower())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.con.cursor() as cur:
+            total = cur.execute(
+                f"SELECT COUNT(*) FROM ({ranked}) {where}", params
+            ).fetchone()[0]
+            page_df = cur.execute(
+                f"SELECT * FROM ({ranked}) {where} ORDER BY rank LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).df()
+        return page_df, total
+
+    def _leaderboard_source(
+        self,
+        header: List[str],
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+        ascending: bool = True,
+    ) -> str:
+        """
+        リーダーボードのテーブル名（latest_only_column 指定時は、その列の値ごとに
+        最新の投稿のみに絞り込んだサブクエリ）を返す。
+        final_only_column 指定時は、その列の値ごとに最終投稿の中で最良の1件のみに絞り込んだサブクエリを返す。
+        """
+        self._create_table_if_not_exists(self.leaderboard_table_name, header)
+        source = self._quote(self.leaderboard_table_name)
+        columns = ", ".join(self._quote(h) for h in header)
+        if final_only_column:
+            # 最終投稿を選択したユーザーは選択した投稿の中で private_score が最良の1件、
+            # 選択していないユーザーは public_score が最良の1件とする
+            self._create_final_selections_table()
+            selections = self._quote(self.final_selections_table_name)
+            key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in header]
+            match = " AND ".join(
+                f"COALESCE(CAST(l.{self._quote(c)} AS VARCHAR), '') = f.{self._quote(c)}"
+                for c in key_columns
+            )
+            owner = self._quote(final_only_column)
+            direction = "ASC" if ascending else "DESC"
+            flagged = (
+                f"SELECT {', '.join('l.' + self._quote(h) for h in header)}, "
+                "CAST(f.selected_at IS NOT NULL AS INTEGER) AS is_selected "
+                f"FROM {source} AS l LEFT JOIN {selections} AS f ON {match}"
+            )
+            return (
+                f"(SELECT {columns} FROM (SELECT *, MAX(is_selected) OVER "
+                f"(PARTITION BY {owner}) AS has_selection FROM ({flagged})) "
+                f"QUALIFY ROW_NUMBER() OVER (PARTITION BY {owner} ORDER BY is_selected DESC, "
+                "CASE WHEN has_selection = 1 THEN private_score ELSE public_score END "
+                f"{direction} NULLS LAST, submission_time ASC) = 1)"
+            )
+        if not latest_only_column:
+            return source
+        return (
+            f"(SELECT {columns} FROM {source} QUALIFY ROW_NUMBER() OVER ("
+            f"PARTITION BY {self._quote(latest_only_column)} "
+            "ORDER BY submission_time DESC) = 1)"
+        )
+
+    def read_leaderboard_columns(
+        self,
+        header: List[str],
+        columns: List[str],
+        latest_only_column: Optional[str] = None,
+        final_only_column: Optional[str] = None,
+        ascending: bool = True,
+    ) -> pd.DataFrame:
+        """指定した列のみを列単位で読み込む。"""
+        source = self._leaderboard_source(
+            header, latest_only_column, final_only_column, ascending
+        )
+        selected = ", ".join(self._quote(c) for c in columns)
+        with self.con.cursor() as cur:
+            return cur.execute(f"SELECT {selected} FROM {source}").df()
+
+    def read_score_progression(
+        self, header: List[str], owner_column: str, ascending: bool
+    ) -> pd.DataFrame:
+        """
+        ユーザーごとの自己ベスト（投稿時刻順の累積の MIN / MAX）をウィンドウ関数で計算し、
+        自己ベストが更新された投稿のみを読み込む。
+        owner_column が username の場合は、同じ列を重複して選択しない。
+        """
+        source = self._leaderboard_source(header)
+        owner = self._quote(owner_column)
+        username = "username, " if owner_column != "username" else ""
+        running = "MIN" if ascending else "MAX"
+        window = f"PARTITION BY {owner} ORDER BY submission_time"
+        best = (
+            f"SELECT COALESCE(CAST({owner} AS VARCHAR), '') AS {owner}, {username}"
+            f"submission_time, {running}(public_score) OVER ({window} "
+            "ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS best_score "
+            f"FROM {source} WHERE public_score IS NOT NULL"
+        )
+        with self.con.cursor() as cur:
+            return cur.execute(
+                f"SELECT {owner}, {username}submission_time, best_score FROM ({best}) "
+                f"QUALIFY best_score IS DISTINCT FROM LAG(best_score) OVER ({window}) "
+                f"ORDER BY {owner}, submission_time"
+            ).df()
+
+    @property
+    def version_table_name(self) -> str:
+        return f"{self.leaderboard_table_name}_version"
+
+    def _create_version_table(self) -> None:
+        """
+        リーダーボードのバージョンを保持する1行のテーブルを、存在しなければ作成する。
+        初期値は既存のリーダーボードの行数とし、以前のバージョン（行数）から減らないようにする。
+        """
+        if self.version_table_name in self._ensured_tables:
+            return
+        table = self._quote(self.version_table_name)
+        with self._version_lock, self.con.cursor() as cur:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(id INTEGER PRIMARY KEY, version BIGINT NOT NULL)"
+            )
+            count = 0
+            if self._table_exists(cur, self.leaderboard_table_name):
+                count = cur.execute(
+                    f"SELECT COUNT(*) FROM {self._quote(self.leaderboard_table_name)}"
+                ).fetchone()[0]
+            cur.execute(
+                f"INSERT INTO {table} VALUES (1, ?) ON CONFLICT DO NOTHING", [count]
+            )
+        self._ensured_tables.add(self.version_table_name)
+
+    def _bump_version(self, cur) -> None:
+        """書き込みと同じトランザクションで、リーダーボードのバージョンを1増やす。"""
+        cur.execute(
+            f"UPDATE {self._quote(self.version_table_name)} "
+            "SET version = version + 1 WHERE id = 1"
+        )
+
+    def leaderboard_version(self, header: List[str]) -> int:
+        """バージョンのテーブルの1行を読み込む（行数を数えないため、リーダーボードの大きさによらない）。"""
+        self._create_version_table()
+        with self.con.cursor() as cur:
+            row = cur.execute(
+                f"SELECT version FROM {self._quote(self.version_table_name)} WHERE id = 1"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def write_ground_truth(self, df: pd.DataFrame, header: List[str]):
+        self.write_ground_truth_chunks([df], header)
+
+    def write_ground_truth_chunks(
+        self, chunks: Iterable[pd.DataFrame], header: List[str]
+    ) -> int:
+        """
+        DataFrameを列単位でそのまま作業用のテーブルに取り込み（最初のチャンクでテーブルを作り直し、
+        以降のチャンクは追記する）、最後に1つのトランザクションで既存のテーブルと入れ替える。
+        書き込み中も既存の正解データをそのまま読み込め、途中のチャンクで失敗しても既存の正解データは変わらない。
+        """
+        table = self._quote(self.ground_truth_table_name)
+        staging = self._quote(f"{self.ground_truth_table_name}_staging")
+        n_rows = 0
+        created = False
+        with self.con.cursor() as cur:
+            for chunk in chunks:
+                cur.register("ground_truth_upload", chunk.reindex(columns=header))
+                try:
+                    if created:
+                        cur.execute(f"INSERT INTO {staging} SELECT * FROM ground_truth_upload")
+                    else:
+                        cur.execute(
+                            f"CREATE OR REPLACE TABLE {staging} AS SELECT * FROM ground_truth_upload"
+                        )
+                        created = True
+                finally:
+                    cur.unregister("ground_truth_upload")
+                n_rows += len(chunk)
+            if not created:
+                cur.register("ground_truth_upload", pd.DataFrame(columns=header))
+                try:
+                    cur.execute(
+                        f"CREATE OR REPLACE TABLE {staging} AS SELECT * FROM ground_truth_upload"
+                    )
+                finally:
+                    cur.unregister("ground_truth_upload")
+
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                cur.execute(f"DROP TABLE IF EXISTS {table}")
+                cur.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        self._ensured_tables.add(self.ground_truth_table_name)
+        return n_rows
+
+    @property
+    def final_selections_table_name(self) -> str:
+        return f"{self.leaderboard_table_name}_final"
+
+    def _create_final_selections_table(self) -> None:
+        if self.final_selections_table_name in self._ensured_tables:
+            return
+        columns = ", ".join(
+            f"{self._quote(c)} VARCHAR NOT NULL" for c in SUBMISSION_KEY_COLUMNS
+        )
+        with self.con.cursor() as cur:
+            cur.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._quote(self.final_selections_table_name)} "
+                f"({columns}, selected_at VARCHAR, "
+                f"PRIMARY KEY ({', '.join(self._quote(c) for c in SUBMISSION_KEY_COLUMNS)}))"
+            )
+        self._ensured_tables.add(self.final_selections_table_name)
 
+    def read_final_selections(self) -> pd.DataFrame:
+        self._create_final_selections_table()
+        return self._read_table(self.final_selections_table_name, FINAL_SELECTION_COLUMNS)
 
-_data_store_instance = None
+    def write_final_selections(
+        self, owner_column: str, owner: str, selections: pd.DataFrame
+    ) -> None:
+        """ユーザーの選択の削除と追加を、1つのトランザクションで行う。"""
+        self._create_final_selections_table()
+        self._create_version_table()
+        table = self._quote(self.final_selections_table_name)
+        rows = selections.reindex(columns=FINAL_SELECTION_COLUMNS).fillna("").astype(str)
+        with self._version_lock, self.con.cursor() as cur:
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                cur.execute(
+                    f"DELETE FROM {table} WHERE {self._quote(owner_column)} = ?", [owner]
+                )
+                cur.register("final_selections_upload", rows)
+                cur.execute(f"INSERT INTO {table} SELECT * FROM final_selections_upload")
+                self._bump_version(cur)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            finally:
+                cur.unregister("final_selections_upload")
 
+    def update_scores(self, header: List[str], scores: pd.DataFrame) -> None:
+        """スコアの DataFrame をそのまま参照し、1回の UPDATE ... FROM 文で反映する。"""
+        self._create_table_if_not_exists(self.leaderboard_table_name, header)
+        key_columns = [c for c in SUBMISSION_KEY_COLUMNS if c in header]
+        table = self._quote(self.leaderboard_table_name)
+        match = " AND ".join(
+            f"COALESCE(CAST({table}.{self._quote(c)} AS VARCHAR), '') = u.{self._quote(c)}"
+            for c in key_columns
+        )
+        self._create_version_table()
+        with self._version_lock, self.con.cursor() as cur:
+            cur.register(
+                "rescored_scores", scores[key_columns + ["public_score", "private_score"]]
+            )
+            cur.execute("BEGIN TRANSACTION")
+            try:
+                cur.execute(
+                    f"UPDATE {table} SET public_score = u.public_score, "
+                    f"private_score = u.private_score FROM rescored_scores AS u "
+                    f"WHERE {match}"
+                )
+                self._bump_version(cur)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            finally:
+                cur.unregister("rescored_scores")
 
-def get_data_store() -> DataStore:
+
+class InstrumentedDataStore:
     """
-    設定に基づいてデータストアのシングルトンインスタンスを返すファクトリ関数。
+    データストアをラップし、各操作のレイテンシを metrics モジュールに記録するクラス。
+    属性アクセスはすべてラップ対象のデータストアに委譲するため、
+    DataStore と同じインターフェースで利用できる。
     """
-    global _data_store_instance
-    if _data_store_instance is None:
-        from config import (
-            DATA_STORE_TYPE,
-            SPREADSHEET_NAME,
-            LEADERBOARD_WORKSHEET_NAME,
-            GROUND_TRUTH_WORKSHEET_NAME,
-            DB_PATH,
-            DB_URL,
-            LEADERBOARD_TABLE_NAME,
-            GROUND_TRUTH_TABLE_NAME,
-        )
-
-        if DATA_STORE_TYPE == "google_sheet":
-            _data_store_instance = GoogleSheetDataStore(
-                spreadsheet_name=SPREADSHEET_NAME,
-                leaderboard_worksheet_name=LEADERBOARD_WORKSHEET_NAME,
-                ground_truth_worksheet_name=GROUND_TRUTH_WORKSHEET_NAME,
-            )
-        elif DATA_STORE_TYPE == "sqlite":
-            _data_store_instance = SQLiteDataStore(
-                db_path=DB_PATH,
-                leaderboard_table_name=LEADERBOARD_TABLE_NAME,
-                ground_truth_table_name=GROUND_TRUTH_TABLE_NAME,
-            )
-        elif DATA_STORE_TYPE in ["mysql", "postgresql"]:
-            _data_store_instance = RDBDataStore(
-                db_url=DB_URL,
-                leaderboard_table_name=LEADERBOARD_TABLE_NAME,
-                ground_truth_table_name=GROUND_TRUTH_TABLE_NAME,
-            )
-        else:
-            raise ValueError(f"Unsupported DATA_STORE_TYPE: {DATA_STORE_TYPE}")
-    return _data_store_instance
+
+    def __init__(self, data_store: DataStore):
+        self._data_store = data_store
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._data_store, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        operation = f"{type(self._data_store).__name__}.{name}"
+
+        def timed_method(*args, **kwargs):
+            with metrics.timed(operation):
+                return attr(*args, **kwargs)
+
+        return timed_method
+
+
+_data_store_instances: Dict[str, DataStore] = {}
+_data_store_lock = threading.Lock()
+_sheets_scheduler: Optional[SheetsRequestScheduler] = None
+_sheets_scheduler_lock = threading.Lock()
+
+
+def _get_sheets_scheduler() -> SheetsRequestScheduler:
+    # APIのクォータはプロジェクト単位のため、すべてのコンペティションで1つのスケジューラを共有する
+    # （複数のスケジューラでクォータを分け合わないよう、作成はロックの中で1回のみ行う）
+    global _sheets_scheduler
+    if _sheets_scheduler is None:
+        with _sheets_scheduler_lock:
+            if _sheets_scheduler is None:
+                from config import (
+                    SHEETS_READ_REQUESTS_PER_MINUTE,
+                    SHEETS_WRITE_REQUESTS_PER_MINUTE,
+                )
+
+                _sheets_scheduler = SheetsRequestScheduler(
+                    reads_per_minute=SHEETS_READ_REQUESTS_PER_MINUTE,
+                    writes_per_minute=SHEETS_WRITE_REQUESTS_PER_MINUTE,
+                )
+    return _sheets_scheduler
+
+
+def _create_data_store(competition: Competition) -> DataStore:
+    from config import (
+        DATA_STORE_TYPE,
+        SPREADSHEET_NAME,
+        JOURNAL_FLUSH_INTERVAL_SECONDS,
+        DB_PATH,
+        DUCKDB_PATH,
+        DB_READ_YOUR_WRITES_SECONDS,
+        get_db_url,
+        get_db_read_replica_url,
+    )
+
+    if DATA_STORE_TYPE == "google_sheet":
+        return GoogleSheetDataStore(
+            spreadsheet_name=SPREADSHEET_NAME,
+            leaderboard_worksheet_name=competition.leaderboard_worksheet_name,
+            ground_truth_worksheet_name=competition.ground_truth_worksheet_name,
+            scheduler=_get_sheets_scheduler(),
+            journal_path=competition.submission_journal_path,
+            journal_flush_interval_seconds=JOURNAL_FLUSH_INTERVAL_SECONDS,
+        )
+    elif DATA_STORE_TYPE == "sqlite":
+        return SQLiteDataStore(
+            db_path=DB_PATH,
+            leaderboard_table_name=competition.leaderboard_table_name,
+            ground_truth_table_name=competition.ground_truth_table_name,
+        )
+    elif DATA_STORE_TYPE == "duckdb":
+        return DuckDBDataStore(
+            db_path=DUCKDB_PATH,
+            leaderboard_table_name=competition.leaderboard_table_name,
+            ground_truth_table_name=competition.ground_truth_table_name,
+        )
+    elif DATA_STORE_TYPE in ["mysql", "postgresql"]:
+        return RDBDataStore(
+            db_url=get_db_url(),
+            leaderboard_table_name=competition.leaderboard_table_name,
+            ground_truth_table_name=competition.ground_truth_table_name,
+            read_replica_url=get_db_read_replica_url(),
+            read_your_writes_seconds=DB_READ_YOUR_WRITES_SECONDS,
+        )
+    else:
+        raise ValueError(f"Unsupported DATA_STORE_TYPE: {DATA_STORE_TYPE}")
+
+
+def get_data_store(competition: Optional[Competition] = None) -> DataStore:
+    """
+    設定に基づいて、コンペティションごとのデータストアのシングルトンインスタンスを返すファクトリ関数。
+    competition を省略した場合は、現在のセッションが選択しているコンペティションのものを返す。
+    データベースへの接続（エンジン）は、すべてのコンペティションで共有される。
+    """
+    if competition is None:
+        competition = get_current_competition()
+
+    data_store = _data_store_instances.get(competition.id)
+    if data_store is None:
+        with _data_store_lock:
+            data_store = _data_store_instances.get(competition.id)
+            if data_store is None:
+                data_store = InstrumentedDataStore(_create_data_store(competition))
+                _data_store_instances[competition.id] = data_store
+    return data_store
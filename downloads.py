@@ -0,0 +1,171 @@
+"""
+配布データのダウンロード用モジュール。
+データフォルダのファイル一覧はファイルのメタデータ（サイズ・更新時刻）のみから作成し、
+ファイルの中身はダウンロードボタンが押されたときにだけ読み込みます。
+ダウンロードボタン（st.download_button）は送信するファイル全体をサーバーのメモリに読み込むため、
+配信用のURLが設定されている場合は、アプリを経由せずにそのURLからダウンロードさせます。
+また、すべてのデータファイルをまとめた圧縮ファイル（zip）をバックグラウンドで事前に作成します。
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+import uuid
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+from urllib.parse import quote
+
+import metrics
+
+
+@dataclass(frozen=True)
+class DataFile:
+    """データフォルダ内の1ファイルのメタデータ"""
+
+    name: str
+    path: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def mime(self) -> str:
+        return mimetypes.guess_type(self.name)[0] or "application/octet-stream"
+
+
+DataFiles = Tuple[DataFile, ...]
+
+_bundle_lock = threading.Lock()
+_bundle_builds: Dict[str, threading.Thread] = {}  # 作成中の zip
+_ready_bundles: Set[str] = set()  # 作成済みの zip
+
+
+def list_data_files(data_dir: str) -> DataFiles:
+    """
+    data_dir 直下のファイルを名前順に返す。
+    ファイルは開かず、os.scandir で得られるメタデータのみを参照する。
+    """
+    files = []
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            files.append(DataFile(entry.name, entry.path, stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(files, key=lambda f: f.name))
+
+
+def format_size(size: int) -> str:
+    """バイト数を読みやすい単位の文字列に変換する"""
+    value = float(size)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def download_url(base_url: str, *path: str) -> str:
+    """配信用のURLの下の、path のファイルのURLを返す"""
+    return "/".join([base_url.rstrip("/")] + [quote(p) for p in path])
+
+
+def file_reader(data_file: DataFile) -> Callable[[], bytes]:
+    """
+    ダウンロードボタンが押されたときにファイルを読み込む関数を返す。
+    読み込んだ内容はダウンロードが終わるまでサーバーのメモリに保持されるため、
+    大きなファイルには配信用のURL（download_url）を使用する。
+    """
+
+    def read() -> bytes:
+        with metrics.timed("data_download"):
+            with open(data_file.path, "rb") as f:
+                return f.read()
+
+    return read
+
+
+def _signature(files: DataFiles) -> str:
+    """ファイル一覧とメタデータから作る署名（ファイルの追加・削除・更新で変わる）"""
+    digest = hashlib.sha256()
+    for f in files:
+        digest.update(f"{f.name}\0{f.size}\0{f.mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _bundle_path(bundle_dir: str, bundle_name: str, files: DataFiles) -> Path:
+    stem, suffix = os.path.splitext(bundle_name)
+    return Path(bundle_dir) / f"{stem}-{_signature(files)}{suffix or '.zip'}"
+
+
+def _build_bundle(files: DataFiles, path: Path) -> None:
+    """files をまとめた zip を path に作成し、それより古い版の zip を削除する"""
+    # 他のプロセスが同じ zip を同時に作成しても衝突しないよう、作成途中のファイル名は一意にする
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with metrics.timed("data_bundle_build"):
+            # zipfile.write はファイルを少しずつ読み込んで圧縮するため、大きなファイルでもメモリに載せない
+            with zipfile.ZipFile(
+                tmp_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+            ) as zf:
+                for f in files:
+                    zf.write(f.path, arcname=f.name)
+        # zip の更新時刻をデータファイルの最新の更新時刻にし、どの時点のデータから作成したかで版の新旧を比べる
+        # （古いファイル一覧で遅れて作成された zip が、新しい版の zip を削除しないようにする）
+        data_mtime_ns = max((f.mtime_ns for f in files), default=0)
+        os.utime(tmp_path, ns=(data_mtime_ns, data_mtime_ns))
+        # ダウンロード側が作成途中のファイルを見ないよう、置き換えはアトミックに行う
+        os.replace(tmp_path, path)
+        with _bundle_lock:
+            _ready_bundles.add(str(path))
+
+        # 他のプロセスが作成した新しい版の zip や作成途中のファイルは残し、この zip より古い版のみを削除する
+        stem = path.name.rsplit("-", 1)[0]
+        for old in path.parent.glob(f"{stem}-*{path.suffix}"):
+            if old == path:
+                continue
+            try:
+                if old.stat().st_mtime_ns >= data_mtime_ns:
+                    continue
+                old.unlink()
+            except FileNotFoundError:
+                pass
+            with _bundle_lock:
+                _ready_bundles.discard(str(old))
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        print(f"An error occurred while building the data bundle: {e}")
+    finally:
+        with _bundle_lock:
+            _bundle_builds.pop(str(path), None)
+
+
+def ensure_bundle(
+    files: DataFiles, bundle_dir: str, bundle_name: str
+) -> Optional[Path]:
+    """
+    files をまとめた zip のパスを返す。
+    まだ作成されていない場合はバックグラウンドで作成を開始し、None を返す。
+    """
+    path = _bundle_path(bundle_dir, bundle_name, files)
+    with _bundle_lock:
+        if str(path) in _ready_bundles:
+            return path
+        if path.exists():
+            # 他のプロセスや以前の起動で作成済み
+            _ready_bundles.add(str(path))
+            return path
+        if str(path) not in _bundle_builds:
+            bundle_root = Path(bundle_dir)
+            if not bundle_root.exists():
+                bundle_root.mkdir(parents=True, exist_ok=True)
+                # 作成した zip をリポジトリに含めないようにする
+                (bundle_root / ".gitignore").write_text("*\n", encoding="utf-8")
+            thread = threading.Thread(
+                target=_build_bundle, args=(files, path), daemon=True
+            )
+            _bundle_builds[str(path)] = thread
+            thread.start()
+    return None
@@ -0,0 +1,91 @@
+import streamlit as st
+import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+import sys
+
+# プロジェクトルートをsys.pathに追加
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+try:
+    import config
+    from competitions import select_competition
+    from leaderboard_snapshot import read_snapshot_meta
+except ImportError as e:
+    st.error(f"エラー: 必要なモジュールが見つかりません。{e}")
+    st.info(
+        "Streamlitアプリがプロジェクトのルートディレクトリから実行されているか、またはsys.pathが正しく設定されているか確認してください。"
+    )
+    st.stop()  # モジュールが見つからない場合はここで終了
+
+st.set_page_config(page_title="リーダーボードスナップショット管理アプリ", layout="wide")
+st.title("リーダーボードスナップショット管理アプリ")
+
+# 複数のコンペティションを開催している場合は、サイドバーで選択する
+competition = select_competition()
+
+st.write(
+    "このアプリでは、リーダーボードのスナップショット（順位付け済みのリーダーボードを書き出したファイル）の"
+    "書き出しと、コンペティション終了時の最終リーダーボードの固定ができます。"
+)
+if config.LEADERBOARD_SNAPSHOT_ENABLED:
+    st.info(
+        f"スナップショットは {config.LEADERBOARD_SNAPSHOT_INTERVAL_SECONDS:.0f} 秒ごと、"
+        "および投稿後に自動で書き出されます。"
+    )
+else:
+    st.info(
+        "`config.py` の `LEADERBOARD_SNAPSHOT_ENABLED` が False のため、"
+        "スナップショットは自動では書き出されず、固定されたスナップショットのみがリーダーボードに表示されます。"
+    )
+
+# --- 現在のスナップショット ---
+st.header("現在のスナップショット")
+meta = read_snapshot_meta(config.LEADERBOARD_SNAPSHOT_DIR, competition.id)
+if meta is None:
+    st.warning("スナップショットはまだ書き出されていません。")
+else:
+    published_at = datetime.datetime.fromtimestamp(
+        meta["published_at"], ZoneInfo("Asia/Tokyo")
+    )
+    col1, col2, col3 = st.columns(3)
+    col1.metric("バージョン", meta["version"])
+    col2.metric("書き出し日時", published_at.strftime("%Y-%m-%d %H:%M:%S"))
+    col3.metric("状態", "固定済み" if meta.get("frozen") else "自動更新")
+    if competition.final_submission_limit > 0 and not meta.get("final_data_file"):
+        st.warning(
+            "このスナップショットには最終投稿のみのリーダーボード（Private の最終順位）が含まれていないため、"
+            "最終順位はデータストアから表示されます。固定する場合は、改めて書き出してから固定してください。"
+        )
+
+# --- 操作 ---
+st.header("操作")
+col1, col2, col3 = st.columns(3)
+if col1.button("今すぐ書き出す", disabled=bool(meta and meta.get("frozen"))):
+    try:
+        config.publish_leaderboard_snapshot(competition, force=True)
+        st.success("スナップショットを書き出しました。")
+        st.rerun()
+    except Exception as e:
+        st.error(f"スナップショットの書き出し中にエラーが発生しました: {e}")
+
+if col2.button("最新のリーダーボードを最終結果として固定"):
+    try:
+        config.publish_leaderboard_snapshot(competition, frozen=True, force=True)
+        st.success("最新のリーダーボードを書き出し、最終結果として固定しました。")
+        st.rerun()
+    except Exception as e:
+        st.error(f"スナップショットの書き出し中にエラーが発生しました: {e}")
+
+if col3.button("固定を解除", disabled=not (meta and meta.get("frozen"))):
+    config.set_leaderboard_snapshot_frozen(False, competition)
+    st.success("固定を解除しました。")
+    st.rerun()
+
+st.markdown("---")
+st.write(
+    "注意事項: 固定されたスナップショットは、固定を解除するまで更新されず、"
+    "`LEADERBOARD_SNAPSHOT_ENABLED` の設定にかかわらずリーダーボードに表示されます。"
+    "最終投稿を選択するコンペティションでは、最終投稿のみで順位付けした Private の最終順位も一緒に固定されます。"
+)
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import sys
 
@@ -10,7 +9,13 @@ sys.path.append(str(project_root))
 
 try:
     import config
+    from competitions import select_competition
     from data_store import get_data_store
+    from ground_truth_upload import (
+        GroundTruthValidator,
+        validated_chunks,
+        xlsx_sheet_names,
+    )
 except ImportError as e:
     st.error(f"エラー: 必要なモジュールが見つかりません。{e}")
     st.info(
@@ -21,6 +26,9 @@ except ImportError as e:
 st.set_page_config(page_title="正解データ登録アプリ", layout="wide")
 st.title("正解データ登録アプリ")
 
+# 複数のコンペティションを開催している場合は、サイドバーで登録先を選択する
+competition = select_competition()
+
 st.write("正解データファイルをアップロードし、データストアに登録します。")
 
 uploaded_file = st.file_uploader(
@@ -28,65 +36,122 @@ uploaded_file = st.file_uploader(
     type=["csv", "xlsx"],
 )
 
-df = None
+
+def progress_callback(progress_bar, label: str):
+    """チャンクを読み込むたびに、進捗バーに読み込んだ割合と行数を表示する"""
+
+    def update(fraction, n_rows: int) -> None:
+        text = f"{label}... {n_rows:,} 行"
+        if fraction is None:
+            progress_bar.progress(0.0, text=text)
+        else:
+            progress_bar.progress(fraction, text=text)
+
+    return update
+
+
 selected_sheet_name = None
+scan = None
 
 if uploaded_file is not None:
-    file_extension = Path(uploaded_file.name).suffix
-
-    if file_extension == ".csv":
+    file_extension = Path(uploaded_file.name).suffix.lower()
+    if file_extension == ".xlsx":
         try:
-            df = pd.read_csv(uploaded_file)
-            st.success("CSVファイルを正常に読み込みました。")
-        except Exception as e:
-            st.error(f"CSVファイルの読み込み中にエラーが発生しました: {e}")
-    elif file_extension == ".xlsx":
-        try:
-            excel_file = pd.ExcelFile(uploaded_file)
-            sheet_names = excel_file.sheet_names
-            if sheet_names:
-                selected_sheet_name = st.selectbox(
-                    "使用するシートを選択してください", sheet_names
-                )
-                if selected_sheet_name:
-                    df = excel_file.parse(selected_sheet_name)
-                    st.success(
-                        f"Excelファイルからシート '{selected_sheet_name}' を正常に読み込みました。"
-                    )
-            else:
-                st.warning("Excelファイルにシートが見つかりませんでした。")
+            sheet_names = xlsx_sheet_names(uploaded_file)
         except Exception as e:
             st.error(f"Excelファイルの読み込み中にエラーが発生しました: {e}")
-    else:
-        st.error(
-            "サポートされていないファイル形式です。CSVまたはXLSXファイルをアップロードしてください。"
-        )
+            sheet_names = []
+        if sheet_names:
+            selected_sheet_name = st.selectbox(
+                "使用するシートを選択してください", sheet_names
+            )
+        else:
+            st.warning("Excelファイルにシートが見つかりませんでした。")
+
+    if file_extension == ".csv" or selected_sheet_name:
+        # 検証の結果は、ファイルとシートが変わるまでセッションに保持する
+        scan_key = (competition.id, uploaded_file.file_id, selected_sheet_name)
+        scan = st.session_state.get("ground_truth_scan")
+        if scan is None or scan["key"] != scan_key:
+            progress_bar = st.progress(0.0, text="検証中...")
+            validator = GroundTruthValidator(competition.ground_truth_header)
+            error = None
+            try:
+                for _ in validated_chunks(
+                    uploaded_file,
+                    uploaded_file.name,
+                    validator,
+                    sheet_name=selected_sheet_name,
+                    progress=progress_callback(progress_bar, "検証中"),
+                ):
+                    pass
+            except Exception as e:
+                error = str(e)
+            progress_bar.empty()
+            scan = {
+                "key": scan_key,
+                "error": error,
+                "n_rows": validator.n_rows,
+                "usage_counts": validator.usage_counts,
+                "preview": validator.preview,
+                "dtypes": validator.dtypes,
+            }
+            st.session_state["ground_truth_scan"] = scan
+
+# 検証に成功した場合のみプレビューと登録ボタンを表示
+if scan is not None and scan["error"] is not None:
+    st.error(f"正解データの検証でエラーが発生しました: {scan['error']}")
+elif scan is not None and scan["n_rows"] > 0:
+    st.success(f"{scan['n_rows']:,} 行の正解データを検証しました。")
+    columns = st.columns(len(scan["usage_counts"]) + 1)
+    columns[0].metric("行数", f"{scan['n_rows']:,}")
+    for column, (usage, count) in zip(columns[1:], sorted(scan["usage_counts"].items())):
+        column.metric(f"{usage} の行数", f"{count:,}")
 
-# df が存在する場合のみプレビューと登録ボタンを表示
-if df is not None and not df.empty:
     st.subheader("アップロードされたデータのプレビュー")
-    st.dataframe(df)
+    st.dataframe(scan["preview"], hide_index=True)
+    if len(scan["preview"]) < scan["n_rows"]:
+        st.caption(
+            f"{scan['n_rows']:,} 行から無作為に抽出した {len(scan['preview'])} 行を表示しています。"
+        )
 
-    if st.button("プレビューしたデータを登録"):
+    if st.button("検証したデータを登録"):
         st.info(f"データストアタイプ: {config.DATA_STORE_TYPE}")
         st.info(
-            f"'{config.GROUND_TRUTH_TABLE_NAME}' または '{config.GROUND_TRUTH_WORKSHEET_NAME}' にデータを登録します..."
+            f"'{competition.ground_truth_table_name}' または '{competition.ground_truth_worksheet_name}' にデータを登録します..."
         )
 
         try:
             data_store = get_data_store()
-            data_store.write_ground_truth(df, config.GROUND_TRUTH_HEADER)
+            # ファイルをもう一度チャンクごとに読み込み、検証しながらデータストアに渡す
+            # （チャンクのデータ型は、検証時にファイル全体で統一したデータ型に揃える）
+            progress_bar = st.progress(0.0, text="登録中...")
+            n_rows = data_store.write_ground_truth_chunks(
+                validated_chunks(
+                    uploaded_file,
+                    uploaded_file.name,
+                    GroundTruthValidator(
+                        competition.ground_truth_header, dtypes=scan["dtypes"]
+                    ),
+                    sheet_name=selected_sheet_name,
+                    progress=progress_callback(progress_bar, "登録中"),
+                ),
+                competition.ground_truth_header,
+            )
+            progress_bar.empty()
+            # 採点に使用する共有メモリの正解データを新しいものに切り替える
+            config.publish_shared_ground_truth(competition)
             st.success(
-                f"正解データの登録が完了しました。データストアに {len(df)} 件のデータが登録されました。"
+                f"正解データの登録が完了しました。データストアに {n_rows:,} 件のデータが登録されました。"
             )
         except Exception as e:
             st.error(f"データストアへの書き込み中にエラーが発生しました: {e}")
             st.error(
                 f"データストアの設定またはデータ形式に問題がある可能性があります。"
             )
-elif uploaded_file is not None and (df is None or df.empty):
+elif scan is not None:
     st.warning("読み込むデータがありません、またはデータが空です。")
-else:
+elif uploaded_file is None:
     st.info("ファイルをアップロードしてください。")
 
 st.markdown("---")
@@ -0,0 +1,99 @@
+import streamlit as st
+from pathlib import Path
+import sys
+
+# プロジェクトルートをsys.pathに追加
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+try:
+    import config
+    from competitions import select_competition
+except ImportError as e:
+    st.error(f"エラー: 必要なモジュールが見つかりません。{e}")
+    st.info(
+        "Streamlitアプリがプロジェクトのルートディレクトリから実行されているか、またはsys.pathが正しく設定されているか確認してください。"
+    )
+    st.stop()  # モジュールが見つからない場合はここで終了
+
+st.set_page_config(page_title="再採点アプリ", layout="wide")
+st.title("再採点アプリ")
+
+# 複数のコンペティションを開催している場合は、サイドバーで選択する
+competition = select_competition()
+
+st.write(
+    "このアプリでは、保存済みの投稿の予測値を、データストアの最新の正解データと `config.py` の評価関数で再採点し、"
+    "リーダーボードのスコアを更新できます。正解データや評価関数を修正した場合に使用してください。"
+)
+if not config.SUBMISSION_ARCHIVE_ENABLED:
+    st.warning(
+        "`config.py` の `SUBMISSION_ARCHIVE_ENABLED` が False のため、新しい投稿の予測値は保存されません。"
+    )
+
+archive = config.get_submission_archive(competition)
+stats = archive.storage_stats()
+n_archived = stats["entries"]
+col1, col2, col3 = st.columns(3)
+col1.metric("予測値を保存済みの投稿数", n_archived)
+col2.metric("保存したファイル数（同じ内容の投稿は共有）", stats["objects"])
+col3.metric("保存サイズ", f"{stats['bytes'] / 1024 / 1024:.1f} MB")
+
+result_key = f"{competition.id}_rescored"
+
+# --- 再採点 ---
+st.header("再採点")
+if st.button("全投稿を再採点", disabled=n_archived == 0):
+    progress_bar = st.progress(0.0, text="再採点中...")
+
+    def update_progress(done: int, total: int) -> None:
+        progress_bar.progress(done / total, text=f"再採点中... {done} / {total}")
+
+    try:
+        st.session_state[result_key] = config.rescore_all_submissions(
+            competition, progress=update_progress
+        )
+    except Exception as e:
+        st.error(f"再採点中にエラーが発生しました: {e}")
+    progress_bar.empty()
+
+rescored = st.session_state.get(result_key)
+if rescored is not None:
+    failed = rescored[rescored["error"] != ""]
+    changed = rescored[(rescored["error"] == "") & rescored["changed"]]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("再採点した投稿数", len(rescored))
+    col2.metric("スコアが変わる投稿数", len(changed))
+    col3.metric("採点に失敗した投稿数", len(failed))
+
+    if not changed.empty:
+        st.subheader("スコアが変わる投稿")
+        st.dataframe(
+            changed.drop(columns=["error", "changed"]),
+            hide_index=True,
+            column_config={
+                "old_public_score": "Public Score（現在）",
+                "old_private_score": "Private Score（現在）",
+                "public_score": "Public Score（再採点）",
+                "private_score": "Private Score（再採点）",
+            },
+        )
+    if not failed.empty:
+        st.subheader("採点に失敗した投稿")
+        st.dataframe(failed.drop(columns=["changed"]), hide_index=True)
+
+    # --- 書き戻し ---
+    st.header("スコアの更新")
+    if st.button("再採点したスコアでリーダーボードを更新", disabled=changed.empty):
+        try:
+            n_updated = config.write_rescored_scores(rescored, competition)
+            st.success(f"{n_updated} 件の投稿のスコアを更新しました。")
+            del st.session_state[result_key]
+        except Exception as e:
+            st.error(f"スコアの書き込み中にエラーが発生しました: {e}")
+
+st.markdown("---")
+st.write(
+    "注意事項: 予測値が保存されていない投稿（予測値の保存を有効にする前の投稿など）は再採点されません。"
+    "採点に失敗した投稿のスコアは更新されません。"
+)
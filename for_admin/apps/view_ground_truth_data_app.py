@@ -9,6 +9,7 @@ sys.path.append(str(project_root))
 
 try:
     import config
+    from competitions import select_competition
     from data_store import get_data_store
 except ImportError as e:
     st.error(f"エラー: 必要なモジュールが見つかりません。{e}")
@@ -20,6 +21,9 @@ except ImportError as e:
 st.set_page_config(page_title="正解データ閲覧アプリ", layout="wide")
 st.title("正解データ閲覧アプリ")
 
+# 複数のコンペティションを開催している場合は、サイドバーで選択する
+competition = select_competition()
+
 st.write("このアプリでは、データストアに登録されている正解データを閲覧できます。")
 
 if st.button("正解データを表示"):
@@ -29,7 +33,7 @@ if st.button("正解データを表示"):
 
     try:
         data_store = get_data_store()
-        df = data_store.read_ground_truth(config.GROUND_TRUTH_HEADER)
+        df = data_store.read_ground_truth(competition.ground_truth_header)
 
         if df.empty:
             st.warning("ground_truth にデータがありません。")
@@ -9,6 +9,7 @@ sys.path.append(str(project_root))
 
 try:
     import config
+    from competitions import select_competition
     from data_store import get_data_store
 except ImportError as e:
     st.error(f"エラー: 必要なモジュールが見つかりません。{e}")
@@ -20,6 +21,9 @@ except ImportError as e:
 st.set_page_config(page_title="リーダーボードデータ閲覧アプリ", layout="wide")
 st.title("リーダーボードデータ閲覧アプリ")
 
+# 複数のコンペティションを開催している場合は、サイドバーで選択する
+competition = select_competition()
+
 st.write(
     "このアプリでは、データストアに登録されているリーダーボードデータを閲覧できます。"
 )
@@ -0,0 +1,190 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import datetime
+from pathlib import Path
+import sys
+
+# プロジェクトルートをsys.pathに追加
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(project_root))
+
+try:
+    import config
+    import metrics
+    from competitions import select_competition
+    from data_store import get_data_store
+except ImportError as e:
+    st.error(f"エラー: 必要なモジュールが見つかりません。{e}")
+    st.info(
+        "Streamlitアプリがプロジェクトのルートディレクトリから実行されているか、またはsys.pathが正しく設定されているか確認してください。"
+    )
+    st.stop()  # モジュールが見つからない場合はここで終了
+
+st.set_page_config(page_title="パフォーマンスダッシュボード", layout="wide")
+st.title("パフォーマンスダッシュボード")
+
+# テーブルサイズを表示するコンペティション（複数開催している場合はサイドバーで選択する）
+competition = select_competition()
+
+st.write(
+    "このアプリでは、稼働中のコンペアプリの運用メトリクス（データストアのレイテンシ、"
+    "キャッシュヒット率、スコア計算の状況、投稿数、テーブルサイズ）を確認できます。"
+)
+st.caption(
+    f"メトリクスは各アプリプロセスが `{config.METRICS_DIR}` に"
+    f"{metrics.FLUSH_INTERVAL_SECONDS:.0f}秒間隔で書き出したものを集計しています。"
+)
+
+refresh_seconds = st.number_input(
+    "自動更新の間隔（秒）", min_value=2, max_value=300, value=10, step=1
+)
+max_age_minutes = st.number_input(
+    "集計対象とするプロセスの最終更新（分以内）", min_value=1, value=10, step=1
+)
+
+
+def latency_summary(samples_by_op: dict, counts_by_op: dict) -> pd.DataFrame:
+    """操作ごとのレイテンシのパーセンタイル（ミリ秒）を集計する。"""
+    rows = []
+    for operation, samples in sorted(samples_by_op.items()):
+        values = np.asarray(samples, dtype=float) * 1000.0
+        if values.size == 0:
+            continue
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        rows.append(
+            {
+                "operation": operation,
+                "count": counts_by_op.get(operation, values.size),
+                "p50 (ms)": p50,
+                "p90 (ms)": p90,
+                "p99 (ms)": p99,
+                "max (ms)": values.max(),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+@st.fragment(run_every=datetime.timedelta(seconds=int(refresh_seconds)))
+def show_metrics() -> None:
+    snapshots = metrics.load_snapshots(max_age_seconds=max_age_minutes * 60)
+    st.caption(
+        f"最終更新: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} / "
+        f"集計対象プロセス数: {len(snapshots)}"
+    )
+    if not snapshots:
+        st.warning("メトリクスがまだ書き出されていません。アプリが稼働中か確認してください。")
+        return
+
+    # 全プロセスのメトリクスを合算する
+    latencies: dict = {}
+    latency_counts: dict = {}
+    cache_stats: dict = {}
+    gauges: dict = {}
+    events: dict = {}
+    for snap in snapshots:
+        for op, samples in snap.get("latencies", {}).items():
+            latencies.setdefault(op, []).extend(samples)
+        for op, count in snap.get("latency_counts", {}).items():
+            latency_counts[op] = latency_counts.get(op, 0) + count
+        for name, stats in snap.get("cache_stats", {}).items():
+            merged = cache_stats.setdefault(name, {"hits": 0, "misses": 0})
+            merged["hits"] += stats.get("hits", 0)
+            merged["misses"] += stats.get("misses", 0)
+        for name, value in snap.get("gauges", {}).items():
+            gauges[name] = gauges.get(name, 0) + value
+        for name, timestamps in snap.get("events", {}).items():
+            events.setdefault(name, []).extend(timestamps)
+
+    # --- スコア計算と投稿 ---
+    st.header("スコア計算・投稿")
+    submission_times = pd.to_datetime(
+        pd.Series(events.get("submission", []), dtype=float), unit="s", utc=True
+    )
+    now = pd.Timestamp.now(tz="UTC")
+    last_minute = int((submission_times >= now - pd.Timedelta(minutes=1)).sum())
+    last_hour = int((submission_times >= now - pd.Timedelta(hours=1)).sum())
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("スコア計算キュー（処理中の件数）", int(gauges.get("scoring_in_flight", 0)))
+    col2.metric("投稿数（直近1分）", last_minute)
+    col3.metric("投稿数（直近1時間）", last_hour)
+
+    scoring_summary = latency_summary(
+        {"score_submission": latencies.get("score_submission", [])}, latency_counts
+    )
+    if not scoring_summary.empty:
+        st.subheader("スコア計算ジョブの所要時間")
+        st.dataframe(scoring_summary, hide_index=True)
+
+    recent = submission_times[submission_times >= now - pd.Timedelta(hours=1)]
+    if not recent.empty:
+        st.subheader("投稿数/分（直近1時間）")
+        per_minute = (
+            recent.dt.tz_convert("Asia/Tokyo")
+            .dt.floor("min")
+            .value_counts()
+            .sort_index()
+            .rename("投稿数")
+        )
+        st.bar_chart(per_minute)
+
+    # --- データストア ---
+    st.header("データストア操作のレイテンシ")
+    datastore_latencies = {
+        op: samples for op, samples in latencies.items() if op != "score_submission"
+    }
+    datastore_summary = latency_summary(datastore_latencies, latency_counts)
+    if datastore_summary.empty:
+        st.info("記録されたデータストア操作はまだありません。")
+    else:
+        st.dataframe(datastore_summary, hide_index=True)
+
+    # --- キャッシュ ---
+    st.header("キャッシュヒット率")
+    if not cache_stats:
+        st.info("記録されたキャッシュアクセスはまだありません。")
+    else:
+        cache_df = pd.DataFrame(
+            [
+                {
+                    "cache": name,
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "hit rate": stats["hits"] / max(stats["hits"] + stats["misses"], 1),
+                }
+                for name, stats in sorted(cache_stats.items())
+            ]
+        )
+        st.dataframe(
+            cache_df,
+            hide_index=True,
+            column_config={
+                "hit rate": st.column_config.ProgressColumn(
+                    "hit rate", format="percent", min_value=0.0, max_value=1.0
+                )
+            },
+        )
+
+
+show_metrics()
+
+# --- テーブルサイズ ---
+st.header("テーブルサイズ")
+if st.button("テーブルサイズを取得"):
+    try:
+        data_store = get_data_store()
+        sizes = data_store.table_sizes(
+            config.LEADERBOARD_HEADER, competition.ground_truth_header
+        )
+        col1, col2 = st.columns(2)
+        col1.metric("リーダーボード（行）", sizes.get("leaderboard", 0))
+        col2.metric("正解データ（行）", sizes.get("ground_truth", 0))
+    except Exception as e:
+        st.error(f"テーブルサイズの取得中にエラーが発生しました: {e}")
+
+st.markdown("---")
+st.write(
+    "ヒント: メトリクスはアプリの各プロセスで集計されます。"
+    "しばらく更新のないプロセスのメトリクスは集計対象から外れます。"
+)
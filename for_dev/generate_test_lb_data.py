@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import hashlib
 import os
+import uuid
 
 # データ生成の設定
 SALT = "test-salt"
@@ -103,6 +104,7 @@ for username, submissions in users_data.items():
                 ).strftime("%Y-%m-%d %H:%M:%S%z"),
                 "comment": sub["comment"],
                 "is_competition_running": True,  # テストデータなのでTrueとする
+                "submission_id": uuid.uuid4().hex,
             }
         )
 
@@ -118,6 +120,7 @@ header = [
     "submission_time",
     "comment",
     "is_competition_running",
+    "submission_id",
 ]
 df = df[header]
 
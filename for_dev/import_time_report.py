@@ -0,0 +1,113 @@
+"""
+アプリのモジュールの読み込み時間（コールドスタート時間）を計測するスクリプト。
+
+新しいPythonプロセスで `python -X importtime` を使って各モジュールを読み込み、
+読み込み時間の中央値、時間のかかっているモジュール、
+読み込まれたバックエンドのライブラリ（gspread、SQLAlchemyなど）を表示します。
+
+使い方（プロジェクトのルートディレクトリで実行）:
+    uv run python for_dev/import_time_report.py
+    uv run python for_dev/import_time_report.py --modules config contents/submit.py --top 30
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 選択されたデータストアでのみ必要となるバックエンドのライブラリ
+BACKEND_MODULES = ["gspread", "google.oauth2", "google.auth", "sqlalchemy", "duckdb"]
+
+
+def _import_statement(target: str) -> str:
+    # ページ（contents/*.py）はモジュール名ではないため、ファイルの依存モジュールを読み込む
+    if target.endswith(".py"):
+        return (
+            "import ast\n"
+            f"tree = ast.parse(open({target!r}, encoding='utf-8').read())\n"
+            "for node in tree.body:\n"
+            "    if isinstance(node, ast.Import):\n"
+            "        for alias in node.names: __import__(alias.name)\n"
+            "    elif isinstance(node, ast.ImportFrom) and node.module:\n"
+            "        __import__(node.module)\n"
+        )
+    return f"import {target}\n"
+
+
+def measure(target: str) -> Tuple[float, Dict[str, int], List[str]]:
+    """
+    新しいプロセスで target を読み込み、
+    (読み込み時間[秒], モジュールごとの累積読み込み時間[μs], 読み込まれたバックエンドのライブラリ) を返す。
+    """
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        + _import_statement(target)
+        + "elapsed = time.perf_counter() - start\n"
+        # 遅延読み込み中（まだ実体が読み込まれていない）のモジュールは除く
+        "loaded = [m for m in %r if m in sys.modules\n"
+        "          and type(sys.modules[m]).__name__ != '_LazyModule']\n"
+        "print(elapsed)\n"
+        "print(','.join(loaded))\n" % BACKEND_MODULES
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed_line, loaded_line = result.stdout.splitlines()[-2:]
+
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        # 形式: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:") :].split("|")
+        cumulative[name.strip()] = max(cumulative.get(name.strip(), 0), int(cum))
+
+    loaded = [m for m in loaded_line.split(",") if m]
+    return float(elapsed_line), cumulative, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="モジュールの読み込み時間を計測します")
+    parser.add_argument(
+        "--modules",
+        nargs="+",
+        default=[
+            "config",
+            "utils",
+            "data_store",
+            "contents/home.py",
+            "contents/leaderboard.py",
+        ],
+        help="計測するモジュール名またはページのファイルパス",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="計測の繰り返し回数")
+    parser.add_argument(
+        "--top", type=int, default=15, help="表示する時間のかかっているモジュールの数"
+    )
+    args = parser.parse_args()
+
+    for target in args.modules:
+        runs = [measure(target) for _ in range(args.repeat)]
+        elapsed = statistics.median(r[0] for r in runs)
+        cumulative, loaded = runs[-1][1], runs[-1][2]
+
+        print(f"=== {target} ===")
+        print(f"読み込み時間（中央値, {args.repeat}回）: {elapsed * 1000:.0f} ms")
+        print(f"読み込まれたバックエンドのライブラリ: {', '.join(loaded) or 'なし'}")
+        print(f"時間のかかっているモジュール（累積, 上位{args.top}件）:")
+        for name, cum in sorted(cumulative.items(), key=lambda x: -x[1])[: args.top]:
+            print(f"  {cum / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
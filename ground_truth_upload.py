@@ -0,0 +1,257 @@
+"""
+正解データファイルの読み込みモジュール。
+数百万行の正解データでもメモリ使用量が一定に収まるよう、CSV は一定の行数ずつ、
+Excel は読み取り専用モード（行を順に読み込むストリーミング）で読み込み、
+チャンクごとにカラム・id の欠損と重複・Usage の値を検証してからデータストアに渡します。
+データ型はチャンクごとに推定されるため、検証時にファイル全体で統一したデータ型（整数と小数が混在すれば小数、
+数値と文字列が混在すれば文字列）を集計し、登録時はすべてのチャンクをそのデータ型に揃えます
+（最初のチャンクが整数のみでも、後のチャンクの小数が作業用のテーブルで切り捨てられないようにするため）。
+プレビューには、ファイル全体から無作為に抽出した一定数の行のみを保持します。
+"""
+
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 100_000  # 1回に読み込む行数
+PREVIEW_ROWS = 100  # プレビューに表示する行数
+USAGE_VALUES = ["Public", "Private"]  # Usage 列に指定できる値
+MAX_REPORTED_VALUES = 5  # エラー時に表示する問題のある値・行番号の最大件数
+
+
+class GroundTruthValidationError(ValueError):
+    """正解データファイルの検証エラー（メッセージに問題のある行番号を含む）"""
+
+
+def xlsx_sheet_names(file: IO[bytes]) -> List[str]:
+    """Excel ファイルのシート名の一覧を、シートの内容を読み込まずに返す。"""
+    from openpyxl import load_workbook
+
+    file.seek(0)
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_chunks(
+    file: IO[bytes], chunk_rows: int
+) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    with pd.read_csv(file, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            yield chunk, min(file.tell() / size, 1.0) if size else None
+
+
+def _iter_xlsx_chunks(
+    file: IO[bytes], sheet_name: str, chunk_rows: int
+) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    from openpyxl import load_workbook
+
+    file.seek(0)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet_name]
+        # シートの行数（ファイルに記録されていない場合は進捗を返さない）
+        max_row = worksheet.max_row
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        buffer: List[Tuple[Any, ...]] = []
+        n_read = 1
+        for row in rows:
+            n_read += 1
+            # 書式のみが設定された空の行は読み飛ばす
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield (
+                    pd.DataFrame(buffer, columns=columns).infer_objects(),
+                    n_read / max_row if max_row else None,
+                )
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns).infer_objects(), 1.0
+    finally:
+        workbook.close()
+
+
+def iter_chunks(
+    file: IO[bytes],
+    file_name: str,
+    sheet_name: Optional[str] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[Tuple[pd.DataFrame, Optional[float]]]:
+    """
+    正解データファイルを chunk_rows 行ずつ読み込み、(チャンク, 読み込んだ割合) を順に返す。
+    読み込んだ割合がわからない場合は None とする。
+    """
+    suffix = Path(file_name).suffix.lower()
+    if suffix == ".csv":
+        return _iter_csv_chunks(file, chunk_rows)
+    if suffix == ".xlsx":
+        if sheet_name is None:
+            raise ValueError("Excelファイルの場合はシート名を指定してください。")
+        return _iter_xlsx_chunks(file, sheet_name, chunk_rows)
+    raise ValueError(f"サポートされていないファイル形式です: {suffix}")
+
+
+def _column_dtype(values: pd.Series) -> str:
+    """チャンクの列のデータ型（"int64" / "float64" / "bool" / "object"）。すべて欠損の場合は "empty"。"""
+    if values.isna().all():
+        return "empty"
+    if pd.api.types.is_bool_dtype(values):
+        return "bool"
+    if pd.api.types.is_integer_dtype(values):
+        return "int64"
+    if pd.api.types.is_float_dtype(values):
+        return "float64"
+    return "object"
+
+
+def _unify_dtypes(a: Optional[str], b: str) -> str:
+    """これまでのチャンクの列のデータ型 a と新しいチャンクの列のデータ型 b を、両方の値を表せるデータ型にまとめる。"""
+    if a is None or a == b:
+        return b
+    if "empty" in (a, b):
+        # 欠損を含む整数の列は小数、真偽値の列は文字列にする
+        other = b if a == "empty" else a
+        return {"int64": "float64", "bool": "object"}.get(other, other)
+    if {a, b} == {"int64", "float64"}:
+        return "float64"
+    return "object"
+
+
+class GroundTruthValidator:
+    """
+    正解データをチャンクごとに検証し、行数・Usage ごとの行数とプレビュー用の行を集計する。
+    id の重複はチャンクをまたいで検出するため、これまでの id のハッシュ値（64ビット）のみを保持する。
+    dtypes には、同じファイルを検証したときの GroundTruthValidator.dtypes を指定し、
+    指定した場合はすべてのチャンクをそのデータ型に揃えて返す。
+    """
+
+    def __init__(
+        self,
+        header: List[str],
+        id_column: str = "id",
+        seed: int = 0,
+        dtypes: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        self.header = header
+        self.id_column = id_column
+        self.n_rows = 0
+        self.usage_counts: Dict[str, int] = {}
+        # これまでのチャンクで統一したカラムごとのデータ型
+        self.dtypes: Dict[str, Optional[str]] = {c: None for c in header}
+        self._target_dtypes = dtypes
+        self._seen_ids = np.empty(0, dtype=np.uint64)
+        self._rng = np.random.default_rng(seed)
+        self._preview: Optional[pd.DataFrame] = None
+
+    def _raise(self, message: str, mask: np.ndarray) -> None:
+        # CSV / Excel の行番号（1行目はヘッダー）
+        line_numbers = (np.flatnonzero(mask)[:MAX_REPORTED_VALUES] + self.n_rows + 2).tolist()
+        raise GroundTruthValidationError(f"{message}（行番号: {line_numbers}）")
+
+    def validate(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """チャンクを検証し、正解データのカラムのみに揃えて返す。問題があれば GroundTruthValidationError を送出する。"""
+        missing = [c for c in self.header if c not in chunk.columns]
+        if missing:
+            raise GroundTruthValidationError(
+                f"正解データに必要なカラムがありません: {missing}（必要なカラム: {self.header}）"
+            )
+        chunk = chunk[self.header].reset_index(drop=True)
+
+        ids = chunk[self.id_column]
+        if ids.isna().any():
+            self._raise(f"{self.id_column} が空の行があります", ids.isna().to_numpy())
+        # チャンクごとに推定されるデータ型が異なっても同じ値を同じ id とみなすよう、文字列にしてからハッシュ化する
+        hashes = pd.util.hash_array(ids.astype(str).to_numpy(dtype=object))
+        duplicated = pd.Series(hashes).duplicated().to_numpy().copy()
+        if len(self._seen_ids):
+            positions = np.searchsorted(self._seen_ids, hashes).clip(max=len(self._seen_ids) - 1)
+            duplicated |= self._seen_ids[positions] == hashes
+        if duplicated.any():
+            values = ids[duplicated].head(MAX_REPORTED_VALUES).tolist()
+            self._raise(f"{self.id_column} が重複しています: {values}", duplicated)
+
+        if "Usage" in chunk.columns:
+            invalid = ~chunk["Usage"].isin(USAGE_VALUES).to_numpy()
+            if invalid.any():
+                values = chunk["Usage"][invalid].drop_duplicates().head(MAX_REPORTED_VALUES).tolist()
+                self._raise(
+                    f"Usage の値は {USAGE_VALUES} のいずれかにしてください: {values}", invalid
+                )
+            for usage, count in chunk["Usage"].value_counts().items():
+                self.usage_counts[usage] = self.usage_counts.get(usage, 0) + int(count)
+
+        for column in self.header:
+            self.dtypes[column] = _unify_dtypes(self.dtypes[column], _column_dtype(chunk[column]))
+        if self._target_dtypes is not None:
+            chunk = self._cast(chunk)
+        self._seen_ids = np.sort(np.concatenate([self._seen_ids, hashes]))
+        self._sample(chunk)
+        self.n_rows += len(chunk)
+        return chunk
+
+    def _cast(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """チャンクの列を、ファイル全体で統一したデータ型に揃える。"""
+        columns = {}
+        for column in self.header:
+            values = chunk[column]
+            dtype = self._target_dtypes.get(column)
+            if dtype in (None, "empty") or values.dtype == dtype:
+                columns[column] = values
+            elif dtype == "object":
+                # 数値の列も文字列にし、文字列の列と同じ型で登録されるようにする
+                columns[column] = values.astype(object).map(str, na_action="ignore")
+            else:
+                columns[column] = values.astype(dtype)
+        return pd.DataFrame(columns)
+
+    def _sample(self, chunk: pd.DataFrame) -> None:
+        """各行に乱数のキーを付け、キーが小さい PREVIEW_ROWS 行を残す（ファイル全体からの無作為抽出）。"""
+        sample = chunk.assign(
+            _row=np.arange(len(chunk)) + self.n_rows, _key=self._rng.random(len(chunk))
+        ).nsmallest(PREVIEW_ROWS, "_key")
+        if self._preview is not None:
+            sample = pd.concat([self._preview, sample]).nsmallest(PREVIEW_ROWS, "_key")
+        self._preview = sample
+
+    @property
+    def preview(self) -> pd.DataFrame:
+        """抽出した行を、ファイルでの並び順で返す（「行番号」はファイルの行番号）。"""
+        if self._preview is None:
+            return pd.DataFrame(columns=self.header)
+        preview = self._preview.sort_values("_row")
+        line_numbers = preview["_row"].to_numpy() + 2
+        preview = preview.drop(columns=["_row", "_key"]).reset_index(drop=True)
+        preview.insert(0, "行番号", line_numbers)
+        return preview
+
+
+def validated_chunks(
+    file: IO[bytes],
+    file_name: str,
+    validator: GroundTruthValidator,
+    sheet_name: Optional[str] = None,
+    progress: Optional[Callable[[Optional[float], int], None]] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """
+    正解データファイルをチャンクごとに読み込んで検証し、検証済みのチャンクを順に返す。
+    progress を指定した場合は、チャンクごとに (読み込んだ割合, 読み込んだ行数) で呼び出す。
+    """
+    for chunk, fraction in iter_chunks(file, file_name, sheet_name, chunk_rows):
+        chunk = validator.validate(chunk)
+        if progress is not None:
+            progress(fraction, validator.n_rows)
+        yield chunk
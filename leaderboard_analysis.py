@@ -0,0 +1,181 @@
+"""
+リーダーボードの分析（ブートストラップ信頼区間とシェイクアップ）のモジュール。
+コンペティション終了後に、順位の差が意味のある差か（スコアの信頼区間と、隣り合う順位の投稿に勝つ確率）と、
+Public から Private への順位の変動（シェイクアップ）を、すべての投稿についてまとめて計算します。
+ブートストラップでは、正解データの行の再標本化をすべての投稿で共有し、行列の積でまとめてスコアを計算します。
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from caching import VersionedCache
+
+BOOTSTRAP_RESAMPLES = 1000  # ブートストラップの再標本化の回数
+BOOTSTRAP_CONFIDENCE = 0.95  # 信頼区間の信頼水準
+BOOTSTRAP_MAX_WEIGHTS = 4_000_000  # 一度に作る重み行列の最大要素数（メモリ使用量を抑える）
+BOOTSTRAP_MAX_SUBMISSIONS = 200  # 信頼区間を計算する上位の投稿数（保存した予測値の読み込みを抑える）
+TOP_K = 10  # シェイクアップの上位の一致率を計算する順位
+
+# 分析結果（コンペティション、リーダーボードと正解データのバージョンをキーに、全セッションで共有）
+analysis_cache = VersionedCache("leaderboard_analysis", max_entries=32)
+
+
+def bootstrap_replicates(
+    losses: np.ndarray,
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    行ごとの損失（投稿数 x 行数）から、再標本化ごとの平均損失（投稿数 x 再標本化の回数）を計算する。
+    再標本化はすべての投稿で共有し、各行が選ばれた回数の重み行列との積でまとめて計算する。
+    """
+    n_submissions, n_rows = losses.shape
+    replicates = np.empty((n_submissions, n_resamples), dtype=np.float64)
+    if n_rows == 0:
+        replicates.fill(np.nan)
+        return replicates
+
+    rng = np.random.default_rng(seed)
+    values = np.asarray(losses, dtype=np.float64)
+    chunk_size = max(1, BOOTSTRAP_MAX_WEIGHTS // n_rows)
+    for start in range(0, n_resamples, chunk_size):
+        size = min(chunk_size, n_resamples - start)
+        # 各再標本化で各行が選ばれた回数（再標本化の回数 x 行数）
+        indices = rng.integers(0, n_rows, size=(size, n_rows))
+        offsets = np.arange(size)[:, None] * n_rows
+        weights = np.bincount((indices + offsets).ravel(), minlength=size * n_rows)
+        weights = weights.reshape(size, n_rows).astype(np.float64)
+        replicates[:, start : start + size] = values @ weights.T / n_rows
+    return replicates
+
+
+def bootstrap_intervals(
+    replicates: np.ndarray, confidence: float = BOOTSTRAP_CONFIDENCE
+) -> Dict[str, np.ndarray]:
+    """再標本化ごとのスコアから、各投稿のスコアの信頼区間（パーセンタイル法）を計算する。"""
+    alpha = (1.0 - confidence) / 2
+    lower, upper = np.quantile(replicates, [alpha, 1.0 - alpha], axis=1)
+    return {"lower": lower, "upper": upper}
+
+
+def win_probabilities(
+    replicates: np.ndarray, order: np.ndarray, ascending: bool
+) -> np.ndarray:
+    """
+    順位順（order）に並べた各投稿が、1つ下の順位の投稿より良いスコアになる再標本化の割合を返す。
+    再標本化を共有しているため、対応のある比較になる。最下位の投稿と、どちらかのスコアが欠損の投稿は NaN とする。
+    """
+    ranked = replicates[order]
+    if ascending:
+        wins = ranked[:-1] < ranked[1:]
+    else:
+        wins = ranked[:-1] > ranked[1:]
+    missing = np.isnan(ranked).any(axis=1)
+    probabilities = np.where(missing[:-1] | missing[1:], np.nan, wins.mean(axis=1))
+    return np.append(probabilities, np.nan)
+
+
+def _ranks(scores: np.ndarray, ascending: bool) -> np.ndarray:
+    """スコアの順位（同点は元の並び順、欠損は最後）を返す。"""
+    key = scores if ascending else -scores
+    order = np.lexsort((key, np.isnan(scores)))
+    ranks = np.empty(len(scores), dtype=np.int64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return ranks
+
+
+def rank_shift(
+    public: np.ndarray, private: np.ndarray, ascending: bool, top_k: int = TOP_K
+) -> Dict[str, Any]:
+    """
+    Public と Private の順位の変動（シェイクアップ）の統計量を計算する。
+    shift は Public の順位から Private の順位への上昇幅（正: 上昇, 負: 下降）。
+    """
+    public_rank = _ranks(public, ascending)
+    private_rank = _ranks(private, ascending)
+    shift = public_rank - private_rank
+    n = len(public)
+    if n > 1:
+        # 順位の相関（スピアマンの順位相関係数）
+        spearman = float(np.corrcoef(public_rank, private_rank)[0, 1])
+    else:
+        spearman = float("nan")
+    k = min(top_k, n)
+    top_overlap = (
+        float(np.sum((public_rank <= k) & (private_rank <= k)) / k) if k > 0 else float("nan")
+    )
+    return {
+        "public_rank": public_rank,
+        "private_rank": private_rank,
+        "shift": shift,
+        "spearman": spearman,
+        "mean_abs_shift": float(np.abs(shift).mean()) if n > 0 else float("nan"),
+        "max_rise": int(shift.max()) if n > 0 else 0,
+        "max_fall": int(-shift.min()) if n > 0 else 0,
+        "top_k": k,
+        "top_k_overlap": top_overlap,
+    }
+
+
+def build_leaderboard_analysis(
+    scores_df: pd.DataFrame,
+    ascending: bool,
+    load_losses: Optional[Callable[[pd.DataFrame], Dict[str, np.ndarray]]] = None,
+    label_column: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    public_score / private_score の列からシェイクアップの統計量を計算する。
+    load_losses を指定した場合は、Private の上位 BOOTSTRAP_MAX_SUBMISSIONS 件の行（順位順）を渡して
+    行ごとの損失（スコアの列名 -> 投稿数 x 行数。損失がない投稿は NaN）を受け取り、
+    そのスコアのブートストラップ信頼区間と、隣り合う順位の投稿に勝つ確率（private_score のみ）も計算する。
+    """
+    public = pd.to_numeric(scores_df["public_score"], errors="coerce").to_numpy(float)
+    private = pd.to_numeric(scores_df["private_score"], errors="coerce").to_numpy(
+        float
+    )
+    shake_up = rank_shift(public, private, ascending)
+
+    table = pd.DataFrame(
+        {
+            "private_rank": shake_up["private_rank"],
+            "public_rank": shake_up["public_rank"],
+            "rank_shift": shake_up["shift"],
+            "public_score": public,
+            "private_score": private,
+        }
+    )
+    if label_column is not None:
+        table.insert(0, label_column, scores_df[label_column].to_numpy())
+
+    has_intervals = False
+    if load_losses is not None and len(scores_df) > 0:
+        # 信頼区間は Private の上位の投稿のみ計算する（それ以外の投稿は NaN）
+        top = np.argsort(shake_up["private_rank"])[:BOOTSTRAP_MAX_SUBMISSIONS]
+        for score_column, score_losses in load_losses(scores_df.iloc[top]).items():
+            if len(score_losses) != len(top):
+                continue
+            replicates = bootstrap_replicates(score_losses)
+            intervals = bootstrap_intervals(replicates)
+            for bound in ("lower", "upper"):
+                values = np.full(len(table), np.nan)
+                values[top] = intervals[bound]
+                table[f"{score_column}_{bound}"] = values
+            has_intervals = True
+            if score_column == "private_score":
+                win = np.full(len(table), np.nan)
+                win[top] = win_probabilities(replicates, np.arange(len(top)), ascending)
+                table["win_probability"] = win
+
+    return {
+        "n_submissions": len(scores_df),
+        "spearman": shake_up["spearman"],
+        "mean_abs_shift": shake_up["mean_abs_shift"],
+        "max_rise": shake_up["max_rise"],
+        "max_fall": shake_up["max_fall"],
+        "top_k": shake_up["top_k"],
+        "top_k_overlap": shake_up["top_k_overlap"],
+        "has_intervals": has_intervals,
+        "table": table.sort_values("private_rank").reset_index(drop=True),
+    }
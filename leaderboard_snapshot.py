@@ -0,0 +1,283 @@
+"""
+リーダーボードのスナップショット（静的ファイル）のモジュール。
+順位付け済みのリーダーボードを定期的に（および投稿のたびに、まとめて）ローカルの Parquet ファイルに書き出し、
+リーダーボードの閲覧はデータストアではなくスナップショットから行えるようにします。
+最終投稿を選択するコンペティションでは、最終投稿のみで順位付けしたリーダーボード（Private の最終順位）も
+同じスナップショットに書き出します。
+コンペティション終了時には、最終的なリーダーボードのスナップショットを固定（以降は更新しない）できます。
+同じノード上の複数のプロセスが同時に書き出さないよう、書き出しはスナップショットのディレクトリの
+ロック（SQLiteファイルの書き込みロック）で排他し、ロックを取得したプロセスのみが書き出します。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+import metrics
+from caching import FileCache
+from ranked_leaderboard import RankedLeaderboard
+
+
+@dataclass(frozen=True)
+class LeaderboardSnapshot:
+    """読み込んだスナップショット"""
+
+    version: int  # 書き出し時のリーダーボードのバージョン
+    published_at: float  # 書き出した時刻（UNIX時間）
+    frozen: bool  # 固定されているか（固定されたスナップショットは更新されない）
+    ranked: RankedLeaderboard
+    # 最終投稿のみで順位付けしたリーダーボード（最終投稿を選択しない場合は None）
+    final_ranked: Optional[RankedLeaderboard] = None
+
+
+_snapshot_cache = FileCache("leaderboard_snapshot")
+
+# 書き出しの排他に使用するファイル名
+LOCK_FILE_NAME = "publish.lock"
+
+
+def _meta_path(snapshot_dir: str, competition_id: str) -> Path:
+    return Path(snapshot_dir) / f"{competition_id}.json"
+
+
+def read_snapshot_meta(snapshot_dir: str, competition_id: str) -> Optional[Dict[str, Any]]:
+    """スナップショットのメタデータ（バージョン、書き出し時刻、固定の有無など）を返す。"""
+    path = _meta_path(snapshot_dir, competition_id)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _load(meta_path: str) -> Optional[LeaderboardSnapshot]:
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    snapshot_root = Path(meta_path).parent
+    df = pd.read_parquet(snapshot_root / meta["data_file"])
+    final_ranked = None
+    if meta.get("final_data_file"):
+        final_df = pd.read_parquet(snapshot_root / meta["final_data_file"])
+        final_ranked = RankedLeaderboard(final_df, ascending=meta["ascending"])
+    return LeaderboardSnapshot(
+        version=meta["version"],
+        published_at=meta["published_at"],
+        frozen=meta.get("frozen", False),
+        # 書き出し時に各ユーザーの最新の投稿（または最終投稿）への絞り込みは済んでいる
+        ranked=RankedLeaderboard(df, ascending=meta["ascending"]),
+        final_ranked=final_ranked,
+    )
+
+
+def load_snapshot(snapshot_dir: str, competition_id: str) -> Optional[LeaderboardSnapshot]:
+    """
+    スナップショットを読み込む。存在しない場合は None を返す。
+    読み込み結果はメタデータファイルの更新時刻をキーにキャッシュされ、全セッションで共有される。
+    """
+    return _snapshot_cache.get(str(_meta_path(snapshot_dir, competition_id)), _load)
+
+
+def _write_json_atomic(path: Path, data: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    # 読み込み側が書きかけのファイルを見ないよう、置き換えはアトミックに行う
+    os.replace(tmp_path, path)
+    # このプロセスでは、次の読み込みからすぐに新しいスナップショットを使う
+    _snapshot_cache.invalidate(str(path))
+
+
+def _prepare_snapshot_dir(snapshot_dir: str) -> Path:
+    path = Path(snapshot_dir)
+    if not path.exists():
+        path.mkdir(parents=True, exist_ok=True)
+        # スナップショットをリポジトリに含めないようにする
+        (path / ".gitignore").write_text("*\n", encoding="utf-8")
+    return path
+
+
+@contextmanager
+def _publish_lock(snapshot_dir: str) -> Iterator[None]:
+    """
+    スナップショットの書き出しを、同じノード上のすべてのプロセスの間で排他する。
+    他のプロセスが書き出し中の場合は、その書き出しが終わるまで待つ。
+    """
+    lock_path = _prepare_snapshot_dir(snapshot_dir) / LOCK_FILE_NAME
+    with closing(sqlite3.connect(lock_path, timeout=60, isolation_level=None)) as con:
+        # BEGIN IMMEDIATE は書き込みロックを取得するため、同時に1つのプロセスのみが通過できる
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        finally:
+            con.execute("ROLLBACK")
+
+
+def publish_snapshot(
+    data_store: Any,
+    competition_id: str,
+    header: List[str],
+    ascending: bool,
+    latest_only_column: Optional[str],
+    snapshot_dir: str,
+    frozen: bool = False,
+    force: bool = False,
+    final_only_column: Optional[str] = None,
+) -> bool:
+    """
+    データストアのリーダーボードを順位付けしてスナップショットに書き出す。
+    final_only_column を指定した場合は、その列の値ごとに最終投稿の中で最良の1件のみで
+    順位付けしたリーダーボードも書き出す。
+    リーダーボードが前回から更新されていない場合や、スナップショットが固定されている場合は、
+    force=True でない限り何もしない。書き出した場合は True を返す。
+    各プロセスの SnapshotPublisher が同時に呼び出しても、ロックを取得した順に1つずつ実行され、
+    後から実行したプロセスは（同じバージョンが書き出し済みのため）何もしない。
+    """
+    with _publish_lock(snapshot_dir):
+        return _publish_snapshot_locked(
+            data_store,
+            competition_id,
+            header,
+            ascending,
+            latest_only_column,
+            snapshot_dir,
+            frozen,
+            force,
+            final_only_column,
+        )
+
+
+def _publish_snapshot_locked(
+    data_store: Any,
+    competition_id: str,
+    header: List[str],
+    ascending: bool,
+    latest_only_column: Optional[str],
+    snapshot_dir: str,
+    frozen: bool,
+    force: bool,
+    final_only_column: Optional[str],
+) -> bool:
+    meta = read_snapshot_meta(snapshot_dir, competition_id)
+    version = data_store.leaderboard_version(header)
+    if meta is not None and not force:
+        if meta.get("frozen") or meta["version"] == version:
+            return False
+
+    with metrics.timed("publish_leaderboard_snapshot"):
+        ranked = RankedLeaderboard(
+            data_store.read_leaderboard(header), ascending, latest_only_column
+        )
+        snapshot_root = _prepare_snapshot_dir(snapshot_dir)
+        # データファイルはバージョンごとに別名で書き出し、メタデータの置き換えで切り替える
+        data_file = f"{competition_id}-{version}-{int(time.time() * 1000)}.parquet"
+        # 順位の列は読み込み時に計算し直すため、元の列のみを書き出す
+        ranked.df[ranked.columns].to_parquet(snapshot_root / data_file, index=False)
+        final_data_file = None
+        if final_only_column:
+            # 最終投稿の選択も同じバージョンに含まれるため、Private の最終順位も一緒に固定される
+            final_df = data_store.read_leaderboard_columns(
+                header, header, final_only_column=final_only_column, ascending=ascending
+            )
+            final_data_file = data_file.replace(".parquet", "-final.parquet")
+            final_df.to_parquet(snapshot_root / final_data_file, index=False)
+        _write_json_atomic(
+            _meta_path(snapshot_dir, competition_id),
+            {
+                "version": version,
+                "published_at": time.time(),
+                "frozen": frozen,
+                "ascending": ascending,
+                "data_file": data_file,
+                "final_data_file": final_data_file,
+            },
+        )
+
+    # 読み込み中のセッションがあるかもしれないため、1つ前の書き出しのデータファイルは残す
+    old_files = sorted(
+        snapshot_root.glob(f"{competition_id}-*.parquet"), key=os.path.getmtime
+    )
+    keep = 4 if final_only_column else 2
+    for old in old_files[:-keep]:
+        old.unlink(missing_ok=True)
+    return True
+
+
+def set_snapshot_frozen(snapshot_dir: str, competition_id: str, frozen: bool) -> bool:
+    """スナップショットの固定・固定解除を切り替える。スナップショットがない場合は False を返す。"""
+    with _publish_lock(snapshot_dir):
+        meta = read_snapshot_meta(snapshot_dir, competition_id)
+        if meta is None:
+            return False
+        meta["frozen"] = frozen
+        _write_json_atomic(_meta_path(snapshot_dir, competition_id), meta)
+        return True
+
+
+class SnapshotPublisher(threading.Thread):
+    """
+    スナップショットを定期的に書き出すバックグラウンドスレッド。
+    request() で書き出しを要求された場合は、debounce_seconds の間に続けて要求がなければ書き出す
+    （投稿が続いている間は、投稿のたびではなくまとめて書き出す）。
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[str], None],
+        competition_ids: List[str],
+        interval_seconds: float,
+        debounce_seconds: float,
+    ):
+        super().__init__(name="leaderboard-snapshot-publisher", daemon=True)
+        self.publish = publish
+        self.competition_ids = competition_ids
+        self.interval_seconds = interval_seconds
+        self.debounce_seconds = debounce_seconds
+        self._requested: Dict[str, float] = {}
+        # 起動直後にすべてのコンペティションのスナップショットを書き出す
+        self._last_published: Dict[str, float] = {
+            competition_id: float("-inf") for competition_id in competition_ids
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def request(self, competition_id: str) -> None:
+        """スナップショットの書き出しを要求する。"""
+        with self._lock:
+            self._requested[competition_id] = time.monotonic()
+
+    def stop(self) -> None:
+        """スレッドを停止する。"""
+        self._stop.set()
+
+    def _due(self, now: float) -> List[str]:
+        with self._lock:
+            due = [
+                competition_id
+                for competition_id in self.competition_ids
+                if now - self._last_published[competition_id] >= self.interval_seconds
+                or (
+                    competition_id in self._requested
+                    and now - self._requested[competition_id] >= self.debounce_seconds
+                )
+            ]
+            for competition_id in due:
+                self._requested.pop(competition_id, None)
+                self._last_published[competition_id] = now
+        return due
+
+    def run(self):
+        while True:
+            for competition_id in self._due(time.monotonic()):
+                try:
+                    self.publish(competition_id)
+                except Exception as e:
+                    print(f"An error occurred while publishing the leaderboard snapshot: {e}")
+            if self._stop.wait(min(self.debounce_seconds, self.interval_seconds)):
+                return
@@ -0,0 +1,149 @@
+"""
+リーダーボードのスコア分布・散布図・スコアの推移用の集計モジュール。
+スコアの列からヒストグラムのビンと散布図用に間引いた点を事前に計算し、
+投稿数にかかわらずブラウザに送るデータ量と計算量が一定に収まるようにします。
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from caching import VersionedCache
+
+HISTOGRAM_BINS = 20  # ヒストグラムのビン数
+SCATTER_MAX_POINTS = 2000  # 散布図に描画する点の最大数（外れ値の代表点を除く）
+SCATTER_GRID_SIZE = 40  # 散布図の間引きで密度を保つためのグリッドの分割数
+PROGRESSION_MAX_USERS = 10  # スコアの推移を描画するユーザー数（自己ベストの上位から）
+PROGRESSION_MAX_POINTS = 50  # スコアの推移で、ユーザーごとに描画する点の最大数
+
+# スコア分布の集計結果（コンペティションとリーダーボードのバージョンをキーに、全セッションで共有）
+score_summary_cache = VersionedCache("leaderboard_score_summary", max_entries=32)
+# スコアの推移（コンペティションとリーダーボードのバージョンをキーに、全セッションで共有）
+progression_cache = VersionedCache("leaderboard_score_progression", max_entries=32)
+
+
+def histogram_edges(*arrays: np.ndarray, nbins: int = HISTOGRAM_BINS) -> np.ndarray:
+    """すべての配列の有限値を含む範囲を nbins 等分したビンの境界を返す。"""
+    values = np.concatenate([a[np.isfinite(a)] for a in arrays])
+    if values.size == 0:
+        return np.linspace(0.0, 1.0, nbins + 1)
+    low, high = values.min(), values.max()
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, nbins + 1)
+
+
+def histogram(values: np.ndarray, edges: np.ndarray) -> Dict[str, List[float]]:
+    """ビンごとの件数を、描画に必要な中心・幅とともに返す。"""
+    counts, _ = np.histogram(values[np.isfinite(values)], bins=edges)
+    return {
+        "centers": ((edges[:-1] + edges[1:]) / 2).tolist(),
+        "widths": np.diff(edges).tolist(),
+        "counts": counts.tolist(),
+    }
+
+
+def downsample_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int = SCATTER_MAX_POINTS,
+    grid_size: int = SCATTER_GRID_SIZE,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    散布図の点を、分布の密度を保ったまま間引いたインデックスを返す。
+    一様な無作為抽出で密度を保ち、点の少ない領域（外れ値）が消えないよう、
+    grid_size x grid_size のグリッドの空でないセルからそれぞれ1点を必ず残す。
+    """
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if valid.size <= max_points:
+        return valid
+
+    rng = np.random.default_rng(seed)
+    sampled = rng.choice(valid, size=max_points, replace=False)
+
+    # 各セルの代表点（セル内で最初に現れる点）
+    xv, yv = x[valid], y[valid]
+    x_bins = np.digitize(xv, np.linspace(xv.min(), xv.max(), grid_size + 1)[1:-1])
+    y_bins = np.digitize(yv, np.linspace(yv.min(), yv.max(), grid_size + 1)[1:-1])
+    _, first = np.unique(x_bins * grid_size + y_bins, return_index=True)
+
+    return np.union1d(sampled, valid[first])
+
+
+def build_score_summary(
+    scores_df: pd.DataFrame, label_column: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    public_score / private_score の列から、スコア分布のヒストグラムと
+    Public vs Private の散布図に必要なデータをまとめて計算する。
+    label_column を指定した場合、散布図の点にその列の値を含める。
+    """
+    public = pd.to_numeric(scores_df["public_score"], errors="coerce").to_numpy(float)
+    private = pd.to_numeric(scores_df["private_score"], errors="coerce").to_numpy(
+        float
+    )
+
+    public_edges = histogram_edges(public)
+    overlay_edges = histogram_edges(public, private)
+
+    indices = downsample_indices(public, private)
+    scatter_df = pd.DataFrame(
+        {"public_score": public[indices], "private_score": private[indices]}
+    )
+    if label_column is not None:
+        scatter_df[label_column] = scores_df[label_column].to_numpy()[indices]
+
+    return {
+        "n_submissions": len(scores_df),
+        "public_histogram": histogram(public, public_edges),
+        "overlay_histograms": {
+            "public_score": histogram(public, overlay_edges),
+            "private_score": histogram(private, overlay_edges),
+        },
+        "scatter": scatter_df,
+    }
+
+
+def score_progression(
+    df: pd.DataFrame, owner_column: str, ascending: bool
+) -> pd.DataFrame:
+    """
+    ユーザーごとに投稿時刻順の Public スコアの自己ベスト（累積の最小値・最大値）を計算し、
+    自己ベストが更新された投稿のみを返す。
+    戻り値は owner_column, username, submission_time, best_score の列を持ち、ユーザー・投稿時刻の順に並ぶ。
+    データストアのSQLのウィンドウ関数による実装と同じ結果を、ループを使わずに計算する。
+    """
+    score = pd.to_numeric(df["public_score"], errors="coerce")
+    progression = pd.DataFrame({owner_column: df[owner_column].fillna("").to_numpy()})
+    if owner_column != "username":
+        progression["username"] = df["username"].to_numpy()
+    progression["submission_time"] = df["submission_time"].to_numpy()
+    progression["best_score"] = score.to_numpy(float)
+    progression = progression[progression["best_score"].notna()]
+    progression = progression.sort_values(
+        [owner_column, "submission_time"], kind="stable"
+    ).reset_index(drop=True)
+
+    grouped = progression.groupby(owner_column, sort=False)["best_score"]
+    best = grouped.cummin() if ascending else grouped.cummax()
+    previous = best.groupby(progression[owner_column], sort=False).shift()
+    improved = previous.isna() | (best != previous)
+    progression["best_score"] = best
+    return progression[improved.to_numpy()].reset_index(drop=True)
+
+
+def downsample_progression(
+    progression: pd.DataFrame, owner_column: str, max_points: int = PROGRESSION_MAX_POINTS
+) -> pd.DataFrame:
+    """
+    ユーザーごとの自己ベストの推移を、最初と最後の点を残して等間隔に max_points 点まで間引く。
+    progression はユーザー・投稿時刻の順に並んでいること。
+    """
+    position = progression.groupby(owner_column, sort=False).cumcount().to_numpy()
+    count = progression.groupby(owner_column, sort=False)[owner_column].transform("size").to_numpy()
+    step = np.maximum((count - 1) / max(max_points - 1, 1), 1.0)
+    # 等間隔の位置に最も近い点（最後の点を含む）を残す
+    keep = (np.floor(position / step) != np.floor((position - 1) / step)) | (position == count - 1)
+    return progression[keep].reset_index(drop=True)
@@ -0,0 +1,175 @@
+"""
+運用メトリクス収集モジュール。
+データストア操作のレイテンシ、キャッシュのヒット率、スコア計算ジョブの状況、
+投稿イベントなどをプロセス内で集計し、管理者用ダッシュボード
+（for_admin/apps/view_performance_app.py）から参照できるよう
+定期的にJSONファイルへ書き出します。
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# 操作ごとに保持するレイテンシのサンプル数（パーセンタイル計算用）
+MAX_LATENCY_SAMPLES = 2000
+# イベントごとに保持するタイムスタンプ数（投稿数/分の計算用）
+MAX_EVENT_SAMPLES = 5000
+# メトリクスファイルを書き出す最小間隔（秒）
+FLUSH_INTERVAL_SECONDS = 5.0
+
+_lock = threading.Lock()
+_latencies: Dict[str, Deque[float]] = defaultdict(
+    lambda: deque(maxlen=MAX_LATENCY_SAMPLES)
+)
+_latency_counts: Dict[str, int] = defaultdict(int)
+_cache_stats: Dict[str, Dict[str, int]] = defaultdict(
+    lambda: {"hits": 0, "misses": 0}
+)
+_gauges: Dict[str, float] = defaultdict(float)
+_events: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=MAX_EVENT_SAMPLES))
+_started_at = time.time()
+_last_flush = 0.0
+# 間隔内のため書き出しを見送った変更を、間隔の経過後に書き出すタイマー
+_flush_timer: Optional[threading.Timer] = None
+
+
+def record_latency(operation: str, seconds: float) -> None:
+    """操作のレイテンシ（秒）を記録する。"""
+    with _lock:
+        _latencies[operation].append(seconds)
+        _latency_counts[operation] += 1
+    maybe_flush()
+
+
+@contextmanager
+def timed(operation: str) -> Iterator[None]:
+    """with ブロックの実行時間を operation のレイテンシとして記録する。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_latency(operation, time.perf_counter() - start)
+
+
+def record_cache(name: str, hit: bool) -> None:
+    """キャッシュのヒット/ミスを記録する。"""
+    with _lock:
+        _cache_stats[name]["hits" if hit else "misses"] += 1
+    maybe_flush()
+
+
+def add_gauge(name: str, delta: float) -> None:
+    """ゲージ（実行中のジョブ数など）を増減する。"""
+    with _lock:
+        _gauges[name] += delta
+    maybe_flush()
+
+
+def record_event(name: str) -> None:
+    """イベント（投稿など）の発生時刻を記録する。"""
+    with _lock:
+        _events[name].append(time.time())
+    maybe_flush()
+
+
+def snapshot() -> Dict[str, Any]:
+    """現在のメトリクスをJSONに変換可能な辞書として返す。"""
+    with _lock:
+        return {
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "started_at": _started_at,
+            "updated_at": time.time(),
+            "latencies": {k: list(v) for k, v in _latencies.items()},
+            "latency_counts": dict(_latency_counts),
+            "cache_stats": {k: dict(v) for k, v in _cache_stats.items()},
+            "gauges": dict(_gauges),
+            "events": {k: list(v) for k, v in _events.items()},
+        }
+
+
+def _get_metrics_dir() -> Path:
+    from config import METRICS_DIR
+
+    metrics_dir = Path(METRICS_DIR)
+    if not metrics_dir.exists():
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        # メトリクスファイルをリポジトリに含めないようにする
+        (metrics_dir / ".gitignore").write_text("*\n", encoding="utf-8")
+    return metrics_dir
+
+
+def maybe_flush(force: bool = False) -> None:
+    """
+    前回の書き出しから FLUSH_INTERVAL_SECONDS 以上経過していれば、
+    このプロセスのメトリクスをファイルに書き出す。
+    経過していない場合は、間隔の経過後に書き出すタイマーを設定する
+    （ジョブ終了時のゲージの減少などが、その後に操作がなくても反映されるようにするため）。
+    """
+    global _last_flush, _flush_timer
+    now = time.time()
+    with _lock:
+        if not force and now - _last_flush < FLUSH_INTERVAL_SECONDS:
+            if _flush_timer is None:
+                _flush_timer = threading.Timer(
+                    _last_flush + FLUSH_INTERVAL_SECONDS - now, _flush_pending
+                )
+                _flush_timer.daemon = True
+                _flush_timer.start()
+            return
+        _last_flush = now
+
+    try:
+        metrics_dir = _get_metrics_dir()
+        data = snapshot()
+        path = metrics_dir / f"{data['host']}-{data['pid']}.json"
+        # 同時に書き出すスレッドが同じ一時ファイルに書き込まないよう、一時ファイルの名前は一意にする
+        with tempfile.NamedTemporaryFile(
+            "w",
+            dir=metrics_dir,
+            prefix=f"{path.name}.",
+            suffix=".tmp",
+            encoding="utf-8",
+            delete=False,
+        ) as tmp:
+            tmp.write(json.dumps(data))
+        try:
+            # 読み込み側が書きかけのファイルを見ないよう、置き換えはアトミックに行う
+            os.replace(tmp.name, path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+    except Exception as e:
+        print(f"An error occurred while writing metrics: {e}")
+
+
+def _flush_pending() -> None:
+    global _flush_timer
+    with _lock:
+        _flush_timer = None
+    maybe_flush(force=True)
+
+
+def load_snapshots(max_age_seconds: float = 600.0) -> List[Dict[str, Any]]:
+    """
+    各プロセスが書き出したメトリクスを読み込む。
+    max_age_seconds 以上更新されていないファイル（終了したプロセスなど）は無視する。
+    """
+    metrics_dir = _get_metrics_dir()
+    now = time.time()
+    snapshots = []
+    for path in metrics_dir.glob("*.json"):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if now - data.get("updated_at", 0) <= max_age_seconds:
+            snapshots.append(data)
+    return snapshots
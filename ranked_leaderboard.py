@@ -0,0 +1,104 @@
+"""
+順位付け済みリーダーボードのモジュール。
+リーダーボードのバージョンごとに一度だけ、投稿時刻の変換と Public / Private の順位付けを行い、
+ページ表示や検索ではその結果を切り出すだけで済むようにします。
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 順位を付けるスコアの列と、その順位を保持する列
+RANK_COLUMNS: Dict[str, str] = {
+    "public_score": "public_rank",
+    "private_score": "private_rank",
+}
+
+
+def parse_submission_time(times: pd.Series) -> pd.Series:
+    """投稿時刻の文字列を日本時間 (Asia/Tokyo) の datetime に変換する。"""
+    if isinstance(times.dtype, pd.DatetimeTZDtype):
+        return times.dt.tz_convert("Asia/Tokyo")
+    # タイムゾーン情報がない場合はUTCとして解釈
+    return pd.to_datetime(times, errors="coerce", utc=True).dt.tz_convert("Asia/Tokyo")
+
+
+class RankedLeaderboard:
+    """
+    リーダーボードを一度だけ順位付けした、読み取り専用のビュー。
+    submission_time は日本時間の datetime に変換済みで、
+    public_rank / private_rank 列にそれぞれのスコアでの順位（同点は投稿が早い方が上位）を持つ。
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        ascending: bool,
+        latest_only_column: Optional[str] = None,
+    ):
+        df = df.assign(submission_time=parse_submission_time(df["submission_time"]))
+        if latest_only_column and latest_only_column in df.columns:
+            # submission_timeが新しい順にソートし、ユーザーごとに最初の行（最新の投稿）を残す
+            df = df.sort_values("submission_time", ascending=False).drop_duplicates(
+                subset=[latest_only_column], keep="first"
+            )
+        df = df.reset_index(drop=True)
+
+        # 投稿時刻（欠損は最後）を同点時の並び順に使う
+        times = df["submission_time"]
+        time_key = np.where(
+            times.isna(), np.iinfo(np.int64).max, times.to_numpy("datetime64[ns]").view("int64")
+        )
+
+        self.columns: List[str] = list(df.columns)
+        self._orders: Dict[str, np.ndarray] = {}
+        for score_column, rank_column in RANK_COLUMNS.items():
+            if score_column not in df.columns:
+                continue
+            score = pd.to_numeric(df[score_column], errors="coerce").to_numpy(float)
+            key = score if ascending else -score
+            # np.lexsort は最後のキーを最優先で並べる（欠損スコア → スコア → 投稿時刻の順）
+            order = np.lexsort((time_key, key, np.isnan(score)))
+            ranks = np.empty(len(df), dtype=np.int64)
+            ranks[order] = np.arange(1, len(df) + 1)
+            df[rank_column] = ranks
+            self._orders[score_column] = order
+
+        self.df = df
+        self._username_lower: Optional[pd.Series] = None
+
+    def page(
+        self,
+        sort_column: str,
+        offset: int,
+        limit: int,
+        filters: Optional[Dict[str, str]] = None,
+        username_contains: Optional[str] = None,
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        sort_column の順位順に並べ、絞り込んだうえで offset から limit 件を返す。
+        返す DataFrame には、元の列に加えて sort_column での順位を "rank" 列として付与する。
+        戻り値は (該当ページのDataFrame, 絞り込み後の総行数)。
+        """
+        order = self._orders[sort_column]
+
+        mask = None
+        for column, value in (filters or {}).items():
+            column_mask = (self.df[column].astype(str) == str(value)).to_numpy()
+            mask = column_mask if mask is None else mask & column_mask
+        if username_contains:
+            if self._username_lower is None:
+                self._username_lower = self.df["username"].astype(str).str.lower()
+            column_mask = self._username_lower.str.contains(
+                username_contains.lower(), regex=False
+            ).to_numpy()
+            mask = column_mask if mask is None else mask & column_mask
+        if mask is not None:
+            order = order[mask[order]]
+
+        # 表示するページの行だけを取り出す
+        rows = self.df.iloc[order[offset : offset + limit]]
+        page_df = rows[self.columns].reset_index(drop=True)
+        page_df.insert(0, "rank", rows[RANK_COLUMNS[sort_column]].to_numpy())
+        return page_df, len(order)
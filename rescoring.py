@@ -0,0 +1,169 @@
+"""
+保存済みの全投稿の再採点モジュール。
+正解データや評価関数を修正した場合に、保存しておいた予測値から全投稿のスコアを計算し直します。
+採点は複数のプロセスで並列に行い、各プロセスは正解データを共有メモリから参照します（共有メモリがない場合は、
+プロセスの起動時に正解データを1回だけ受け取ります）。同じ予測値（ダイジェスト）の投稿は1回のみ採点し、
+結果をその予測値のすべての投稿に対応付けます。結果はまとめてデータストアに書き戻します。
+"""
+
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from submission_archive import SUBMISSION_KEY_COLUMNS, SubmissionArchive
+
+RESCORE_CHUNK_SIZE = 20  # 1回のタスクで採点する投稿数（プロセス間の通信回数を抑える）
+
+# 各プロセスでの採点に使用する評価関数・正解データと、予測値を読み込むアーカイブ
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(
+    score_func: Callable[[pd.DataFrame, pd.DataFrame], Tuple[float, float]],
+    ground_truth_source: Tuple,
+    archive: Union[SubmissionArchive, str],
+) -> None:
+    """
+    プロセスの起動時に、評価関数と正解データを準備し、アーカイブを開く。
+    archive にディレクトリを指定した場合は、プロセスごとに1回だけアーカイブを開く。
+    """
+    if ground_truth_source[0] == "shared":
+        from shared_ground_truth import attach_ground_truth
+
+        _, pointer_dir, key = ground_truth_source
+        ground_truth = attach_ground_truth(pointer_dir, key)
+        if ground_truth is None:
+            raise RuntimeError("共有メモリの正解データを参照できませんでした。")
+    else:
+        ground_truth = ground_truth_source[1]
+    _worker_state["score_func"] = score_func
+    _worker_state["ground_truth"] = ground_truth
+    _worker_state["archive"] = (
+        archive if isinstance(archive, SubmissionArchive) else SubmissionArchive(archive)
+    )
+
+
+def _score_files(digests: List[str]) -> List[Tuple[float, float, str]]:
+    """保存した予測値を採点し、(public_score, private_score, エラーメッセージ) のリストを返す。"""
+    archive = _worker_state["archive"]
+    score_func = _worker_state["score_func"]
+    ground_truth = _worker_state["ground_truth"]
+    results = []
+    for digest in digests:
+        try:
+            public_score, private_score = score_func(archive.load(digest), ground_truth)
+            results.append((float(public_score), float(private_score), ""))
+        except Exception as e:
+            results.append((np.nan, np.nan, str(e)))
+    return results
+
+
+def _is_picklable(obj: Any) -> bool:
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
+
+def rescore_submissions(
+    archive: SubmissionArchive,
+    score_func: Callable[[pd.DataFrame, pd.DataFrame], Tuple[float, float]],
+    ground_truth: pd.DataFrame,
+    shared_ground_truth: Optional[Tuple[str, str]] = None,
+    max_workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> pd.DataFrame:
+    """
+    保存済みの全投稿を再採点し、キーの列と public_score / private_score / error 列の DataFrame を返す。
+    shared_ground_truth（共有メモリのポインタファイルのディレクトリ, キー）を指定した場合、
+    各プロセスは正解データを共有メモリから参照する。
+    評価関数がプロセス間で受け渡せない（ラムダ式など）場合や max_workers が 1 の場合は、このプロセスで採点する。
+    progress には (採点済みの投稿数, 全投稿数) が渡される。
+    """
+    entries = archive.entries()
+    # 同じ予測値の投稿は1回のみ採点する
+    counts = entries["digest"].value_counts(sort=False)
+    digests = counts.index.tolist()
+    chunks = [
+        digests[start : start + RESCORE_CHUNK_SIZE]
+        for start in range(0, len(digests), RESCORE_CHUNK_SIZE)
+    ]
+    chunk_sizes = [int(counts[chunk].sum()) for chunk in chunks]
+    results: List[Optional[List[Tuple[float, float, str]]]] = [None] * len(chunks)
+    done = 0
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1 or len(chunks) <= 1 or not _is_picklable(score_func):
+        _init_worker(score_func, ("frame", ground_truth), archive)
+        try:
+            for i, chunk in enumerate(chunks):
+                results[i] = _score_files(chunk)
+                done += chunk_sizes[i]
+                if progress is not None:
+                    progress(done, len(entries))
+        finally:
+            _worker_state.clear()
+    else:
+        if shared_ground_truth is not None:
+            ground_truth_source: Tuple = ("shared", *shared_ground_truth)
+        else:
+            ground_truth_source = ("frame", ground_truth)
+        # Streamlit のサーバープロセスはスレッドを使用しているため、fork ではなく spawn で起動する
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(score_func, ground_truth_source, str(archive.archive_dir)),
+        ) as executor:
+            futures = {
+                executor.submit(_score_files, chunk): i for i, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += chunk_sizes[i]
+                if progress is not None:
+                    progress(done, len(entries))
+
+    # 予測値ごとの結果を、その予測値のすべての投稿に対応付ける
+    scores = pd.DataFrame(
+        [score for chunk_results in results for score in chunk_results or []],
+        columns=["public_score", "private_score", "error"],
+        index=digests,
+    )
+    rescored = entries[SUBMISSION_KEY_COLUMNS].copy()
+    for column in scores.columns:
+        rescored[column] = scores[column].reindex(entries["digest"]).to_numpy()
+    return rescored
+
+
+def compare_scores(leaderboard_df: pd.DataFrame, rescored: pd.DataFrame) -> pd.DataFrame:
+    """
+    リーダーボードの現在のスコアと再採点したスコアを、キーの列で突き合わせて返す。
+    old_public_score / old_private_score 列に現在のスコア、changed 列にスコアが変わったかを持つ。
+    """
+    current = leaderboard_df.reindex(
+        columns=SUBMISSION_KEY_COLUMNS + ["public_score", "private_score"]
+    ).copy()
+    for column in SUBMISSION_KEY_COLUMNS:
+        current[column] = current[column].fillna("").astype(str)
+    current = current.rename(
+        columns={
+            "public_score": "old_public_score",
+            "private_score": "old_private_score",
+        }
+    )
+    current["old_public_score"] = pd.to_numeric(current["old_public_score"], errors="coerce")
+    current["old_private_score"] = pd.to_numeric(current["old_private_score"], errors="coerce")
+    merged = rescored.merge(current, on=SUBMISSION_KEY_COLUMNS, how="inner")
+    merged["changed"] = ~(
+        np.isclose(merged["public_score"], merged["old_public_score"], equal_nan=True)
+        & np.isclose(merged["private_score"], merged["old_private_score"], equal_nan=True)
+    )
+    return merged
@@ -0,0 +1,133 @@
+"""
+投稿時の順位計算用のスコア索引モジュール。
+Public / Private のスコアをそれぞれソート済みの配列で保持し、新しい投稿の順位・上位何%か・自己ベストかを
+リーダーボード全体を読み込まずに二分探索（O(log n)）で求められるようにします。
+索引は最初の投稿時にデータストアから作成し、以降は投稿のたびに差分で更新します。
+他のプロセスからの投稿は、一定の間隔で索引をデータストアから作成し直すまで反映されません
+（config._get_score_index を参照）。
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+# 索引を作成するスコアの列
+SCORE_COLUMNS = ["public_score", "private_score"]
+
+
+class ScoreIndex:
+    """
+    1つのコンペティションのスコアの索引。
+    スコアは小さいほど上位になるよう符号を揃えて（降順のコンペティションでは符号を反転して）保持する。
+    順位の付け方はリーダーボードと同じ（同点は投稿が早い方が上位、スコアの欠損は最下位）。
+    latest_only の場合は、リーダーボードと同じくユーザーごとに最新の投稿のみで順位を付ける。
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        ascending: bool,
+        owner_column: str,
+        latest_only: bool = False,
+    ):
+        """df はユーザーを識別する列、submission_time 列と、SCORE_COLUMNS の列を持つリーダーボード。"""
+        self.ascending = ascending
+        self.latest_only = latest_only
+        # 索引を作成した時刻（time.monotonic()）
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        owners = df[owner_column].astype(object).where(df[owner_column].notna(), "").astype(str)
+        keys = pd.DataFrame(
+            {c: self._key(pd.to_numeric(df[c], errors="coerce")) for c in SCORE_COLUMNS}
+        )
+        keys["owner"] = owners.to_numpy()
+
+        # ユーザーごとの最良の Public スコア（自己ベストの判定に使用）
+        self._best: Dict[str, float] = keys.groupby("owner")["public_score"].min().to_dict()
+
+        if latest_only:
+            # 投稿時刻が新しい順に並べ、ユーザーごとに最初の行（最新の投稿）を残す
+            times = pd.to_datetime(df["submission_time"], errors="coerce", utc=True)
+            keys = (
+                keys.assign(submission_time=times.to_numpy())
+                .sort_values("submission_time", ascending=False)
+                .drop_duplicates(subset=["owner"], keep="first")
+            )
+            self._latest: Dict[str, np.ndarray] = {
+                owner: row
+                for owner, row in zip(
+                    keys["owner"], keys[SCORE_COLUMNS].to_numpy(dtype=float)
+                )
+            }
+
+        self._sorted: Dict[str, np.ndarray] = {}
+        self._n_missing: Dict[str, int] = {}
+        for column in SCORE_COLUMNS:
+            values = keys[column].to_numpy(dtype=float)
+            self._sorted[column] = np.sort(values[~np.isnan(values)])
+            self._n_missing[column] = int(np.isnan(values).sum())
+
+    def _key(self, score: Any) -> Any:
+        """スコアを、小さいほど上位になる値に変換する。"""
+        return score if self.ascending else -score
+
+    def _remove(self, column: str, key: float) -> None:
+        if np.isnan(key):
+            self._n_missing[column] -= 1
+            return
+        values = self._sorted[column]
+        position = np.searchsorted(values, key)
+        if position < len(values) and values[position] == key:
+            self._sorted[column] = np.delete(values, position)
+
+    def add(self, owner: str, scores: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        新しい投稿を索引に追加し、その投稿の順位を返す。
+        戻り値は SCORE_COLUMNS ごとの {"rank", "total", "percentile"}（スコアの欠損は rank が None）と、
+        Public スコアが以前の投稿より良いかを表す "personal_best"。
+        ソート済みの配列への挿入はコピーを伴うため O(n) だが、投稿1件あたり1回の連続したメモリのコピーで、
+        リーダーボードの読み込みやソートに比べて十分に小さい。
+        """
+        keys = {
+            column: float(self._key(pd.to_numeric(scores.get(column), errors="coerce")))
+            for column in SCORE_COLUMNS
+        }
+        with self._lock:
+            if self.latest_only:
+                # 以前の最新の投稿は、リーダーボードに表示されなくなる
+                previous = self._latest.get(owner)
+                if previous is not None:
+                    for column, key in zip(SCORE_COLUMNS, previous):
+                        self._remove(column, key)
+                self._latest[owner] = np.array([keys[c] for c in SCORE_COLUMNS])
+
+            standing: Dict[str, Any] = {}
+            for column, key in keys.items():
+                values = self._sorted[column]
+                if np.isnan(key):
+                    self._n_missing[column] += 1
+                    rank = None
+                else:
+                    # 同点の投稿はすべて今回の投稿より早いため、同点の後ろに挿入する
+                    position = int(np.searchsorted(values, key, side="right"))
+                    self._sorted[column] = np.insert(values, position, key)
+                    rank = position + 1
+                total = len(self._sorted[column]) + self._n_missing[column]
+                standing[column] = {
+                    "rank": rank,
+                    "total": total,
+                    "percentile": None if rank is None else rank / total * 100,
+                }
+
+            best = self._best.get(owner)
+            public_key = keys["public_score"]
+            standing["personal_best"] = not np.isnan(public_key) and (
+                best is None or np.isnan(best) or public_key < best
+            )
+            if standing["personal_best"]:
+                self._best[owner] = public_key
+        return standing
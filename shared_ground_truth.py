@@ -0,0 +1,237 @@
+"""
+正解データの共有メモリモジュール。
+読み込んで型変換した正解データを共有メモリに一度だけ書き込み、
+同じマシン上の他のプロセス（複数のStreamlitサーバープロセスやスコア計算のワーカー）は
+その共有メモリを読み取り専用で参照します。プロセス数にかかわらず、正解データはメモリ上に1つだけ保持されます。
+
+共有メモリのレイアウト:
+    [ヘッダー長 (8バイト, little endian)] [ヘッダー (JSON)] [各列の配列 (64バイト境界に整列)]
+ヘッダーには、バージョン（内容のハッシュ値）と各列の型・位置が含まれます。
+現在の共有メモリの名前は、コンペティションごとのポインタファイル（JSON）で公開します。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from caching import FileCache
+
+_ALIGNMENT = 64
+_LENGTH_BYTES = 8
+
+_lock = threading.Lock()
+# このプロセスで開いている共有メモリ（名前 -> SharedMemory）。参照中はマッピングを保持しておく
+_segments: Dict[str, shared_memory.SharedMemory] = {}
+# 共有メモリから組み立てた DataFrame（キー -> (名前, DataFrame)）
+_frames: Dict[str, Tuple[str, pd.DataFrame]] = {}
+_pointer_cache = FileCache("shared_ground_truth")
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _encode_columns(df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], List[np.ndarray]]:
+    """
+    各列を共有メモリに置ける固定長の配列に変換する。
+    数値の列はそのまま、それ以外の列（Usage など）はカテゴリのコードと値の一覧に変換する。
+    """
+    columns, arrays = [], []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            array = np.ascontiguousarray(series.to_numpy())
+            columns.append({"name": str(name), "kind": "numeric", "dtype": array.dtype.str})
+        else:
+            categorical = pd.Categorical(series.astype("string"))
+            array = np.ascontiguousarray(categorical.codes.astype(np.int32))
+            columns.append(
+                {
+                    "name": str(name),
+                    "kind": "categorical",
+                    "dtype": array.dtype.str,
+                    "categories": [str(c) for c in categorical.categories],
+                }
+            )
+        arrays.append(array)
+    return columns, arrays
+
+
+def _content_version(columns: List[Dict[str, Any]], arrays: List[np.ndarray]) -> str:
+    digest = hashlib.sha256()
+    for column, array in zip(columns, arrays):
+        digest.update(json.dumps(column, sort_keys=True).encode("utf-8"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def content_version(df: pd.DataFrame) -> str:
+    """正解データの内容のハッシュ値（共有メモリのバージョンと同じ値）を返す。"""
+    return _content_version(*_encode_columns(df))
+
+
+def published_version(pointer_dir: str, key: str) -> Optional[str]:
+    """公開中の正解データのバージョンを返す。公開されていない場合は None を返す。"""
+    pointer = _pointer_cache.get(str(_pointer_path(pointer_dir, key)), _read_pointer)
+    return pointer["version"] if pointer is not None else None
+
+
+def _segment_name(key: str, version: str) -> str:
+    # 共有メモリの名前は短く制限されるOSがあるため、キーもハッシュ値にする
+    key_hash = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    return f"gt_{key_hash}_{version[:16]}"
+
+
+def _pointer_path(pointer_dir: str, key: str) -> Path:
+    return Path(pointer_dir) / f"{key}.json"
+
+
+def _read_pointer(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _release(name: str) -> None:
+    """古い版の共有メモリのマッピングを閉じる。"""
+    segment = _segments.pop(name, None)
+    if segment is None:
+        return
+    try:
+        segment.close()
+    except BufferError:
+        # 参照中の DataFrame が残っている場合は、ガベージコレクションに任せる
+        pass
+
+
+def _attach(key: str, name: str, version: str) -> Optional[pd.DataFrame]:
+    """共有メモリを開き、その配列を参照する（コピーしない）DataFrame を返す。"""
+    with _lock:
+        cached = _frames.get(key)
+        if cached is not None and cached[0] == name:
+            return cached[1]
+        segment = _segments.get(name)
+        if segment is None:
+            try:
+                # 作成したプロセスの終了後も残るよう、resource_tracker による自動削除は行わない
+                segment = shared_memory.SharedMemory(name=name, track=False)
+            except FileNotFoundError:
+                return None
+        buf = segment.buf
+        header_length = int.from_bytes(buf[:_LENGTH_BYTES], "little")
+        header = json.loads(bytes(buf[_LENGTH_BYTES : _LENGTH_BYTES + header_length]))
+        if header["version"] != version:
+            return None
+
+        data: Dict[str, Any] = {}
+        for column in header["columns"]:
+            array = np.ndarray(
+                (header["n_rows"],),
+                dtype=np.dtype(column["dtype"]),
+                buffer=buf,
+                offset=column["offset"],
+            )
+            array.flags.writeable = False
+            if column["kind"] == "categorical":
+                data[column["name"]] = pd.Categorical.from_codes(
+                    array, categories=column["categories"]
+                )
+            else:
+                data[column["name"]] = array
+        df = pd.DataFrame(data, copy=False)
+        _segments[name] = segment
+        _frames[key] = (name, df)
+        if cached is not None:
+            _release(cached[0])
+        return df
+
+
+def attach_ground_truth(pointer_dir: str, key: str) -> Optional[pd.DataFrame]:
+    """
+    公開されている正解データを共有メモリから参照する。
+    公開されていない場合や、共有メモリが存在しない（マシンの再起動後など）場合は None を返す。
+    返す DataFrame の配列は読み取り専用で、列の追加などは呼び出し元の浅いコピーに対して行われる。
+    """
+    pointer = _pointer_cache.get(str(_pointer_path(pointer_dir, key)), _read_pointer)
+    if pointer is None:
+        return None
+    df = _attach(key, pointer["name"], pointer["version"])
+    return df.copy(deep=False) if df is not None else None
+
+
+def publish_ground_truth(df: pd.DataFrame, pointer_dir: str, key: str) -> str:
+    """
+    正解データを共有メモリに書き込み、ポインタファイルで公開する。
+    同じ内容の正解データがすでに公開されていれば書き込まない。公開した共有メモリの名前を返す。
+    """
+    columns, arrays = _encode_columns(df)
+    version = _content_version(columns, arrays)
+    name = _segment_name(key, version)
+
+    # 各列の配置を決める
+    header: Dict[str, Any] = {"version": version, "n_rows": len(df), "columns": columns}
+    header_bytes = json.dumps(header).encode("utf-8")
+    for _ in range(2):
+        # オフセットを書き込むとヘッダー長が変わるため、収束するまで計算し直す
+        offset = _align(_LENGTH_BYTES + len(header_bytes) + 256)
+        for column, array in zip(columns, arrays):
+            column["offset"] = offset
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode("utf-8")
+    size = max(offset, 1)
+
+    with _lock:
+        try:
+            segment = shared_memory.SharedMemory(
+                name=name, create=True, size=size, track=False
+            )
+        except FileExistsError:
+            # 他のプロセスが同じ内容を公開済み
+            segment = None
+        if segment is not None:
+            buf = segment.buf
+            for column, array in zip(columns, arrays):
+                buf[column["offset"] : column["offset"] + array.nbytes] = array.tobytes()
+            buf[_LENGTH_BYTES : _LENGTH_BYTES + len(header_bytes)] = header_bytes
+            # ヘッダー長は最後に書き込み、書き込み途中の共有メモリを参照されないようにする
+            buf[:_LENGTH_BYTES] = len(header_bytes).to_bytes(_LENGTH_BYTES, "little")
+            _segments[name] = segment
+
+    pointer_path = _pointer_path(pointer_dir, key)
+    previous = None
+    if pointer_path.exists():
+        try:
+            previous = _read_pointer(str(pointer_path))["name"]
+        except (OSError, ValueError, KeyError):
+            previous = None
+
+    if not pointer_path.parent.exists():
+        pointer_path.parent.mkdir(parents=True, exist_ok=True)
+        # ポインタファイルをリポジトリに含めないようにする
+        (pointer_path.parent / ".gitignore").write_text("*\n", encoding="utf-8")
+    tmp_path = pointer_path.with_name(pointer_path.name + ".tmp")
+    tmp_path.write_text(
+        json.dumps({"name": name, "version": version, "published_at": time.time()}),
+        encoding="utf-8",
+    )
+    # 読み込み側が書きかけのファイルを見ないよう、置き換えはアトミックに行う
+    os.replace(tmp_path, pointer_path)
+    _pointer_cache.invalidate(str(pointer_path))
+
+    if previous and previous != name:
+        # 古い版の名前を削除する（参照中のプロセスのマッピングは、閉じるまで有効なまま）
+        try:
+            old = _segments.get(previous) or shared_memory.SharedMemory(
+                name=previous, track=False
+            )
+            old.unlink()
+        except FileNotFoundError:
+            pass
+    return name
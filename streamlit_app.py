@@ -1,6 +1,10 @@
 import streamlit as st
 
+from competitions import select_competition
 from config import get_APP_NAVIGATION_PAGES
 
+# 複数のコンペティションを開催している場合は、サイドバーで選択する
+select_competition()
+
 pg = st.navigation(get_APP_NAVIGATION_PAGES())
 pg.run()
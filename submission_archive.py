@@ -0,0 +1,286 @@
+"""
+投稿された予測値の保存（アーカイブ）モジュール。
+スコア計算に使用した予測値を投稿ごとに保存し、正解データや評価関数を修正した場合の再採点や、
+投稿の監査・アンサンブルに使用できるようにします。
+
+保存形式:
+    - id の列は、サンプル提出ファイルと同じためコンペティションごとに1回だけ保存し（ids.parquet）、
+      各投稿の予測値はその並びに揃えて、予測値の列のみを保存する
+    - 予測値は列指向の圧縮形式（Parquet, zstd）で、浮動小数点数は float32 で保存する
+    - 内容のハッシュ値をファイル名にし、同じ内容の投稿は1つのファイルを共有する
+リーダーボードの行（ユーザー名・メールアドレスのハッシュ値・投稿時刻・投稿ID）から保存した予測値への対応は、
+索引（SQLiteファイル）で管理します。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# リーダーボードの行を特定する列
+# （submission_id のない以前の投稿は、同じユーザーの同じ時刻の投稿を1件とみなす）
+SUBMISSION_KEY_COLUMNS: List[str] = ["username", "email_hash", "submission_time", "submission_id"]
+
+_FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def submission_key(submission_data: Dict[str, Any]) -> Dict[str, str]:
+    """投稿データから、リーダーボードの行を特定するキー（欠損は空文字列）を返す。"""
+    key = {}
+    for column in SUBMISSION_KEY_COLUMNS:
+        value = submission_data.get(column)
+        key[column] = "" if value is None or value != value else str(value)
+    return key
+
+
+def normalize_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    リーダーボードの行から、キーの列を索引と同じ形式（文字列、欠損は空文字列）で返す。
+    日本時間の datetime に変換済みの submission_time（スナップショットなど）は、投稿時の文字列の形式に戻す。
+    """
+    keys = pd.DataFrame(index=df.index)
+    for column in SUBMISSION_KEY_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series("", index=df.index)
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            values = values.dt.strftime("%Y-%m-%d %H:%M:%S%z")
+        keys[column] = values.astype(object).where(values.notna(), "").astype(str)
+    return keys
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """浮動小数点数の列は float32（範囲に収まる場合）に、整数の列は最小の整数型に変換する。"""
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_float_dtype(values):
+            finite = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            finite = finite[np.isfinite(finite)]
+            if finite.size == 0 or np.abs(finite).max() <= _FLOAT32_MAX:
+                values = values.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            values = pd.to_numeric(values, downcast="integer")
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def _digest(df: pd.DataFrame) -> str:
+    """列名・データ型・値から、内容のハッシュ値を計算する。"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(df[c].dtype)] for c in df.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    write(tmp_path)
+    # 読み込み側が書きかけのファイルを見ないよう、置き換えはアトミックに行う
+    os.replace(tmp_path, path)
+
+
+class SubmissionArchive:
+    """
+    コンペティションごとの、投稿された予測値の保存先ディレクトリ。
+    同一ノード上の複数プロセスから共有できるよう、ファイルの書き込みはアトミックに、
+    索引への書き込みはトランザクションで行う。
+    """
+
+    INDEX_FILE_NAME = "index.db"
+    IDS_FILE_NAME = "ids.parquet"
+    LAYOUT_FILE_NAME = "layout.json"
+    OBJECTS_DIR_NAME = "objects"
+    COMPRESSION = "zstd"
+
+    def __init__(self, archive_dir: str):
+        self.archive_dir = Path(archive_dir)
+        if not self.archive_dir.exists():
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            # 保存した予測値をリポジトリに含めないようにする
+            (self.archive_dir / ".gitignore").write_text("*\n", encoding="utf-8")
+        (self.archive_dir / self.OBJECTS_DIR_NAME).mkdir(exist_ok=True)
+        self._ids: Optional[pd.Series] = None
+        self._layout: Optional[Dict[str, Any]] = None
+        with closing(self._connect()) as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                con.execute(self._create_entries_sql("archive_entries"))
+                self._migrate_entries(con)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _create_entries_sql(table_name: str) -> str:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {table_name} ("
+            + ", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in SUBMISSION_KEY_COLUMNS)
+            + ", digest TEXT NOT NULL, archived_at REAL NOT NULL, "
+            f"PRIMARY KEY ({', '.join(SUBMISSION_KEY_COLUMNS)}))"
+        )
+
+    def _migrate_entries(self, con: sqlite3.Connection) -> None:
+        """
+        キーの列が追加された場合（submission_id など）、主キーを変更するため索引を作り直す。
+        以前の行の追加された列は空文字列とする。
+        """
+        existing = [row[1] for row in con.execute("PRAGMA table_info(archive_entries)")]
+        if all(c in existing for c in SUBMISSION_KEY_COLUMNS):
+            return
+        columns = [c for c in SUBMISSION_KEY_COLUMNS if c in existing]
+        con.execute(self._create_entries_sql("archive_entries_migrated"))
+        con.execute(
+            "INSERT INTO archive_entries_migrated "
+            f"({', '.join(columns)}, digest, archived_at) "
+            f"SELECT {', '.join(columns)}, digest, archived_at FROM archive_entries"
+        )
+        con.execute("DROP TABLE archive_entries")
+        con.execute("ALTER TABLE archive_entries_migrated RENAME TO archive_entries")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            self.archive_dir / self.INDEX_FILE_NAME, timeout=30, isolation_level=None
+        )
+
+    def _object_path(self, digest: str) -> Path:
+        return self.archive_dir / self.OBJECTS_DIR_NAME / f"{digest}.parquet"
+
+    def _load_layout(self) -> Optional[Dict[str, Any]]:
+        """id の列と列の並び（layout.json）と、保存済みの id を読み込む。未保存の場合は None を返す。"""
+        if self._layout is None:
+            layout_path = self.archive_dir / self.LAYOUT_FILE_NAME
+            if not layout_path.exists():
+                return None
+            self._layout = json.loads(layout_path.read_text(encoding="utf-8"))
+            self._ids = pd.read_parquet(self.archive_dir / self.IDS_FILE_NAME)[
+                self._layout["id_column"]
+            ]
+        return self._layout
+
+    def _init_layout(self, predictions: pd.DataFrame, id_column: str) -> Dict[str, Any]:
+        """最初の投稿の id（ソート済み）を、コンペティションの id として保存する。"""
+        ids = predictions[[id_column]].sort_values(id_column).reset_index(drop=True)
+        _write_atomic(
+            self.archive_dir / self.IDS_FILE_NAME,
+            lambda path: ids.to_parquet(path, index=False, compression=self.COMPRESSION),
+        )
+        _write_atomic(
+            self.archive_dir / self.LAYOUT_FILE_NAME,
+            lambda path: path.write_text(
+                json.dumps(
+                    {"id_column": id_column, "columns": [str(c) for c in predictions.columns]}
+                ),
+                encoding="utf-8",
+            ),
+        )
+        self._layout = None
+        return self._load_layout()
+
+    def _align_to_ids(self, predictions: pd.DataFrame, id_column: str) -> Optional[pd.DataFrame]:
+        """
+        予測値を保存済みの id の並びに揃え、予測値の列のみを返す。
+        id の集合が保存済みのものと一致しない場合は None を返す。
+        """
+        ids = self._ids.to_numpy()
+        submitted = predictions[id_column].to_numpy()
+        if len(ids) == 0 or len(submitted) != len(ids) or submitted.dtype.kind != ids.dtype.kind:
+            return None
+        positions = np.searchsorted(ids, submitted).clip(max=len(ids) - 1)
+        if not (ids[positions] == submitted).all():
+            return None
+        if np.bincount(positions, minlength=len(ids)).max() > 1:
+            return None
+        order = np.empty(len(ids), dtype=np.int64)
+        order[positions] = np.arange(len(ids))
+        return predictions.drop(columns=[id_column]).iloc[order].reset_index(drop=True)
+
+    def save(self, submission_data: Dict[str, Any], predictions: pd.DataFrame) -> str:
+        """
+        投稿の予測値を保存し、内容のハッシュ値を返す。
+        同じ内容の予測値がすでに保存されている場合は、ファイルを書き込まずに共有する。
+        """
+        columns = [str(c) for c in predictions.columns]
+        id_column = "id" if "id" in columns else columns[0]
+        layout = self._load_layout() or self._init_layout(predictions, id_column)
+
+        values = None
+        if layout["id_column"] == id_column and layout["columns"] == columns:
+            values = self._align_to_ids(predictions, id_column)
+        if values is None:
+            # id が保存済みのものと一致しない場合（サンプル提出ファイルの変更など）は、id の列も含めて保存する
+            values = predictions.reset_index(drop=True)
+        values = _compact(values)
+
+        digest = _digest(values)
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            _write_atomic(
+                object_path,
+                lambda path: values.to_parquet(
+                    path, index=False, compression=self.COMPRESSION
+                ),
+            )
+
+        key = submission_key(submission_data)
+        with closing(self._connect()) as con:
+            con.execute(
+                "INSERT OR REPLACE INTO archive_entries "
+                f"({', '.join(SUBMISSION_KEY_COLUMNS)}, digest, archived_at) "
+                f"VALUES ({', '.join('?' for _ in SUBMISSION_KEY_COLUMNS)}, ?, ?)",
+                [key[c] for c in SUBMISSION_KEY_COLUMNS] + [digest, time.time()],
+            )
+        return digest
+
+    def entries(self) -> pd.DataFrame:
+        """保存済みの投稿の一覧（キーの列と digest 列）を返す。"""
+        with closing(self._connect()) as con:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(SUBMISSION_KEY_COLUMNS)}, digest FROM archive_entries "
+                "ORDER BY archived_at",
+                con,
+            )
+
+    def lookup(self, leaderboard_df: pd.DataFrame) -> pd.Series:
+        """リーダーボードの各行に対応する、保存した予測値のハッシュ値（未保存の行は None）を返す。"""
+        keys = normalize_keys(leaderboard_df)
+        merged = keys.merge(self.entries(), on=SUBMISSION_KEY_COLUMNS, how="left")
+        digests = merged["digest"].astype(object)
+        return pd.Series(
+            digests.where(digests.notna(), None).to_numpy(), index=leaderboard_df.index
+        )
+
+    def load(self, digest: str) -> pd.DataFrame:
+        """保存した予測値を、投稿時と同じ列の並び（浮動小数点数は float64、整数は int64）で読み込む。"""
+        values = pd.read_parquet(self._object_path(digest))
+        layout = self._load_layout()
+        if layout["id_column"] not in values.columns:
+            values.insert(0, layout["id_column"], self._ids.to_numpy())
+            values = values[layout["columns"]]
+        dtypes = {c: np.float64 for c in values.select_dtypes(include="float").columns}
+        dtypes.update({c: np.int64 for c in values.select_dtypes(include="integer").columns})
+        return values.astype(dtypes)
+
+    def storage_stats(self) -> Dict[str, int]:
+        """保存済みの投稿数、保存したファイル数と、ディスク上の合計サイズ（バイト）を返す。"""
+        with closing(self._connect()) as con:
+            n_entries, n_objects = con.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT digest) FROM archive_entries"
+            ).fetchone()
+        size = sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.archive_dir / self.OBJECTS_DIR_NAME)
+            if entry.is_file()
+        )
+        ids_path = self.archive_dir / self.IDS_FILE_NAME
+        if ids_path.exists():
+            size += ids_path.stat().st_size
+        return {"entries": n_entries, "objects": n_objects, "bytes": size}
@@ -0,0 +1,161 @@
+"""
+投稿ファイルの検証モジュール。
+スコア計算の前に、カラム・行数・データ型・非有限値（NaN/inf）・idの重複・idの過不足を
+ベクトル演算でまとめて検証し、問題のある投稿はスコア計算を行わずに差し戻します。
+期待するカラムとidの集合はサンプル提出ファイルから作成し、ファイルの更新時刻をキーにキャッシュします。
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from caching import FileCache
+
+MAX_REPORTED_ROWS = 5  # エラー時に表示する問題のある行の最大件数
+
+_spec_cache = FileCache("submission_spec")
+
+
+@dataclass(frozen=True)
+class SubmissionSpec:
+    """サンプル提出ファイルから作成した、投稿ファイルの期待する形"""
+
+    columns: List[str]
+    id_column: str
+    value_columns: List[str]
+    ids: np.ndarray  # 期待するid（ソート済み・重複なし）
+    numeric_ids: bool  # idが数値か
+    id_range: Optional[Tuple[int, int]]  # 期待するidが連続した整数の場合は、その範囲 [start, stop)
+
+
+@dataclass(frozen=True)
+class SubmissionValidationError:
+    """投稿ファイルの検証エラー"""
+
+    message: str
+    rows: Optional[pd.DataFrame] = None  # 問題のある行（先頭の数件、「行番号」はCSVファイルの行番号）
+
+
+def _load_spec(path: str) -> SubmissionSpec:
+    sample_df = pd.read_csv(path)
+    columns = [str(c) for c in sample_df.columns]
+    id_column = "id" if "id" in columns else columns[0]
+    id_values = sample_df[id_column]
+    numeric_ids = pd.api.types.is_numeric_dtype(id_values)
+    ids = id_values.to_numpy() if numeric_ids else id_values.astype(str).to_numpy()
+    ids = np.unique(ids)
+    id_range = None
+    if (
+        len(ids) > 0
+        and pd.api.types.is_integer_dtype(ids.dtype)
+        and ids[-1] - ids[0] == len(ids) - 1
+    ):
+        id_range = (int(ids[0]), int(ids[-1]) + 1)
+    return SubmissionSpec(
+        columns=columns,
+        id_column=id_column,
+        value_columns=[c for c in columns if c != id_column],
+        ids=ids,
+        numeric_ids=numeric_ids,
+        id_range=id_range,
+    )
+
+
+def load_submission_spec(sample_submission_file: str) -> Optional[SubmissionSpec]:
+    """サンプル提出ファイルから期待する形を作成する。ファイルが存在しない場合は None を返す。"""
+    return _spec_cache.get(sample_submission_file, _load_spec)
+
+
+def _positions(spec: SubmissionSpec, ids: np.ndarray) -> np.ndarray:
+    """各idの期待するidの中での位置を返す。期待するidに含まれないidは -1 とする。"""
+    if spec.id_range is not None:
+        # 期待するidが連続した整数の場合は、引き算だけで位置が求まる
+        start, stop = spec.id_range
+        positions = ids - start
+        integral = ids == np.floor(ids) if ids.dtype.kind == "f" else True
+        valid = (ids >= start) & (ids < stop) & integral
+        return np.where(valid, positions, -1).astype(np.int64)
+    positions = np.searchsorted(spec.ids, ids).clip(max=len(spec.ids) - 1)
+    return np.where(spec.ids[positions] == ids, positions, -1)
+
+
+def _offending_rows(df: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+    """マスクが True の行のうち先頭の数件を、CSVファイルの行番号（ヘッダーが1行目）付きで返す。"""
+    positions = np.flatnonzero(mask)[:MAX_REPORTED_ROWS]
+    rows = df.iloc[positions].copy()
+    rows.insert(0, "行番号", positions + 2)
+    return rows.reset_index(drop=True)
+
+
+def validate_submission(
+    df: pd.DataFrame, spec: SubmissionSpec
+) -> Optional[SubmissionValidationError]:
+    """
+    投稿ファイルを検証し、最初に見つかった問題を返す。問題がなければ None を返す。
+    検証は軽いものから順に行い、問題が見つかった時点で打ち切る。
+    """
+    if [str(c) for c in df.columns] != spec.columns:
+        return SubmissionValidationError(
+            f"カラムが期待する形と一致していません。期待するカラム: {', '.join(spec.columns)}"
+        )
+    if len(df) != len(spec.ids):
+        return SubmissionValidationError(
+            f"行数が期待する形と一致していません。期待する行数: {len(spec.ids)}、投稿された行数: {len(df)}"
+        )
+
+    # データ型: 予測値の列は数値であること
+    for column in spec.value_columns:
+        if not pd.api.types.is_numeric_dtype(df[column]) or pd.api.types.is_bool_dtype(
+            df[column]
+        ):
+            converted = pd.to_numeric(df[column], errors="coerce")
+            return SubmissionValidationError(
+                f"'{column}' 列に数値以外の値が含まれています。",
+                _offending_rows(df, (converted.isna() & df[column].notna()).to_numpy()),
+            )
+    id_values = df[spec.id_column]
+    if spec.numeric_ids:
+        if not pd.api.types.is_numeric_dtype(id_values):
+            converted = pd.to_numeric(id_values, errors="coerce")
+            return SubmissionValidationError(
+                f"'{spec.id_column}' 列に数値以外の値が含まれています。",
+                _offending_rows(df, (converted.isna() & id_values.notna()).to_numpy()),
+            )
+        ids = id_values.to_numpy()
+    else:
+        ids = id_values.astype(str).to_numpy()
+
+    # 非有限値: 予測値に NaN や inf が含まれていないこと
+    if spec.value_columns:
+        values = df[spec.value_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        non_finite = ~np.isfinite(values).all(axis=1)
+        if non_finite.any():
+            return SubmissionValidationError(
+                f"予測値に欠損値または無限大の値が {int(non_finite.sum())} 行含まれています。",
+                _offending_rows(df, non_finite),
+            )
+
+    # idの過不足と重複: 各idの期待するid（ソート済み）の中での位置を求め、
+    # 位置が見つからないidは不明なid、同じ位置に複数の行があるidは重複とする
+    positions = _positions(spec, ids)
+    known = positions >= 0
+    if not known.all():
+        # 行数が等しいため、不明なidがあれば期待するidのいずれかが不足している
+        found = np.zeros(len(spec.ids), dtype=bool)
+        found[positions[known]] = True
+        missing = spec.ids[~found][:MAX_REPORTED_ROWS]
+        return SubmissionValidationError(
+            f"期待しない'{spec.id_column}'が {int((~known).sum())} 行含まれています。"
+            f"不足しているidの例: {', '.join(map(str, missing))}",
+            _offending_rows(df, ~known),
+        )
+    counts = np.bincount(positions, minlength=len(spec.ids))
+    duplicated = counts[positions] > 1
+    if duplicated.any():
+        return SubmissionValidationError(
+            f"'{spec.id_column}' 列に重複しているidがあります。",
+            _offending_rows(df, duplicated),
+        )
+    return None
@@ -0,0 +1,133 @@
+"""
+正解データのチャンクごとの登録のテスト。
+整数のみのチャンクの後に小数を含むチャンクが続いても、値が切り捨てられずに登録されることを確認します。
+"""
+
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import config
+from data_store import DuckDBDataStore, SQLiteDataStore
+from ground_truth_upload import (
+    GroundTruthValidationError,
+    GroundTruthValidator,
+    validated_chunks,
+)
+
+HEADER = ["id", "target", "Usage"]
+# chunk_rows=2 で、最初のチャンクは整数のみ、2つ目のチャンクで小数になる
+ROWS = [
+    (1, 3, "Public"),
+    (2, 4, "Private"),
+    (3, 0.5, "Public"),
+    (4, 1.25, "Private"),
+    (5, 7, "Public"),
+]
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    """メトリクスなどの書き出し先を、リポジトリの db ディレクトリではなく一時ディレクトリにする。"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "METRICS_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setattr(config, "SHARED_GROUND_TRUTH_DIR", str(tmp_path / "shared_memory"))
+    return tmp_path
+
+
+def _csv_file(rows=ROWS, header=HEADER) -> io.BytesIO:
+    df = pd.DataFrame(rows, columns=header)
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+
+def _xlsx_file(rows=ROWS, header=HEADER) -> io.BytesIO:
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.title = "gt"
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(row)
+    file = io.BytesIO()
+    workbook.save(file)
+    return file
+
+
+def _upload(file, file_name, header=HEADER, sheet_name=None):
+    """登録アプリと同じく、検証でデータ型を集計してから、そのデータ型に揃えたチャンクを返す。"""
+    validator = GroundTruthValidator(header)
+    for _ in validated_chunks(file, file_name, validator, sheet_name=sheet_name, chunk_rows=2):
+        pass
+    return validated_chunks(
+        file,
+        file_name,
+        GroundTruthValidator(header, dtypes=validator.dtypes),
+        sheet_name=sheet_name,
+        chunk_rows=2,
+    )
+
+
+@pytest.fixture(params=["sqlite", "duckdb"])
+def data_store(request, work_dir):
+    if request.param == "sqlite":
+        return SQLiteDataStore(str(work_dir / "test.db"), "leaderboard", "ground_truth")
+    return DuckDBDataStore(str(work_dir / "test.duckdb"), "leaderboard", "ground_truth")
+
+
+@pytest.mark.parametrize(
+    "file_name, file_factory, sheet_name",
+    [("gt.csv", _csv_file, None), ("gt.xlsx", _xlsx_file, "gt")],
+)
+def test_decimal_after_integer_chunk_is_not_truncated(
+    data_store, file_name, file_factory, sheet_name
+):
+    chunks = _upload(file_factory(), file_name, sheet_name=sheet_name)
+    n_rows = data_store.write_ground_truth_chunks(chunks, HEADER)
+
+    assert n_rows == len(ROWS)
+    df = data_store.read_ground_truth(HEADER)
+    df = df.assign(id=pd.to_numeric(df["id"]), target=pd.to_numeric(df["target"]))
+    df = df.sort_values("id").reset_index(drop=True)
+    assert df["id"].tolist() == [row[0] for row in ROWS]
+    assert df["target"].tolist() == [row[1] for row in ROWS]
+    assert df["Usage"].tolist() == [row[2] for row in ROWS]
+
+
+def test_chunks_are_unified_across_the_file():
+    chunks = list(_upload(_csv_file(), "gt.csv"))
+
+    assert len(chunks) == 3
+    for chunk in chunks:
+        assert chunk["id"].dtype == "int64"
+        assert chunk["target"].dtype == "float64"
+
+
+def test_custom_score_columns_stay_numeric():
+    header = ["id", "y1", "y2", "Usage"]
+    rows = [(1, 1, 2, "Public"), (2, 3, 4, "Private"), (3, 0.5, 6, "Public")]
+
+    for chunk in _upload(_csv_file(rows, header), "gt.csv", header=header):
+        assert chunk["y1"].dtype == "float64"
+        assert chunk["y2"].dtype == "int64"
+
+
+def test_mixed_column_is_registered_as_text(data_store):
+    rows = [(1, 1, "Public"), (2, 2, "Private"), (3, "cat", "Public")]
+
+    chunks = list(_upload(_csv_file(rows), "gt.csv"))
+    assert [chunk["target"].tolist() for chunk in chunks] == [["1", "2"], ["cat"]]
+
+    data_store.write_ground_truth_chunks(chunks, HEADER)
+    df = data_store.read_ground_truth(HEADER).sort_values("id")
+    assert df["target"].astype(str).tolist() == ["1", "2", "cat"]
+
+
+def test_invalid_usage_reports_line_numbers():
+    file = io.BytesIO(b"id,target,Usage\n1,1,Public\n2,2,Private\n3,3,Test\n")
+
+    with pytest.raises(GroundTruthValidationError) as e:
+        list(validated_chunks(file, "gt.csv", GroundTruthValidator(HEADER), chunk_rows=2))
+    assert str(e.value) == (
+        "Usage の値は ['Public', 'Private'] のいずれかにしてください: ['Test']（行番号: [4]）"
+    )
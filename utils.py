@@ -3,13 +3,20 @@ import hashlib
 import hmac
 from PIL import Image
 
+from caching import content_cache, read_binary_file
+from competitions import get_current_competition
 from config import (
     PROTECT_ALL_PAGES,
-    PAGE_TITLE,
     AUTH,
+    EMAIL_HASH_SALT,
 )
 
 
+def hash_email(email: str) -> str:
+    """メールアドレスをsalt付きでハッシュ化する。"""
+    return hashlib.sha256((email + EMAIL_HASH_SALT).encode()).hexdigest()
+
+
 def show_register_ground_truth_message() -> None:
     """
     ground_truthの登録を促すメッセージを表示する。
@@ -25,18 +32,25 @@ def show_register_ground_truth_message() -> None:
     )
 
 
+def _load_image(path: str) -> Image.Image:
+    image = Image.open(path)
+    image.load()
+    return image
+
+
 def page_config() -> None:
-    favicon = Image.open("favicon.ico")
+    # ファビコンとロゴはファイルが更新されない限りキャッシュから読み込む
+    favicon = content_cache.get("favicon.ico", _load_image)
     st.set_page_config(
-        page_title=PAGE_TITLE,
+        page_title=get_current_competition().title,
         page_icon=favicon,
         layout="wide",
         initial_sidebar_state="expanded",
     )
     st.logo(
-        image="./logo.png",
+        image=read_binary_file("./logo.png"),
         size="large",
-        icon_image="./icon.png",
+        icon_image=read_binary_file("./icon.png"),
     )
 
 